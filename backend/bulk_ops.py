@@ -0,0 +1,112 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from pymongo import UpdateOne
+
+from models import BulkItemResult, BulkItemStatus, BulkOperationResponse
+
+
+def _check_size(count: int, max_items: int):
+    if count == 0:
+        raise HTTPException(status_code=400, detail="No items in batch")
+    if count > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} items per request")
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+def validate_updates(
+    items: List[Dict[str, Any]],
+    update_model: Type[BaseModel],
+    max_items: int,
+    prepare: Optional[Callable[[dict], None]] = None
+) -> Tuple[List[BulkItemResult], Dict[str, dict]]:
+    """
+    Check each {"id", ...fields} item against the resource's update model. Returns a
+    result per item in request order (valid ones still marked UPDATED until applied)
+    and the $set document per valid id. `prepare` can normalize a $set in place.
+    """
+    _check_size(len(items), max_items)
+    results, updates = [], {}
+    for item in items:
+        fields = dict(item)
+        item_id = fields.pop("id", None)
+        if not isinstance(item_id, str) or not item_id:
+            results.append(BulkItemResult(status=BulkItemStatus.INVALID, detail="Missing id"))
+            continue
+        if item_id in updates:
+            results.append(BulkItemResult(id=item_id, status=BulkItemStatus.INVALID, detail="Duplicate id in batch"))
+            continue
+        try:
+            update = update_model.model_validate(fields)
+        except ValidationError as e:
+            results.append(BulkItemResult(id=item_id, status=BulkItemStatus.INVALID, detail=_validation_detail(e)))
+            continue
+        update_data = {k: v for k, v in update.model_dump(mode="json").items() if v is not None}
+        if prepare:
+            prepare(update_data)
+        if not update_data:
+            results.append(BulkItemResult(id=item_id, status=BulkItemStatus.INVALID, detail="No fields to update"))
+            continue
+        updates[item_id] = update_data
+        results.append(BulkItemResult(id=item_id, status=BulkItemStatus.UPDATED))
+    return results, updates
+
+
+async def apply_updates(collection, updates: Dict[str, dict], updated_at: str, projection: Optional[dict] = None) -> Dict[str, dict]:
+    """
+    One bulk_write of $set per existing id. Returns the matched documents as they
+    were before the write (restricted to `projection`), keyed by id.
+    """
+    if not updates:
+        return {}
+    fields = {"_id": 0, "id": 1, **(projection or {})}
+    previous = {
+        doc["id"]: doc
+        for doc in await collection.find({"id": {"$in": list(updates)}}, fields).to_list(len(updates))
+    }
+    operations = [
+        UpdateOne({"id": item_id}, {"$set": {**update, "updated_at": updated_at}})
+        for item_id, update in updates.items() if item_id in previous
+    ]
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    return previous
+
+
+def unique_ids(ids: List[str], max_items: int) -> Tuple[List[BulkItemResult], List[str]]:
+    """A result per requested id (duplicates reported as invalid) and the ids to delete"""
+    _check_size(len(ids), max_items)
+    results, seen = [], {}
+    for item_id in ids:
+        if item_id in seen:
+            results.append(BulkItemResult(id=item_id, status=BulkItemStatus.INVALID, detail="Duplicate id in batch"))
+            continue
+        seen[item_id] = None
+        results.append(BulkItemResult(id=item_id, status=BulkItemStatus.DELETED))
+    return results, list(seen)
+
+
+async def delete_existing(collection, ids: List[str]) -> List[str]:
+    """Delete the given ids with one delete_many; returns the ids that existed"""
+    found = [doc["id"] for doc in await collection.find({"id": {"$in": ids}}, {"_id": 0, "id": 1}).to_list(len(ids))]
+    if found:
+        await collection.delete_many({"id": {"$in": found}})
+    return found
+
+
+def bulk_response(results: List[BulkItemResult], applied, cdn_deletions_queued: int = 0) -> BulkOperationResponse:
+    """Mark pending results whose id was not applied as NOT_FOUND and count the rest"""
+    for result in results:
+        if result.status in (BulkItemStatus.UPDATED, BulkItemStatus.DELETED) and result.id not in applied:
+            result.status = BulkItemStatus.NOT_FOUND
+            result.detail = None
+    return BulkOperationResponse(
+        requested=len(results),
+        succeeded=sum(1 for r in results if r.status in (BulkItemStatus.UPDATED, BulkItemStatus.DELETED)),
+        results=results,
+        cdn_deletions_queued=cdn_deletions_queued
+    )
@@ -1,12 +1,13 @@
+import hashlib
 import httpx
 import os
+import time
 from fastapi import HTTPException, UploadFile
 import logging
-from dotenv import load_dotenv
+from typing import Optional
 
-from pathlib import Path
+from resilience import BUNNY_STORAGE, BUNNY_STREAM
 
-load_dotenv(Path(__file__).parent / '.env')
 logger = logging.getLogger(__name__)
 
 def _get_bunny_config() -> dict:
@@ -17,19 +18,31 @@ def _get_bunny_config() -> dict:
         "storage_password": os.getenv("BUNNY_STORAGE_PASSWORD"),
         "storage_region": os.getenv("BUNNY_STORAGE_REGION"),
         "pull_zone_url": os.getenv("BUNNY_PULL_ZONE_URL"),
+        # API hosts can be pointed at local stand-ins for benchmarks and tests
+        "stream_api_url": os.getenv("BUNNY_STREAM_API_URL", "https://video.bunnycdn.com").rstrip("/"),
+        "storage_api_url": (os.getenv("BUNNY_STORAGE_API_URL") or f"https://{os.getenv('BUNNY_STORAGE_REGION')}").rstrip("/"),
+        "tus_endpoint": os.getenv("BUNNY_TUS_ENDPOINT", "https://video.bunnycdn.com/tusupload"),
     }
 
 
-cfg = _get_bunny_config()
+class StorageUploadError(HTTPException):
+    """A PUT to Bunny Storage that Bunny rejected, as opposed to a configuration error"""
 
-# Log configuration on startup (without sensitive data)
-logger.info(f"Bunny CDN Configuration:")
-logger.info(f"  Storage Zone: {cfg['storage_zone']}")
-logger.info(f"  Storage Region: {cfg['storage_region']}")
-logger.info(f"  Pull Zone URL: {cfg['pull_zone_url']}")
-logger.info(f"  Stream Library ID: {cfg['stream_library_id']}")
-logger.info(f"  Storage Password Set: {bool(cfg['storage_password'])}")
-logger.info(f"  Stream API Key Set: {bool(cfg['stream_api_key'])}")
+    def __init__(self, detail: str, upstream_status: Optional[int] = None):
+        super().__init__(500, detail)
+        self.upstream_status = upstream_status
+
+
+def log_bunny_config():
+    """Log the configuration (without secrets); called from startup rather than at import"""
+    cfg = _get_bunny_config()
+    logger.info(f"Bunny CDN Configuration:")
+    logger.info(f"  Storage Zone: {cfg['storage_zone']}")
+    logger.info(f"  Storage Region: {cfg['storage_region']}")
+    logger.info(f"  Pull Zone URL: {cfg['pull_zone_url']}")
+    logger.info(f"  Stream Library ID: {cfg['stream_library_id']}")
+    logger.info(f"  Storage Password Set: {bool(cfg['storage_password'])}")
+    logger.info(f"  Stream API Key Set: {bool(cfg['stream_api_key'])}")
 
 
 # =====================================================
@@ -40,15 +53,15 @@ async def create_bunny_video(title: str):
     if not config["stream_library_id"] or not config["stream_api_key"]:
         raise HTTPException(500, "Bunny Stream credentials are missing")
 
-    url = f"https://video.bunnycdn.com/library/{config['stream_library_id']}/videos"
+    url = f"{config['stream_api_url']}/library/{config['stream_library_id']}/videos"
 
     headers = {
         "AccessKey": config["stream_api_key"],
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient() as client:
-        res = await client.post(url, headers=headers, json={"title": title})
+    # POST is not retried: a lost response could still have created the video
+    res = await BUNNY_STREAM.request("POST", url, headers=headers, json={"title": title})
 
     if res.status_code in [200, 201, 202]:
         video_data = res.json()
@@ -63,10 +76,95 @@ async def create_bunny_video(title: str):
     error_msg = f"Failed to create video entry. Status: {res.status_code}"
     logger.error(f"{error_msg}. Response: {res.text}")
     raise HTTPException(500, error_msg)
+
+
+# Bunny Stream statuses meaning the file was received but rejected: 5=error, 6=upload failed
+BUNNY_FAILED_STATUSES = {5, 6}
+
+
+def bunny_stream_urls(video_id: str) -> dict:
+    library_id = _get_bunny_config()["stream_library_id"]
+    return {
+        "embed_url": f"https://iframe.mediadelivery.net/embed/{library_id}/{video_id}",
+        "playback_url": f"https://vz-{library_id}.b-cdn.net/{video_id}/playlist.m3u8",
+        "thumbnail_url": f"https://vz-{library_id}.b-cdn.net/{video_id}/thumbnail.jpg",
+    }
+
+
+async def get_bunny_video(video_id: str) -> Optional[dict]:
+    """The Bunny Stream video object (status, encodeProgress, ...), or None if Bunny does not return it"""
+    config = _get_bunny_config()
+    if not config["stream_library_id"] or not config["stream_api_key"]:
+        raise HTTPException(500, "Bunny Stream credentials are missing")
+
+    url = f"{config['stream_api_url']}/library/{config['stream_library_id']}/videos/{video_id}"
+    res = await BUNNY_STREAM.request("GET", url, headers={"AccessKey": config["stream_api_key"]})
+
+    if res.status_code != 200:
+        logger.warning(f"Bunny Stream video lookup failed for {video_id}. Status: {res.status_code}")
+        return None
+    return res.json()
+
+
+async def list_bunny_videos(page: int, items_per_page: int) -> dict:
+    """
+    One page of the Stream library ordered by upload date: {"totalItems", "currentPage",
+    "itemsPerPage", "items": [video objects]}. Raises on anything but a 200.
+    """
+    config = _get_bunny_config()
+    if not config["stream_library_id"] or not config["stream_api_key"]:
+        raise HTTPException(500, "Bunny Stream credentials are missing")
+
+    url = f"{config['stream_api_url']}/library/{config['stream_library_id']}/videos"
+    params = {"page": page, "itemsPerPage": items_per_page, "orderBy": "date"}
+    res = await BUNNY_STREAM.request("GET", url, headers={"AccessKey": config["stream_api_key"]}, params=params)
+
+    if res.status_code != 200:
+        error_msg = f"Failed to list Bunny Stream videos (page {page}). Status: {res.status_code}"
+        logger.error(f"{error_msg}. Response: {res.text}")
+        raise HTTPException(502, error_msg)
+    return res.json()
+
+
+# =====================================================
+# 1️⃣b SIGN A DIRECT (TUS) UPLOAD FROM THE BROWSER
+# =====================================================
+def create_tus_upload_signature(video_id: str, expires_in: int) -> dict:
+    """
+    Presigned credentials for uploading one video straight to Bunny's TUS endpoint.
+    The signature covers library, API key, expiry and video, so it cannot be reused
+    for another video and the API key itself never leaves the server.
+    """
+    config = _get_bunny_config()
+    if not config["stream_library_id"] or not config["stream_api_key"]:
+        raise HTTPException(500, "Bunny Stream credentials are missing")
+
+    expires_at = int(time.time()) + expires_in
+    signature = hashlib.sha256(
+        f"{config['stream_library_id']}{config['stream_api_key']}{expires_at}{video_id}".encode()
+    ).hexdigest()
+    return {
+        "endpoint": config["tus_endpoint"],
+        "library_id": config["stream_library_id"],
+        "video_id": video_id,
+        "signature": signature,
+        "expires_at": expires_at,
+    }
+
+
 # =====================================================
 # 2️⃣ UPLOAD VIDEO TO BUNNY STREAM
 # =====================================================
-async def upload_video_to_bunny_stream(file: UploadFile, title: str):
+async def _read_chunks(file: UploadFile, chunk_size: int = 1024 * 1024):
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def upload_video_to_bunny_stream(file: UploadFile, title: str, size: Optional[int] = None):
+    """Create a Bunny Stream video and PUT the file to it; with `size` the file is streamed from its spool instead of read into memory"""
     config = _get_bunny_config()
 
     if not config["stream_api_key"]:
@@ -84,19 +182,26 @@ async def upload_video_to_bunny_stream(file: UploadFile, title: str):
         video_id = video_data["guid"]
         logger.info(f"Video entry created with ID: {video_id}")
 
-        upload_url = f"https://video.bunnycdn.com/library/{config['stream_library_id']}/videos/{video_id}"
+        upload_url = f"{config['stream_api_url']}/library/{config['stream_library_id']}/videos/{video_id}"
 
         headers = {
             "AccessKey": config["stream_api_key"],
             "Content-Type": "application/octet-stream"
         }
 
-        file_content = await file.read()
-        file_size_mb = len(file_content) / (1024 * 1024)
-        logger.info(f"Uploading video file: {file.filename} ({file_size_mb:.2f} MB)")
+        if size is None:
+            file_content = await file.read()
+            size = len(file_content)
+        else:
+            headers["Content-Length"] = str(size)
+            file_content = _read_chunks(file)
+        logger.info(f"Uploading video file: {file.filename} ({size / (1024 * 1024):.2f} MB)")
 
-        async with httpx.AsyncClient(timeout=600.0) as client:
-            res = await client.put(upload_url, headers=headers, content=file_content)
+        # Long write timeout for the whole file; not retried, the caller still holds the upload
+        res = await BUNNY_STREAM.request(
+            "PUT", upload_url, headers=headers, content=file_content,
+            timeout=httpx.Timeout(600.0, connect=BUNNY_STREAM.timeout.connect), retries=0
+        )
 
         logger.info(f"Video file upload response - Status: {res.status_code}, Body: {res.text[:500]}")
         
@@ -106,19 +211,15 @@ async def upload_video_to_bunny_stream(file: UploadFile, title: str):
             raise HTTPException(500, f"Upload failed: {res.text}")
 
         # important URLs for frontend
-        embed_url = f"https://iframe.mediadelivery.net/embed/{config['stream_library_id']}/{video_id}"
-        playback_url = f"https://vz-{config['stream_library_id']}.b-cdn.net/{video_id}/playlist.m3u8"
-        thumbnail_url = f"https://vz-{config['stream_library_id']}.b-cdn.net/{video_id}/thumbnail.jpg"
+        urls = bunny_stream_urls(video_id)
         
         logger.info(f"Video uploaded successfully to Bunny Stream. Video ID: {video_id}")
-        logger.info(f"Embed URL: {embed_url}")
-        logger.info(f"Playback URL: {playback_url}")
+        logger.info(f"Embed URL: {urls['embed_url']}")
+        logger.info(f"Playback URL: {urls['playback_url']}")
 
         return {
             "video_id": video_id,
-            "embed_url": embed_url,
-            "playback_url": playback_url,
-            "thumbnail_url": thumbnail_url,
+            **urls,
             "success": True
         }
     except HTTPException:
@@ -135,22 +236,33 @@ async def delete_bunny_stream_video(video_id: str):
     if not config["stream_library_id"] or not config["stream_api_key"]:
         raise HTTPException(500, "Bunny Stream credentials are missing")
 
-    url = f"https://video.bunnycdn.com/library/{config['stream_library_id']}/videos/{video_id}"
+    url = f"{config['stream_api_url']}/library/{config['stream_library_id']}/videos/{video_id}"
 
     headers = {
         "AccessKey": config["stream_api_key"]
     }
 
-    async with httpx.AsyncClient() as client:
-        res = await client.delete(url, headers=headers)
+    res = await BUNNY_STREAM.request("DELETE", url, headers=headers)
 
-    return res.status_code in [200, 204]
+    # 404: already deleted, which is what the caller wanted
+    return res.status_code in [200, 204, 404]
 
 
 # =====================================================
 # 4️⃣ UPLOAD IMAGE / FILE TO STORAGE (OPTIONAL)
 # =====================================================
 async def upload_to_bunny_storage(file: UploadFile, destination_path: str):
+    file_content = await file.read()
+    logger.info(f"Uploading file: {file.filename} ({len(file_content) / 1024:.2f} KB)")
+    return await upload_bytes_to_bunny_storage(file_content, destination_path)
+
+
+async def upload_bytes_to_bunny_storage(
+    content: bytes,
+    destination_path: str,
+    content_type: str = "application/octet-stream"
+):
+    """PUT bytes to Bunny Storage; transient failures are retried by the storage dependency"""
     config = _get_bunny_config()
 
     if not config["storage_password"]:
@@ -170,25 +282,20 @@ async def upload_to_bunny_storage(file: UploadFile, destination_path: str):
         raise HTTPException(500, "Pull Zone URL missing")
 
     try:
-        upload_url = f"https://{config['storage_region']}/{config['storage_zone']}/{destination_path}"
+        upload_url = f"{config['storage_api_url']}/{config['storage_zone']}/{destination_path}"
         logger.info(f"Uploading to Bunny Storage: {destination_path}")
         logger.info(f"Upload URL: {upload_url}")
 
         headers = {
             "AccessKey": config["storage_password"],
-            "Content-Type": "application/octet-stream"
+            "Content-Type": content_type
         }
 
-        file_content = await file.read()
-        file_size_kb = len(file_content) / 1024
-        logger.info(f"Uploading file: {file.filename} ({file_size_kb:.2f} KB)")
-
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            res = await client.put(upload_url, headers=headers, content=file_content)
+        res = await BUNNY_STORAGE.request("PUT", upload_url, headers=headers, content=content)
 
         if res.status_code not in [200, 201]:
             logger.error(f"Storage upload failed. Status: {res.status_code}, Response: {res.text}")
-            raise HTTPException(500, f"Storage upload failed: {res.text}")
+            raise StorageUploadError(f"Storage upload failed: {res.text}", res.status_code)
 
         cdn_url = f"{config['pull_zone_url']}/{destination_path}"
         logger.info(f"File uploaded successfully to Bunny Storage")
@@ -215,16 +322,15 @@ async def delete_from_bunny_cdn(file_path: str):
     if not config["storage_password"]:
         raise HTTPException(500, "Storage password missing")
 
-    delete_url = f"https://{config['storage_region']}/{config['storage_zone']}/{file_path}"
+    delete_url = f"{config['storage_api_url']}/{config['storage_zone']}/{file_path}"
 
     headers = {
         "AccessKey": config["storage_password"]
     }
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        res = await client.delete(delete_url, headers=headers)
+    res = await BUNNY_STORAGE.request("DELETE", delete_url, headers=headers)
 
-    if res.status_code not in [200, 204]:
+    if res.status_code not in [200, 204, 404]:
         logger.warning(f"Failed to delete file from Bunny CDN: {file_path}, Status: {res.status_code}")
         return False
 
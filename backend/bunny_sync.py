@@ -0,0 +1,316 @@
+import asyncio
+import logging
+import math
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from bunny_cdn import BUNNY_FAILED_STATUSES, bunny_stream_urls, list_bunny_videos
+from models import BunnySyncStatus, Video, VideoUploadStatus
+
+logger = logging.getLogger(__name__)
+
+BUNNY_SYNC_PAGE_SIZE = int(os.environ.get("BUNNY_SYNC_PAGE_SIZE", "100"))
+# Library pages fetched and written at once
+BUNNY_SYNC_CONCURRENCY = int(os.environ.get("BUNNY_SYNC_CONCURRENCY", "4"))
+# Bunny videos we have no row for yet are only imported once this old: a younger one
+# may be an upload_video or direct upload whose document is still being written
+BUNNY_SYNC_MIN_AGE_SECONDS = int(os.environ.get("BUNNY_SYNC_MIN_AGE_SECONDS", "3600"))
+# A running sync with no progress for this long is taken to be dead (its worker exited)
+BUNNY_SYNC_STALE_SECONDS = int(os.environ.get("BUNNY_SYNC_STALE_SECONDS", "600"))
+BUNNY_SYNC_DEFAULT_CATEGORY = os.environ.get("BUNNY_SYNC_DEFAULT_CATEGORY", "yoga")
+BUNNY_SYNC_DEFAULT_DIFFICULTY = os.environ.get("BUNNY_SYNC_DEFAULT_DIFFICULTY", "beginner")
+BUNNY_SYNC_MISSING_SAMPLE = 100
+
+# Fields a run document reports; everything else on it is bookkeeping
+_PROGRESS_FIELDS = (
+    "status", "updated_at", "finished_at", "total_items", "total_pages", "pages_done", "failed_pages",
+    "seen", "created", "updated", "unchanged", "skipped_recent", "missing_in_bunny", "missing_sample", "error",
+)
+
+
+async def ensure_bunny_sync_indexes(db):
+    await db.videos.create_index("video_id")
+    # At most one run holds running=True; the insert of a second one fails, across workers
+    await db.bunny_sync_runs.create_index("running", unique=True, partialFilterExpression={"running": True})
+    await db.bunny_sync_runs.create_index([("started_at", -1)])
+
+
+def _upload_status(bunny_status) -> Optional[str]:
+    """Our upload_status for a Bunny status, or None while Bunny has not received the file"""
+    if not isinstance(bunny_status, int):
+        return None
+    if bunny_status in BUNNY_FAILED_STATUSES:
+        return VideoUploadStatus.FAILED.value
+    if bunny_status >= 1:
+        return VideoUploadStatus.READY.value
+    return None
+
+
+def _uploaded_at(item: dict) -> Optional[datetime]:
+    value = item.get("dateUploaded")
+    if not value:
+        return None
+    try:
+        uploaded = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    # Stored timestamps are naive UTC
+    if uploaded.tzinfo is not None:
+        uploaded = uploaded.astimezone(timezone.utc).replace(tzinfo=None)
+    return uploaded
+
+
+def _bunny_fields(item: dict) -> dict:
+    """The fields Bunny owns on our video document"""
+    guid = item["guid"]
+    thumbnail_url = bunny_stream_urls(guid)["thumbnail_url"]
+    if item.get("thumbnailFileName"):
+        thumbnail_url = f"{thumbnail_url.rsplit('/', 1)[0]}/{item['thumbnailFileName']}"
+    fields = {"thumbnail_url": thumbnail_url}
+    length = item.get("length")
+    if isinstance(length, (int, float)) and length > 0:
+        fields["duration"] = int(length)
+    return fields
+
+
+def _new_video(item: dict, fields: dict, upload_status: Optional[str]) -> dict:
+    guid = item["guid"]
+    urls = bunny_stream_urls(guid)
+    video = Video(
+        title=(item.get("title") or guid).strip() or guid,
+        category=BUNNY_SYNC_DEFAULT_CATEGORY,
+        difficulty=BUNNY_SYNC_DEFAULT_DIFFICULTY,
+        duration=fields.get("duration", 0),
+        description="Imported from Bunny Stream",
+        video_url=urls["playback_url"],
+        embed_url=urls["embed_url"],
+        video_id=guid,
+        thumbnail_url=fields["thumbnail_url"],
+        upload_status=upload_status or VideoUploadStatus.PENDING.value,
+        created_at=_uploaded_at(item) or datetime.utcnow(),
+    )
+    video_dict = video.model_dump(mode="json")
+    video_dict["comment_count"] = 0
+    return video_dict
+
+
+class BunnyLibrarySync:
+    """
+    Imports an existing Bunny Stream library into videos, admin-triggered. Pages of
+    the library are fetched by up to BUNNY_SYNC_CONCURRENCY workers; each page is
+    diffed against the stored rows with one find on video_id and written with one
+    unordered bulk_write of upserts. Only Bunny-owned fields (duration, thumbnail,
+    upload status) are updated on existing rows; titles and categories edited here
+    are left alone. Re-running is safe: unchanged rows are not written and new rows
+    are upserted on video_id, so a second run only picks up what changed.
+
+    Progress lives on a bunny_sync_runs document, saved after every page, so any
+    worker can report it. Stored videos that Bunny no longer has are counted, never
+    deleted.
+    """
+
+    def __init__(
+        self,
+        db,
+        on_changed: Callable[[List[str]], Awaitable[None]],
+        on_finished: Optional[Callable[[dict], Awaitable[None]]] = None,
+        page_size: int = BUNNY_SYNC_PAGE_SIZE,
+        concurrency: int = BUNNY_SYNC_CONCURRENCY
+    ):
+        self.db = db
+        self.on_changed = on_changed
+        self.on_finished = on_finished
+        self.page_size = max(1, min(page_size, 1000))
+        self.concurrency = max(1, concurrency)
+        self.run: Optional[dict] = None
+        self.seen: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> dict:
+        """Insert a running run document and sync in the background; 409 if one is already running"""
+        now = datetime.utcnow()
+        # A run whose worker died never clears its flag; free the lock after BUNNY_SYNC_STALE_SECONDS
+        await self.db.bunny_sync_runs.update_many(
+            {"running": True, "updated_at": {"$lt": (now - timedelta(seconds=BUNNY_SYNC_STALE_SECONDS)).isoformat()}},
+            {"$set": {"status": BunnySyncStatus.INTERRUPTED.value, "error": "No progress reported"}, "$unset": {"running": ""}}
+        )
+        run = {
+            "id": str(uuid.uuid4()),
+            "status": BunnySyncStatus.RUNNING.value,
+            "started_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+            "finished_at": None,
+            "total_items": 0,
+            "total_pages": 0,
+            "pages_done": 0,
+            "failed_pages": [],
+            "seen": 0,
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "skipped_recent": 0,
+            "missing_in_bunny": None,
+            "missing_sample": [],
+            "error": None,
+        }
+        try:
+            await self.db.bunny_sync_runs.insert_one({**run, "running": True})
+        except DuplicateKeyError:
+            raise HTTPException(status_code=409, detail="A Bunny library sync is already running")
+        self.run = run
+        self.seen = set()
+        self._task = asyncio.create_task(self._execute())
+        return dict(run)
+
+    async def latest(self) -> Optional[dict]:
+        """The most recent run, as stored"""
+        return await self.db.bunny_sync_runs.find_one({}, {"_id": 0, "running": 0}, sort=[("started_at", -1)])
+
+    async def _save(self, finished: bool = False):
+        self.run["updated_at"] = datetime.utcnow().isoformat()
+        update = {"$set": {field: self.run[field] for field in _PROGRESS_FIELDS}}
+        if finished:
+            update["$unset"] = {"running": ""}
+        await self.db.bunny_sync_runs.update_one({"id": self.run["id"]}, update)
+
+    async def _apply_page(self, items: List[dict]):
+        items = [item for item in items if item.get("guid")]
+        if not items:
+            return
+        guids = [item["guid"] for item in items]
+        self.seen.update(guids)
+        existing: Dict[str, List[dict]] = {}
+        async for doc in self.db.videos.find(
+            {"video_id": {"$in": guids}},
+            {"_id": 0, "id": 1, "video_id": 1, "duration": 1, "thumbnail_url": 1, "upload_status": 1}
+        ):
+            existing.setdefault(doc["video_id"], []).append(doc)
+
+        now = datetime.utcnow()
+        operations, changed_ids, new_ids = [], [], []
+        for item in items:
+            fields = _bunny_fields(item)
+            upload_status = _upload_status(item.get("status"))
+            docs = existing.get(item["guid"])
+            if docs is None:
+                uploaded_at = _uploaded_at(item)
+                if uploaded_at is not None and (now - uploaded_at).total_seconds() < BUNNY_SYNC_MIN_AGE_SECONDS:
+                    self.run["skipped_recent"] += 1
+                    continue
+                video = _new_video(item, fields, upload_status)
+                # Upsert on video_id so a concurrent upload of the same guid is not duplicated
+                new_ids.append((len(operations), video["id"]))
+                operations.append(UpdateOne({"video_id": item["guid"]}, {"$setOnInsert": video}, upsert=True))
+                continue
+            # Rows without upload_status predate direct uploads and count as ready
+            for doc in docs:
+                changes = {key: value for key, value in fields.items() if doc.get(key) != value}
+                current_status = doc.get("upload_status", VideoUploadStatus.READY.value)
+                if upload_status and upload_status != current_status:
+                    changes["upload_status"] = upload_status
+                if not changes:
+                    self.run["unchanged"] += 1
+                    continue
+                operations.append(UpdateOne({"id": doc["id"]}, {"$set": {**changes, "updated_at": now.isoformat()}}))
+                changed_ids.append(doc["id"])
+
+        if operations:
+            result = await self.db.videos.bulk_write(operations, ordered=False)
+            self.run["updated"] += len(changed_ids)
+            # Only the upserts that inserted; the rest lost a race with another writer
+            created = [video_id for index, video_id in new_ids if index in result.upserted_ids]
+            self.run["created"] += len(created)
+            if changed_ids or created:
+                await self.on_changed(changed_ids + created)
+
+    async def _sync_page(self, page: int):
+        data = await list_bunny_videos(page, self.page_size)
+        await self._apply_page(data.get("items") or [])
+        self.run["pages_done"] += 1
+        self.run["seen"] = len(self.seen)
+        await self._save()
+
+    async def _count_missing(self):
+        # Uploads and deletes during the run can shift pages, so this is a list to
+        # review, not one to delete from
+        missing, sample = 0, []
+        async for doc in self.db.videos.find({"video_id": {"$nin": [None, ""]}}, {"_id": 0, "id": 1, "video_id": 1}):
+            if doc["video_id"] not in self.seen:
+                missing += 1
+                if len(sample) < BUNNY_SYNC_MISSING_SAMPLE:
+                    sample.append(doc["id"])
+        self.run["missing_in_bunny"] = missing
+        self.run["missing_sample"] = sample
+
+    async def _execute(self):
+        try:
+            first = await list_bunny_videos(1, self.page_size)
+            total_items = int(first.get("totalItems") or 0)
+            self.run["total_items"] = total_items
+            self.run["total_pages"] = max(1, math.ceil(total_items / self.page_size))
+            await self._apply_page(first.get("items") or [])
+            self.run["pages_done"] = 1
+            self.run["seen"] = len(self.seen)
+            await self._save()
+
+            pages = list(range(self.run["total_pages"], 1, -1))
+
+            async def worker():
+                while pages:
+                    page = pages.pop()
+                    try:
+                        await self._sync_page(page)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        # Skipped for this run; the next run picks it up
+                        logger.error(f"Bunny library sync: page {page} failed: {str(e)}")
+                        self.run["failed_pages"].append(page)
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pages)))))
+
+            if self.run["failed_pages"]:
+                self.run["failed_pages"].sort()
+                self.run["status"] = BunnySyncStatus.COMPLETED_WITH_ERRORS.value
+            else:
+                # Only meaningful when every page was read
+                await self._count_missing()
+                self.run["status"] = BunnySyncStatus.COMPLETED.value
+        except asyncio.CancelledError:
+            self.run["status"] = BunnySyncStatus.INTERRUPTED.value
+            raise
+        except Exception as e:
+            logger.error(f"Bunny library sync failed: {str(e)}")
+            self.run["status"] = BunnySyncStatus.FAILED.value
+            self.run["error"] = str(e)
+        finally:
+            self.run["finished_at"] = datetime.utcnow().isoformat()
+            self.run["seen"] = len(self.seen)
+            try:
+                await self._save(finished=True)
+            except Exception as e:
+                logger.error(f"Bunny library sync: could not save run {self.run['id']}: {str(e)}")
+            logger.info(
+                f"Bunny library sync {self.run['status']}: {self.run['seen']} seen, {self.run['created']} created, "
+                f"{self.run['updated']} updated, {len(self.run['failed_pages'])} pages failed"
+            )
+        if self.on_finished:
+            try:
+                await self.on_finished(dict(self.run))
+            except Exception as e:
+                logger.error(f"Bunny library sync: completion hook failed: {str(e)}")
+
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
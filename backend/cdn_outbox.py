@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+CDN_OUTBOX_BATCH_SIZE = int(os.environ.get("CDN_OUTBOX_BATCH_SIZE", "100"))
+# Deletions in flight per worker process; the Bunny dependencies cap connections on top of this
+CDN_OUTBOX_CONCURRENCY = int(os.environ.get("CDN_OUTBOX_CONCURRENCY", "8"))
+CDN_OUTBOX_MAX_ATTEMPTS = int(os.environ.get("CDN_OUTBOX_MAX_ATTEMPTS", "8"))
+CDN_OUTBOX_POLL_SECONDS = float(os.environ.get("CDN_OUTBOX_POLL_SECONDS", "10"))
+CDN_OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get("CDN_OUTBOX_RETRY_BASE_SECONDS", "30"))
+CDN_OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get("CDN_OUTBOX_RETRY_MAX_SECONDS", "3600"))
+# A claimed record is hidden from other workers this long; if its worker dies it is picked up again
+CDN_OUTBOX_LEASE_SECONDS = float(os.environ.get("CDN_OUTBOX_LEASE_SECONDS", "300"))
+# How long a record waits for its source row to disappear before it is dropped as a failed delete
+CDN_OUTBOX_SOURCE_GRACE_SECONDS = float(os.environ.get("CDN_OUTBOX_SOURCE_GRACE_SECONDS", "600"))
+
+# Kinds of CDN asset, each with its own deleter
+STREAM_VIDEO = "stream_video"
+STORAGE_FILE = "storage_file"
+
+PENDING = "pending"
+DEAD = "dead"
+
+# Returns True once the asset is gone (including "was already gone")
+Deleter = Callable[[str], Awaitable[bool]]
+
+
+def deletion_record(kind: str, target: str, collection: str, source_id: str) -> dict:
+    """Outbox entry for one CDN asset owned by the row `source_id` of `collection`"""
+    now = datetime.utcnow().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "kind": kind,
+        "target": target,
+        "source": {"collection": collection, "id": source_id},
+        "status": PENDING,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "last_error": None,
+        "created_at": now,
+    }
+
+
+async def ensure_outbox_indexes(db):
+    await db.cdn_deletions.create_index([("status", 1), ("next_attempt_at", 1)])
+    await db.cdn_deletions.create_index("id", unique=True)
+
+
+async def delete_with_outbox(db, collection: str, ids: List[str], records: List[dict]) -> int:
+    """
+    Delete rows and record their CDN assets for deletion, without calling the CDN.
+
+    The outbox records go in first and the rows second. If the row delete fails, the
+    records are withdrawn; if the process dies in between, the worker finds the source
+    row still present and leaves its assets alone. So an asset is only ever deleted
+    after its row, and a deleted row never loses its cleanup.
+    """
+    if records:
+        await db.cdn_deletions.insert_many(records, ordered=False)
+    try:
+        result = await db[collection].delete_many({"id": {"$in": ids}})
+    except Exception:
+        if records:
+            await db.cdn_deletions.delete_many({"id": {"$in": [record["id"] for record in records]}})
+        raise
+    return result.deleted_count
+
+
+class CdnDeletionWorker:
+    """Background task that drains the cdn_deletions outbox in batches"""
+
+    def __init__(
+        self,
+        db,
+        deleters: Dict[str, Deleter],
+        batch_size: int = CDN_OUTBOX_BATCH_SIZE,
+        concurrency: int = CDN_OUTBOX_CONCURRENCY,
+        max_attempts: int = CDN_OUTBOX_MAX_ATTEMPTS,
+        poll_seconds: float = CDN_OUTBOX_POLL_SECONDS
+    ):
+        self.db = db
+        self.deleters = deleters
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.totals: Dict[str, int] = {"deleted": 0, "retried": 0, "deferred": 0, "dead": 0, "dropped": 0}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self):
+        """New records were written; drain now instead of at the next poll"""
+        self._wake.set()
+
+    def _retry_at(self, attempts: int) -> str:
+        # Full jitter on an exponential backoff
+        delay = random.uniform(0, min(CDN_OUTBOX_RETRY_MAX_SECONDS, CDN_OUTBOX_RETRY_BASE_SECONDS * 2 ** attempts))
+        return (datetime.utcnow() + timedelta(seconds=delay)).isoformat()
+
+    async def _claim(self) -> List[dict]:
+        """Lease a batch of due records so other worker processes skip them"""
+        now = datetime.utcnow()
+        due = await self.db.cdn_deletions.find(
+            {"status": PENDING, "next_attempt_at": {"$lte": now.isoformat()}}, {"_id": 0, "id": 1}
+        ).sort("next_attempt_at", 1).limit(self.batch_size).to_list(self.batch_size)
+        if not due:
+            return []
+
+        lease = str(uuid.uuid4())
+        ids = [record["id"] for record in due]
+        await self.db.cdn_deletions.update_many(
+            {"id": {"$in": ids}, "status": PENDING, "next_attempt_at": {"$lte": now.isoformat()}},
+            {"$set": {
+                "lease": lease,
+                "next_attempt_at": (now + timedelta(seconds=CDN_OUTBOX_LEASE_SECONDS)).isoformat(),
+            }}
+        )
+        # Another worker may have claimed some of them in between; keep only ours
+        return await self.db.cdn_deletions.find({"id": {"$in": ids}, "lease": lease}, {"_id": 0}).to_list(self.batch_size)
+
+    async def _source_exists(self, records: List[dict]) -> set:
+        """(collection, id) of sources that still exist, one query per collection"""
+        by_collection: Dict[str, List[str]] = {}
+        for record in records:
+            by_collection.setdefault(record["source"]["collection"], []).append(record["source"]["id"])
+        existing = set()
+        for collection, ids in by_collection.items():
+            async for row in self.db[collection].find({"id": {"$in": ids}}, {"_id": 0, "id": 1}):
+                existing.add((collection, row["id"]))
+        return existing
+
+    async def _process(self, record: dict, existing: set, slots: asyncio.Semaphore) -> UpdateOne:
+        source = record["source"]
+        if (source["collection"], source["id"]) in existing:
+            age = datetime.utcnow() - datetime.fromisoformat(record["created_at"])
+            if age.total_seconds() < CDN_OUTBOX_SOURCE_GRACE_SECONDS:
+                # The row delete may still be on its way
+                self.totals["deferred"] += 1
+                return UpdateOne({"id": record["id"]}, {"$set": {"next_attempt_at": self._retry_at(0)}, "$unset": {"lease": ""}})
+            logger.warning(f"Dropping CDN deletion of {record['target']}: {source['collection']} {source['id']} still exists")
+            self.totals["dropped"] += 1
+            return DeleteOne({"id": record["id"]})
+
+        deleter = self.deleters.get(record["kind"])
+        error = None
+        try:
+            async with slots:
+                if deleter is None:
+                    error = f"No deleter for kind {record['kind']}"
+                elif await deleter(record["target"]):
+                    self.totals["deleted"] += 1
+                    return DeleteOne({"id": record["id"]})
+                else:
+                    error = "CDN refused the delete"
+        except UpstreamUnavailable as e:
+            # Bunny is down or its circuit is open: not this asset's fault, so no attempt is used up
+            self.totals["deferred"] += 1
+            return UpdateOne(
+                {"id": record["id"]},
+                {"$set": {"next_attempt_at": self._retry_at(record["attempts"]), "last_error": str(e.detail)}, "$unset": {"lease": ""}}
+            )
+        except Exception as e:
+            error = str(e)
+
+        attempts = record["attempts"] + 1
+        if attempts >= self.max_attempts:
+            logger.error(f"CDN deletion of {record['target']} dead-lettered after {attempts} attempt(s): {error}")
+            self.totals["dead"] += 1
+            return UpdateOne(
+                {"id": record["id"]},
+                {"$set": {"status": DEAD, "attempts": attempts, "last_error": error}, "$unset": {"lease": ""}}
+            )
+        self.totals["retried"] += 1
+        return UpdateOne(
+            {"id": record["id"]},
+            {"$set": {"attempts": attempts, "last_error": error, "next_attempt_at": self._retry_at(attempts)}, "$unset": {"lease": ""}}
+        )
+
+    async def run_once(self) -> int:
+        """Process one batch; returns how many records were claimed"""
+        records = await self._claim()
+        if not records:
+            return 0
+        existing = await self._source_exists(records)
+        slots = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*(self._process(record, existing, slots) for record in records))
+        try:
+            await self.db.cdn_deletions.bulk_write(outcomes, ordered=False)
+        except BulkWriteError as e:
+            logger.error(f"Recording CDN deletion outcomes failed: {e.details.get('writeErrors', [])[:3]}")
+        return len(records)
+
+    async def _loop(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"CDN deletion run failed: {str(e)}")
+                claimed = 0
+            if claimed >= self.batch_size:
+                continue  # More is due; keep draining
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stats(self) -> dict:
+        counts = {
+            row["_id"]: row["count"]
+            async for row in self.db.cdn_deletions.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        }
+        return {"pending": counts.get(PENDING, 0), "dead": counts.get(DEAD, 0), "since_start": dict(self.totals)}
+
+    async def requeue_dead(self) -> int:
+        result = await self.db.cdn_deletions.update_many(
+            {"status": DEAD},
+            {"$set": {"status": PENDING, "attempts": 0, "next_attempt_at": datetime.utcnow().isoformat()}}
+        )
+        self.notify()
+        return result.modified_count
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
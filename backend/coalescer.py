@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+COALESCE_FLUSH_SECONDS = float(os.environ.get("COALESCE_FLUSH_SECONDS", "5"))
+# Keys waiting before a flush is started early
+COALESCE_MAX_PENDING = int(os.environ.get("COALESCE_MAX_PENDING", "5000"))
+# Keys kept across failed flushes; beyond this the oldest failed batch is dropped
+COALESCE_MAX_BACKLOG = int(os.environ.get("COALESCE_MAX_BACKLOG", "100000"))
+
+
+class WriteCoalescer:
+    """
+    Merges writes per key in memory and hands them to `write` as one batch every
+    flush_seconds (sooner once max_pending keys are waiting), so however many calls
+    to add() arrive, the database sees at most one bulk write per interval.
+    A failed batch is merged back and retried with the next one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write: Callable[[Dict[Hashable, Any]], Awaitable[None]],
+        merge: Callable[[Any, Any], Any],
+        flush_seconds: float = COALESCE_FLUSH_SECONDS,
+        max_pending: int = COALESCE_MAX_PENDING,
+        max_backlog: int = COALESCE_MAX_BACKLOG
+    ):
+        self.name = name
+        self.write = write
+        self.merge = merge
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.max_backlog = max_backlog
+        self.pending: Dict[Hashable, Any] = {}
+        self.totals: Dict[str, int] = {"added": 0, "written": 0, "flushes": 0, "failed_flushes": 0, "dropped": 0}
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, key: Hashable, value: Any):
+        existing = self.pending.get(key)
+        self.pending[key] = value if existing is None else self.merge(existing, value)
+        self.totals["added"] += 1
+        if len(self.pending) >= self.max_pending:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Write everything pending; returns how many keys were written"""
+        if not self.pending:
+            return 0
+        # Swapped without awaiting, so add() calls during the write go to the next batch
+        batch, self.pending = self.pending, {}
+        try:
+            await self.write(batch)
+        except Exception as e:
+            self.totals["failed_flushes"] += 1
+            if len(self.pending) + len(batch) > self.max_backlog:
+                self.totals["dropped"] += len(batch)
+                logger.error(f"{self.name}: dropping {len(batch)} coalesced writes after a failed flush: {str(e)}")
+                return 0
+            logger.warning(f"{self.name}: flush of {len(batch)} keys failed, retrying with the next batch: {str(e)}")
+            newer, self.pending = self.pending, batch
+            for key, value in newer.items():
+                existing = self.pending.get(key)
+                self.pending[key] = value if existing is None else self.merge(existing, value)
+            return 0
+        self.totals["flushes"] += 1
+        self.totals["written"] += len(batch)
+        return len(batch)
+
+    async def _loop(self):
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {"pending": len(self.pending), **self.totals}
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Finish the flush in progress (never cancelled mid-write), then write what is left"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
@@ -0,0 +1,196 @@
+import importlib.util
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# Defaults per handle; each value can be overridden with MONGO_<HANDLE>_<SETTING>
+# primary   - writes and anything that must read its own writes (carts, orders, payments, admin CRUD)
+# analytics - dashboard aggregations, CSV exports and admin listings; scans, tolerant of lag
+# catalog   - public catalogue reads (videos, products, programs, trainers, testimonials)
+HANDLE_DEFAULTS = {
+    "primary": {"read_preference": "primary", "max_staleness_seconds": -1, "max_pool_size": 100, "min_pool_size": 0},
+    "analytics": {"read_preference": "secondaryPreferred", "max_staleness_seconds": 120, "max_pool_size": 10, "min_pool_size": 0},
+    "catalog": {"read_preference": "secondaryPreferred", "max_staleness_seconds": 90, "max_pool_size": 50, "min_pool_size": 0},
+}
+
+
+def _default_compressors() -> str:
+    # zstd needs the optional zstandard package; zlib ships with Python
+    if importlib.util.find_spec("zstandard") is not None:
+        return "zstd,zlib"
+    return "zlib"
+
+
+MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", _default_compressors())
+# The driver's default heartbeatFrequencyMS
+HEARTBEAT_SECONDS = 10
+
+
+def _setting(handle: str, name: str):
+    value = os.environ.get(f"MONGO_{handle.upper()}_{name.upper()}")
+    default = HANDLE_DEFAULTS[handle][name]
+    if value is None:
+        return default
+    return type(default)(value)
+
+
+def _parse_tags(raw: Optional[str]) -> Optional[List[Dict[str, str]]]:
+    """'nodeType:ANALYTICS,region:ap-south-1' -> [{'nodeType': 'ANALYTICS', 'region': 'ap-south-1'}, {}]"""
+    if not raw:
+        return None
+    tags = dict(pair.split(":", 1) for pair in raw.split(",") if ":" in pair)
+    # The trailing empty set falls back to any eligible member when no node carries the tags
+    return [tags, {}]
+
+
+def read_preference_for(handle: str):
+    mode = _setting(handle, "read_preference")
+    if mode not in READ_PREFERENCES:
+        raise RuntimeError(f"MONGO_{handle.upper()}_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}")
+    if mode == "primary":
+        return Primary()
+    return READ_PREFERENCES[mode](
+        tag_sets=_parse_tags(os.environ.get(f"MONGO_{handle.upper()}_READ_PREFERENCE_TAGS")),
+        max_staleness=_setting(handle, "max_staleness_seconds"),
+    )
+
+
+def max_read_lag_seconds(handle: str) -> Optional[float]:
+    """
+    Upper bound on how far behind the primary a read through this handle can be:
+    0 on the primary, maxStaleness plus one heartbeat (the driver's staleness
+    estimate is only refreshed that often) on secondaries, None when unbounded.
+    """
+    if _setting(handle, "read_preference") == "primary":
+        return 0.0
+    max_staleness = _setting(handle, "max_staleness_seconds")
+    if max_staleness < 0:
+        return None
+    return float(max_staleness + HEARTBEAT_SECONDS)
+
+
+class DeferredCollection:
+    """Collection handle that resolves its database on first use"""
+
+    def __init__(self, database: "DeferredDatabase", name: str):
+        self._database = database
+        self._name = name
+        self._target = None
+
+    def __getattr__(self, name: str):
+        if self._target is None:
+            self._target = self._database.resolve()[self._name]
+        return getattr(self._target, name)
+
+
+class DeferredDatabase:
+    """
+    Stands in for a database handle until a query needs it. Attribute access for a
+    collection name returns a DeferredCollection, so module-level code can hold
+    collections without building the client.
+    """
+
+    def __init__(self, router: "MongoRouter", handle: str):
+        self._router = router
+        self._handle = handle
+        self._collections: Dict[str, DeferredCollection] = {}
+
+    def resolve(self) -> AsyncIOMotorDatabase:
+        return self._router.database(self._handle)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if hasattr(AsyncIOMotorDatabase, name):
+            return getattr(self.resolve(), name)
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = DeferredCollection(self, name)
+        return collection
+
+    def __getitem__(self, name: str):
+        return self.resolve()[name]
+
+
+class MongoRouter:
+    """
+    Named database handles over one deployment. Handles with different pool settings
+    get their own client, so a burst of analytics scans cannot take connections from
+    the request path; each handle carries its own read preference.
+
+    Clients are built on first use rather than at import: for mongodb+srv URLs the
+    constructor does DNS lookups, which would otherwise sit on the cold-start path.
+    """
+
+    def __init__(self, mongo_url: str, db_name: str, event_listeners=None):
+        self.mongo_url = mongo_url
+        self.db_name = db_name
+        self.event_listeners = event_listeners or []
+        self.clients: Dict[Tuple[int, int], AsyncIOMotorClient] = {}
+        self.handles: Dict[str, AsyncIOMotorDatabase] = {}
+        self.deferred = {handle: DeferredDatabase(self, handle) for handle in HANDLE_DEFAULTS}
+
+    def database(self, handle: str) -> AsyncIOMotorDatabase:
+        database = self.handles.get(handle)
+        if database is None:
+            pool = (_setting(handle, "max_pool_size"), _setting(handle, "min_pool_size"))
+            client = self.clients.get(pool)
+            if client is None:
+                client = AsyncIOMotorClient(
+                    self.mongo_url,
+                    maxPoolSize=pool[0],
+                    minPoolSize=pool[1],
+                    compressors=MONGO_COMPRESSORS,
+                    event_listeners=self.event_listeners,
+                )
+                self.clients[pool] = client
+            database = self.handles[handle] = client.get_database(
+                self.db_name, read_preference=read_preference_for(handle)
+            )
+        return database
+
+    @property
+    def primary(self) -> DeferredDatabase:
+        return self.deferred["primary"]
+
+    @property
+    def analytics(self) -> DeferredDatabase:
+        return self.deferred["analytics"]
+
+    @property
+    def catalog(self) -> DeferredDatabase:
+        return self.deferred["catalog"]
+
+    def describe(self) -> Dict[str, dict]:
+        described = {}
+        for name in HANDLE_DEFAULTS:
+            handle = self.database(name)
+            described[name] = {
+                "read_preference": handle.read_preference.document,
+                "max_pool_size": handle.client.options.pool_options.max_pool_size,
+                "compressors": MONGO_COMPRESSORS,
+            }
+        return described
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
@@ -0,0 +1,282 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "1000"))
+EVENT_DRAIN_TIMEOUT_SECONDS = float(os.environ.get("EVENT_DRAIN_TIMEOUT_SECONDS", "10"))
+
+
+# ==================== EVENT TYPES ====================
+
+class DomainEvent(BaseModel):
+    """Base class for everything published on the event bus"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    occurred_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def event_name(cls) -> str:
+        return cls.__name__
+
+
+class VideoUploaded(DomainEvent):
+    video_id: str
+    title: str
+
+
+class ProductLowStock(DomainEvent):
+    product_id: str
+    name: str
+    stock: int
+
+
+class OrderCreated(DomainEvent):
+    order_id: str
+    customer_name: str
+    total_amount: float
+
+
+class BookingCreated(DomainEvent):
+    booking_id: str
+    user_name: str
+    program_title: str
+    attendance_type: str
+    booking_date: str
+
+
+class PaymentFailed(DomainEvent):
+    razorpay_order_id: str
+
+
+class CatalogBulkChanged(DomainEvent):
+    """One admin bulk update or delete, however many items it touched"""
+    resource: str
+    action: str
+    count: int
+    ids: List[str] = []
+
+
+EVENT_TYPES: Dict[str, Type[DomainEvent]] = {
+    cls.event_name(): cls
+    for cls in (VideoUploaded, ProductLowStock, OrderCreated, BookingCreated, PaymentFailed, CatalogBulkChanged)
+}
+
+
+def register_event_type(cls: Type[DomainEvent]) -> Type[DomainEvent]:
+    """Make an event type known to the outbox so it can be replayed"""
+    EVENT_TYPES[cls.event_name()] = cls
+    return cls
+
+
+# ==================== SUBSCRIPTIONS ====================
+
+EventHandler = Callable[[List[DomainEvent]], Awaitable[None]]
+
+
+class Subscription:
+    """A named handler with its own bounded queue and worker task"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: EventHandler,
+        event_types: Optional[Iterable[Type[DomainEvent]]] = None,
+        maxsize: int = EVENT_QUEUE_SIZE,
+        batch_size: int = 1,
+        batch_interval: float = 0.0,
+    ):
+        self.name = name
+        self.handler = handler
+        self.event_names = {t.event_name() for t in event_types} if event_types else None
+        self.maxsize = maxsize
+        self.batch_size = max(1, batch_size)
+        self.batch_interval = batch_interval
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def accepts(self, event: DomainEvent) -> bool:
+        return self.event_names is None or event.event_name() in self.event_names
+
+    async def _next_batch(self) -> List[DomainEvent]:
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_interval
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": self.maxsize,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
+
+
+# ==================== EVENT BUS ====================
+
+class EventBus:
+    """
+    In-process publish/subscribe bus that keeps side effects off the request path.
+    Each subscription drains its own bounded queue; when a queue is full the event
+    is dropped for that subscriber and counted. With an outbox collection configured,
+    events are persisted before dispatch, and replay_outbox() re-dispatches the ones
+    a subscriber never acknowledged. start() touches no database, so requests can
+    publish before the replay has run. Every worker replays, including
+    events another live worker is still handling, so outbox subscribers must be
+    idempotent on event.id.
+    """
+
+    def __init__(self, outbox=None):
+        self.outbox = outbox
+        self.subscriptions: List[Subscription] = []
+        self.published = 0
+        self._running = False
+        self._started_at: Optional[str] = None
+        self._replayed = False
+
+    def subscribe(self, name: str, handler: EventHandler, **options) -> Subscription:
+        subscription = Subscription(name, handler, **options)
+        self.subscriptions.append(subscription)
+        if self._running:
+            self._start_subscription(subscription)
+        return subscription
+
+    def _start_subscription(self, subscription: Subscription):
+        subscription.queue = asyncio.Queue(maxsize=subscription.maxsize)
+        subscription.task = asyncio.create_task(self._worker(subscription))
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._started_at = datetime.utcnow().isoformat()
+        self._replayed = False
+        for subscription in self.subscriptions:
+            self._start_subscription(subscription)
+        logger.info(f"Event bus started with {len(self.subscriptions)} subscription(s)")
+
+    async def stop(self, timeout: float = EVENT_DRAIN_TIMEOUT_SECONDS):
+        """Give subscribers a chance to drain their queues, then cancel the workers"""
+        if not self._running:
+            return
+        self._running = False
+        pending = [s.queue.join() for s in self.subscriptions if s.queue is not None]
+        if pending:
+            try:
+                await asyncio.wait_for(asyncio.gather(*pending), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Event bus shutdown timed out with events still queued")
+        for subscription in self.subscriptions:
+            if subscription.task:
+                subscription.task.cancel()
+        await asyncio.gather(*(s.task for s in self.subscriptions if s.task), return_exceptions=True)
+        logger.info("Event bus stopped")
+
+    async def publish(self, event: DomainEvent):
+        """Queue an event for every interested subscriber without waiting on them"""
+        self.published += 1
+        if self.outbox is not None:
+            try:
+                await self.outbox.insert_one({
+                    "id": event.id,
+                    "event_type": event.event_name(),
+                    "payload": event.model_dump(mode="json"),
+                    "pending_subscribers": [s.name for s in self.subscriptions if s.accepts(event)],
+                    "created_at": event.occurred_at.isoformat(),
+                })
+            except Exception as e:
+                logger.error(f"Failed to persist event {event.event_name()} to outbox: {str(e)}")
+        self._dispatch(event)
+
+    def _dispatch(self, event: DomainEvent, only: Optional[Subscription] = None):
+        for subscription in self.subscriptions:
+            if only is not None and subscription is not only:
+                continue
+            if not subscription.accepts(event) or subscription.queue is None:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscription.dropped += 1
+                logger.warning(
+                    f"Event queue full for subscriber '{subscription.name}', dropping {event.event_name()}"
+                )
+
+    async def _worker(self, subscription: Subscription):
+        while True:
+            batch = await subscription._next_batch()
+            try:
+                await subscription.handler(batch)
+                subscription.delivered += len(batch)
+                subscription.batches += 1
+                if self.outbox is not None:
+                    await self._acknowledge(subscription, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                subscription.failed += len(batch)
+                logger.error(f"Event subscriber '{subscription.name}' failed on {len(batch)} event(s): {str(e)}")
+            finally:
+                for _ in batch:
+                    subscription.queue.task_done()
+
+    async def _acknowledge(self, subscription: Subscription, batch: List[DomainEvent]):
+        try:
+            ids = [event.id for event in batch]
+            await self.outbox.update_many({"id": {"$in": ids}}, {"$pull": {"pending_subscribers": subscription.name}})
+            await self.outbox.delete_many({"id": {"$in": ids}, "pending_subscribers": []})
+        except Exception as e:
+            logger.warning(f"Failed to acknowledge outbox events for '{subscription.name}': {str(e)}")
+
+    async def replay_outbox(self):
+        """Re-dispatch outbox events left from before start(); runs once, after start()"""
+        if self.outbox is None or not self._running or self._replayed:
+            return
+        replayed = 0
+        for subscription in self.subscriptions:
+            # Later events were dispatched live by this worker
+            cursor = self.outbox.find(
+                {"pending_subscribers": subscription.name, "created_at": {"$lt": self._started_at}}, {"_id": 0}
+            ).sort("created_at", 1)
+            async for row in cursor:
+                event_cls = EVENT_TYPES.get(row.get("event_type"))
+                if event_cls is None:
+                    continue
+                self._dispatch(event_cls(**row["payload"]), only=subscription)
+                replayed += 1
+        self._replayed = True
+        if replayed:
+            logger.info(f"Replayed {replayed} undelivered event(s) from the outbox")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "published": self.published,
+            "outbox_enabled": self.outbox is not None,
+            "subscriptions": {s.name: s.stats() for s in self.subscriptions},
+        }
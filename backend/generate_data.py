@@ -0,0 +1,403 @@
+"""
+Deterministic bulk data generator for development and performance datasets.
+
+Replaces the old hand-written seed scripts. Every document is derived from the
+seed and its index, so the same arguments always produce the same data, and
+cross-references (orders -> users/products, bookings -> programs/trainers,
+chat -> users, comments -> videos) are consistent without holding id lists in
+memory. Passwords are hashed once per run, and batches are written with
+insert_many from concurrent workers.
+
+    python generate_data.py                                   # small demo dataset
+    python generate_data.py --users 100000 --orders 1000000 --chat 5000000 --workers 8
+
+Logins: admin@fitsphere.com / Admin@123, user0@fitsphere.test / password123
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from auth import hash_password
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+ADMIN_EMAIL = "admin@fitsphere.com"
+ADMIN_PASSWORD = "Admin@123"
+USER_PASSWORD = "password123"
+
+DEFAULT_COUNTS = {
+    "users": 1000,
+    "trainers": 20,
+    "programs": 50,
+    "products": 200,
+    "videos": 300,
+    "orders": 5000,
+    "bookings": 2000,
+    "chat": 20000,
+    "comments": 10000,
+}
+
+# Generation order; each entry maps a count to the collections it writes
+COLLECTIONS = {
+    "users": ["users"],
+    "trainers": ["trainers"],
+    "programs": ["programs"],
+    "products": ["products"],
+    "videos": ["videos"],
+    "orders": ["orders", "payments"],
+    "bookings": ["bookings"],
+    "chat": ["chat_messages"],
+    "comments": ["video_comments"],
+}
+# Derived state that would be stale against freshly generated data
+DERIVED_COLLECTIONS = ["admins", "carts", "notifications", "unread_counters"]
+
+FIRST_NAMES = ["Aarav", "Priya", "Ananya", "Rohan", "Meera", "Kavya", "Arjun", "Isha", "Vikram", "Sneha",
+               "Neha", "Rahul", "Divya", "Karan", "Pooja", "Aditya", "Riya", "Sanjay", "Tara", "Nikhil"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Gupta", "Nair", "Singh", "Menon", "Das", "Kapoor",
+              "Rao", "Joshi", "Verma", "Bose", "Mehta"]
+VIDEO_CATEGORIES = ["yoga", "cardio", "strength", "pilates", "dance", "meditation"]
+DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+PRODUCT_CATEGORIES = ["Equipment", "Apparel", "Supplements", "Accessories"]
+PROGRAM_CATEGORIES = ["Yoga", "Strength", "Cardio", "Weight Loss", "Pilates", "Dance"]
+TIME_SLOTS = ["06:00-07:00", "07:00-08:00", "09:00-10:00", "11:00-12:00", "16:00-17:00", "18:00-19:00", "19:00-20:00"]
+CHAT_LINES = ["Hi, I have a question about my order", "When does the next batch start?", "Thanks for the help!",
+              "Can I reschedule my session?", "Is the yoga mat back in stock?", "Your order has been shipped",
+              "Sure, we have moved your session", "Please share your order id"]
+COMMENT_LINES = ["Great workout!", "Loved this session", "Too hard for me but I'll keep trying",
+                 "Can you make a longer version?", "Perfect for mornings", "My favourite trainer"]
+
+
+def entity_id(seed: int, kind: str, index: int) -> str:
+    """Stable id of the index-th document of a kind, so references never need a lookup"""
+    namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"fitsphere-generator/{seed}")
+    return str(uuid.uuid5(namespace, f"{kind}:{index}"))
+
+
+class DataGenerator:
+    """Builds documents for a slice of one collection; stateless apart from small lookup tables"""
+
+    def __init__(self, counts: Dict[str, int], seed: int = 42, anchor: Optional[datetime] = None, history_days: int = 365):
+        self.counts = counts
+        self.seed = seed
+        self.anchor = anchor or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.history_seconds = history_days * 86400
+        self.namespace = uuid.uuid5(uuid.NAMESPACE_URL, f"fitsphere-generator/{seed}")
+        self.admin_id = self.entity_id("admins", 0)
+        # One bcrypt call per password instead of one per user
+        self.user_password_hash = hash_password(USER_PASSWORD)
+        self.admin_password_hash = hash_password(ADMIN_PASSWORD)
+
+        rng = self.rng("lookups", 0)
+        self.product_prices = [round(rng.uniform(199, 9999), 0) for _ in range(counts["products"])]
+        self.program_prices = [float(rng.choice([1999, 2999, 4999, 7999, 11999])) for _ in range(counts["programs"])]
+
+    def entity_id(self, kind: str, index: int) -> str:
+        # Same derivation as the module-level entity_id, with the namespace computed once
+        return str(uuid.uuid5(self.namespace, f"{kind}:{index}"))
+
+    def rng(self, kind: str, chunk: int) -> random.Random:
+        # Per-chunk streams keep output identical however the chunks are scheduled
+        return random.Random(f"{self.seed}:{kind}:{chunk}")
+
+    def timestamp(self, rng: random.Random) -> str:
+        return (self.anchor - timedelta(seconds=rng.randrange(self.history_seconds))).isoformat()
+
+    @staticmethod
+    def user_name(index: int) -> str:
+        return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+
+    @staticmethod
+    def user_email(index: int) -> str:
+        return f"user{index}@fitsphere.test"
+
+    @staticmethod
+    def product_name(index: int) -> str:
+        return f"{PRODUCT_CATEGORIES[index % len(PRODUCT_CATEGORIES)]} Item {index}"
+
+    @staticmethod
+    def program_title(index: int) -> str:
+        return f"{PROGRAM_CATEGORIES[index % len(PROGRAM_CATEGORIES)]} Program {index}"
+
+    @staticmethod
+    def trainer_name(index: int) -> str:
+        return f"Coach {DataGenerator.user_name(index * 7 + 3)}"
+
+    def admin(self) -> dict:
+        return {
+            "id": self.admin_id, "email": ADMIN_EMAIL, "name": "FitSphere Admin", "role": "admin",
+            "password_hash": self.admin_password_hash, "created_at": self.anchor.isoformat(),
+            "is_active": True, "last_login": None,
+        }
+
+    # ==================== BUILDERS ====================
+
+    def users(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        return {"users": [{
+            "id": self.entity_id("users", i), "email": self.user_email(i), "name": self.user_name(i),
+            "phone": f"+91 9{i:09d}", "password_hash": self.user_password_hash, "role": "user",
+            "created_at": self.timestamp(rng), "is_active": True,
+        } for i in range(start, end)]}
+
+    def trainers(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            docs.append({
+                "id": self.entity_id("trainers", i), "name": self.trainer_name(i),
+                "email": f"trainer{i}@fitsphere.test", "phone": f"+91 8{i:09d}",
+                "specialization": rng.choice(PROGRAM_CATEGORIES), "experience_years": rng.randint(1, 20),
+                "bio": "Certified coach helping members build strength and consistency.",
+                "image_url": None, "certifications": rng.sample(["ACE", "NASM-CPT", "RYT-200", "RYT-500", "CrossFit L1"], 2),
+                "is_active": True, "rating": round(rng.uniform(3.5, 5), 1), "total_sessions": rng.randint(0, 2000),
+                "created_at": created, "updated_at": created,
+            })
+        return {"trainers": docs}
+
+    def programs(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            home_visit = rng.random() < 0.3
+            docs.append({
+                "id": self.entity_id("programs", i), "title": self.program_title(i),
+                "description": "A structured multi-week program with guided sessions.",
+                "category": PROGRAM_CATEGORIES[i % len(PROGRAM_CATEGORIES)], "duration_weeks": rng.choice([4, 6, 8, 12, 16]),
+                "price": self.program_prices[i], "difficulty": rng.choice(DIFFICULTIES),
+                "trainer_id": self.entity_id("trainers", i % self.counts["trainers"]), "image_url": None,
+                "video_ids": [self.entity_id("videos", rng.randrange(self.counts["videos"])) for _ in range(3)] if self.counts["videos"] else [],
+                "sessions_per_week": rng.choice([2, 3, 4, 5]), "supports_gym_attendance": True,
+                "supports_home_visit": home_visit, "home_visit_additional_charge": 500.0 if home_visit else 0.0,
+                "is_active": True, "enrolled_count": rng.randint(0, 500), "created_at": created, "updated_at": created,
+            })
+        return {"programs": docs}
+
+    def products(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            docs.append({
+                "id": self.entity_id("products", i), "name": self.product_name(i),
+                "description": "Quality fitness gear for home and gym workouts.",
+                "price": self.product_prices[i], "discount": float(rng.choice([0, 0, 0, 5, 10, 15, 20])),
+                "stock": rng.choice([0, 3, 8]) if rng.random() < 0.05 else rng.randint(10, 500),
+                "category": PRODUCT_CATEGORIES[i % len(PRODUCT_CATEGORIES)], "sku": f"FS-{i:07d}", "rating": round(rng.uniform(3, 5), 1),
+                "image_urls": [], "is_active": rng.random() < 0.97, "created_at": created, "updated_at": created,
+            })
+        return {"products": docs}
+
+    def videos(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            guid = self.entity_id("bunny_videos", i)
+            docs.append({
+                "id": self.entity_id("videos", i), "title": f"{rng.choice(VIDEO_CATEGORIES).title()} Session {i}",
+                "category": rng.choice(VIDEO_CATEGORIES), "difficulty": rng.choice(DIFFICULTIES),
+                "duration": rng.randrange(300, 3600), "description": "Follow-along workout session.",
+                "video_url": f"https://vz-demo.b-cdn.net/{guid}/playlist.m3u8",
+                "embed_url": f"https://iframe.mediadelivery.net/embed/demo/{guid}", "video_id": guid,
+                "thumbnail_url": f"https://vz-demo.b-cdn.net/{guid}/thumbnail.jpg", "is_public": True,
+                "is_free": rng.random() < 0.7, "view_count": int(rng.paretovariate(1.2) * 50),
+                "created_at": created, "updated_at": created,
+            })
+        return {"videos": docs}
+
+    def orders(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        orders, payments = [], []
+        products = self.counts["products"]
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            order_id = self.entity_id("orders", i)
+            user_index = rng.randrange(self.counts["users"])
+            items = []
+            for product_index in rng.sample(range(products), min(products, rng.randint(1, 3))):
+                items.append({
+                    "product_id": self.entity_id("products", product_index),
+                    "product_name": self.product_name(product_index), "quantity": rng.randint(1, 3),
+                    "price": self.product_prices[product_index], "product_image_url": None,
+                })
+            total = round(sum(item["price"] * item["quantity"] for item in items), 2)
+            outcome = rng.random()
+            payment_status = "success" if outcome < 0.85 else "failed" if outcome < 0.95 else "pending"
+            razorpay_order_id = f"order_{order_id.replace('-', '')[:14]}"
+            payment_id = f"pay_{order_id.replace('-', '')[-14:]}" if payment_status == "success" else None
+            if payment_status == "success":
+                order_status = rng.choice(["processing", "shipped", "delivered", "delivered", "delivered"])
+            else:
+                order_status = "placed" if payment_status == "pending" else "cancelled"
+            orders.append({
+                "order_id": order_id, "id": order_id, "user_id": self.entity_id("users", user_index),
+                "items": items, "product_ids": [item["product_id"] for item in items],
+                "total_quantity": sum(item["quantity"] for item in items), "total_amount": total,
+                "customer_name": self.user_name(user_index), "customer_email": self.user_email(user_index),
+                "customer_phone": f"+91 9{user_index:09d}", "shipping_address": f"{rng.randint(1, 999)} MG Road, Bengaluru",
+                "order_status": order_status, "payment_status": payment_status, "payment_id": payment_id,
+                "razorpay_order_id": razorpay_order_id, "delivery_date": None,
+                "estimated_delivery_date": None, "estimated_delivery_time": None,
+                "created_at": created, "updated_at": created,
+            })
+            if payment_status != "pending":
+                payments.append({
+                    "id": self.entity_id("payments", i), "order_id": order_id,
+                    "user_id": self.entity_id("users", user_index),
+                    "razorpay_payment_id": payment_id or f"pay_failed_{i}", "razorpay_order_id": razorpay_order_id,
+                    "razorpay_signature": "generated", "amount": total, "status": payment_status, "created_at": created,
+                })
+        return {"orders": orders, "payments": payments}
+
+    def bookings(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            user_index = rng.randrange(self.counts["users"])
+            program_index = rng.randrange(self.counts["programs"])
+            trainer_index = program_index % self.counts["trainers"]
+            status = rng.choice(["pending", "confirmed", "confirmed", "completed", "completed", "cancelled"])
+            docs.append({
+                "id": self.entity_id("bookings", i), "user_id": self.entity_id("users", user_index),
+                "user_name": self.user_name(user_index), "user_email": self.user_email(user_index),
+                "user_phone": f"+91 9{user_index:09d}", "program_id": self.entity_id("programs", program_index),
+                "program_title": self.program_title(program_index), "trainer_id": self.entity_id("trainers", trainer_index),
+                "trainer_name": self.trainer_name(trainer_index),
+                "booking_date": (datetime.fromisoformat(created) + timedelta(days=rng.randint(1, 14))).strftime("%Y-%m-%d"),
+                "time_slot": rng.choice(TIME_SLOTS), "attendance_type": "gym", "user_location": None,
+                "gym_location": None, "status": status, "notes": None,
+                "payment_status": "success" if status in ("confirmed", "completed") else "pending",
+                "payment_id": None, "razorpay_order_id": None, "amount": self.program_prices[program_index],
+                "created_at": created, "updated_at": created,
+            })
+        return {"bookings": docs}
+
+    def chat(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        recent_cutoff = (self.anchor - timedelta(days=2)).isoformat()
+        for i in range(start, end):
+            created = self.timestamp(rng)
+            user_index = rng.randrange(self.counts["users"])
+            from_user = rng.random() < 0.6
+            docs.append({
+                "id": self.entity_id("chat", i),
+                "sender_id": self.entity_id("users", user_index) if from_user else self.admin_id,
+                "sender_name": self.user_name(user_index) if from_user else "FitSphere Admin",
+                "sender_role": "user" if from_user else "admin",
+                "receiver_id": None if from_user else self.entity_id("users", user_index),
+                "message": rng.choice(CHAT_LINES), "created_at": created,
+                # Only recent messages are still unread
+                "is_read": created < recent_cutoff or rng.random() < 0.5,
+            })
+        return {"chat_messages": docs}
+
+    def comments(self, rng: random.Random, start: int, end: int) -> Dict[str, List[dict]]:
+        docs = []
+        for i in range(start, end):
+            user_index = rng.randrange(self.counts["users"])
+            docs.append({
+                "id": self.entity_id("comments", i),
+                "video_id": self.entity_id("videos", int(rng.paretovariate(1.1)) % self.counts["videos"]),
+                "user_id": self.entity_id("users", user_index), "user_name": self.user_name(user_index),
+                "text": rng.choice(COMMENT_LINES), "created_at": self.timestamp(rng),
+            })
+        return {"video_comments": docs}
+
+    def builder(self, kind: str) -> Callable[[random.Random, int, int], Dict[str, List[dict]]]:
+        return getattr(self, kind)
+
+
+def validate_counts(counts: Dict[str, int]):
+    for kind, parents in (
+        ("orders", ["users", "products"]), ("bookings", ["users", "programs", "trainers"]),
+        ("programs", ["trainers"]), ("chat", ["users"]), ("comments", ["users", "videos"]),
+    ):
+        if counts[kind] and not all(counts[parent] for parent in parents):
+            raise SystemExit(f"--{kind} needs at least one of each: {', '.join(parents)}")
+
+
+async def load(db, generator: DataGenerator, batch_size: int = 5000, workers: int = 4, drop: bool = True, log=print) -> Dict[str, int]:
+    """Write every collection in generation order; returns documents written per collection"""
+    if drop:
+        for collections in COLLECTIONS.values():
+            for name in collections:
+                await db[name].drop()
+        for name in DERIVED_COLLECTIONS:
+            await db[name].drop()
+
+    await db.admins.update_one({"email": ADMIN_EMAIL}, {"$setOnInsert": generator.admin()}, upsert=True)
+
+    written: Dict[str, int] = {}
+    for kind, collections in COLLECTIONS.items():
+        total = generator.counts[kind]
+        if not total:
+            continue
+        started = time.perf_counter()
+        chunks = iter(range(0, (total + batch_size - 1) // batch_size))
+        build = generator.builder(kind)
+
+        async def worker():
+            # Workers share one chunk iterator, so each chunk is built and written exactly once
+            for chunk in chunks:
+                start = chunk * batch_size
+                docs = build(generator.rng(kind, chunk), start, min(start + batch_size, total))
+                for name, rows in docs.items():
+                    if rows:
+                        await db[name].insert_many(rows, ordered=False)
+                        written[name] = written.get(name, 0) + len(rows)
+
+        await asyncio.gather(*(worker() for _ in range(max(1, workers))))
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{written.get(name, 0)} {name}" for name in collections)
+        log(f"✅ {summary} in {elapsed:.1f}s")
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for kind, default in DEFAULT_COUNTS.items():
+        parser.add_argument(f"--{kind}", type=int, default=default, help=f"number of {kind} (default {default})")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", help="ISO date the generated history ends at (default: today, UTC)")
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4, help="concurrent insert_many writers")
+    parser.add_argument("--append", action="store_true", help="keep existing data instead of dropping it first")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL"))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME"))
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    if not args.mongo_url or not args.db_name:
+        raise SystemExit("Set MONGO_URL and DB_NAME (or pass --mongo-url and --db-name)")
+
+    counts = {kind: getattr(args, kind) for kind in DEFAULT_COUNTS}
+    validate_counts(counts)
+    anchor = datetime.fromisoformat(args.anchor) if args.anchor else None
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    try:
+        print(f"🌱 Generating data into {args.db_name} (seed {args.seed})...")
+        started = time.perf_counter()
+        generator = DataGenerator(counts, seed=args.seed, anchor=anchor, history_days=args.history_days)
+        written = await load(
+            client[args.db_name], generator, batch_size=args.batch_size, workers=args.workers, drop=not args.append
+        )
+        print(f"🎉 Wrote {sum(written.values())} documents in {time.perf_counter() - started:.1f}s")
+        print(f"   Admin: {ADMIN_EMAIL} / {ADMIN_PASSWORD}")
+        print(f"   Users: {DataGenerator.user_email(0)} ... / {USER_PASSWORD}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from pymongo import ReturnDocument
+
+from metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_ENABLED = os.environ.get("HTTP_CACHE_ENABLED", "true").lower() == "true"
+# How quickly other workers notice a version bump made elsewhere
+CACHE_VERSION_POLL_SECONDS = float(os.environ.get("CACHE_VERSION_POLL_SECONDS", "2"))
+# A new version only issues ETags once it has been known this long. The server raises
+# it to the catalog handle's worst-case replication lag, so that a body read from a
+# lagging secondary is never tagged with a version it predates
+CACHE_VERSION_SETTLE_SECONDS = float(os.environ.get("CACHE_VERSION_SETTLE_SECONDS", "1"))
+
+# Cache-Control per resource: browsers revalidate after max-age (a cheap 304), the CDN
+# edge keeps its copy for s-maxage and may serve it stale while it revalidates
+CACHE_POLICIES = {
+    "videos": "public, max-age=60, s-maxage=300, stale-while-revalidate=600",
+    "products": "public, max-age=30, s-maxage=60, stale-while-revalidate=300",
+    "programs": "public, max-age=300, s-maxage=600, stale-while-revalidate=3600",
+    "trainers": "public, max-age=300, s-maxage=600, stale-while-revalidate=3600",
+    "testimonials": "public, max-age=300, s-maxage=900, stale-while-revalidate=3600",
+    "gym_settings": "public, max-age=600, s-maxage=3600, stale-while-revalidate=86400",
+}
+
+# Public GET routes whose body depends only on the URL and one resource version
+CACHED_ROUTES: List[Tuple[Pattern, str]] = [
+    (re.compile(r"^/api/videos/public$"), "videos"),
+    (re.compile(r"^/api/products$"), "products"),
+    (re.compile(r"^/api/products/[^/]+$"), "products"),
+    (re.compile(r"^/api/programs$"), "programs"),
+    (re.compile(r"^/api/programs/[^/]+$"), "programs"),
+    (re.compile(r"^/api/trainers$"), "trainers"),
+    (re.compile(r"^/api/trainers/[^/]+$"), "trainers"),
+    (re.compile(r"^/api/testimonials$"), "testimonials"),
+    (re.compile(r"^/api/gym-settings$"), "gym_settings"),
+]
+
+
+def cached_resource(path: str) -> Optional[str]:
+    for pattern, resource in CACHED_ROUTES:
+        if pattern.match(path):
+            return resource
+    return None
+
+
+def make_etag(resource: str, version: int, path: str, query_string: bytes) -> str:
+    """Strong validator: same resource version and same URL always render the same body"""
+    variant = hashlib.sha1(path.encode() + b"?" + query_string).hexdigest()[:16]
+    return f'"{resource}-{version}-{variant}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResourceVersions:
+    """
+    Version counter per cacheable resource, stored in Mongo so every worker agrees.
+    Reads come from a local map refreshed by a poller, so validating a conditional
+    request never waits on the database.
+    """
+
+    def __init__(
+        self,
+        collection,
+        poll_interval: float = CACHE_VERSION_POLL_SECONDS,
+        settle_seconds: float = CACHE_VERSION_SETTLE_SECONDS
+    ):
+        self.collection = collection
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        # resource -> (version, monotonic time this worker first saw it)
+        self.versions: Dict[str, Tuple[int, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, resource: str) -> Optional[int]:
+        """Current version, or None while it is unknown or still settling"""
+        entry = self.versions.get(resource)
+        if entry is None or time.monotonic() - entry[1] < self.settle_seconds:
+            return None
+        return entry[0]
+
+    def latest(self, resource: str) -> Optional[int]:
+        """Newest version this worker knows of, settled or not"""
+        entry = self.versions.get(resource)
+        return entry[0] if entry else None
+
+    def _observe(self, resource: str, version: int, settled: bool = False):
+        current = self.versions.get(resource)
+        if current is None or current[0] != version:
+            seen_at = time.monotonic() - (self.settle_seconds if settled else 0)
+            self.versions[resource] = (version, seen_at)
+
+    async def refresh(self, settled: bool = False):
+        rows = await self.collection.find({}, {"_id": 1, "version": 1}).to_list(None)
+        for row in rows:
+            self._observe(row["_id"], row.get("version", 0), settled)
+
+    async def bump(self, *resources: str):
+        """Invalidate cached representations after a write"""
+        for resource in resources:
+            try:
+                row = await self.collection.find_one_and_update(
+                    {"_id": resource},
+                    {"$inc": {"version": 1}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                self._observe(resource, row["version"])
+            except Exception as e:
+                # Without the bump cached copies outlive the write; drop the local entry so this worker stops validating
+                self.versions.pop(resource, None)
+                logger.error(f"Failed to bump cache version for {resource}: {str(e)}")
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache version refresh failed: {str(e)}")
+
+    async def start(self):
+        # Every resource gets a version up front so ETags are issued from the first request
+        for resource in CACHE_POLICIES:
+            await self.collection.update_one({"_id": resource}, {"$setOnInsert": {"version": 1}}, upsert=True)
+        # Versions present at startup predate this process, so they are usable immediately
+        await self.refresh(settled=True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class ConditionalGetMiddleware:
+    """
+    Adds strong ETags and Cache-Control to the public catalogue GETs and answers
+    matching If-None-Match requests with 304 before the route runs, so a
+    revalidation costs neither a Mongo query nor serialization.
+    """
+
+    def __init__(self, app, versions: ResourceVersions):
+        self.app = app
+        self.versions = versions
+
+    async def __call__(self, scope, receive, send):
+        if not HTTP_CACHE_ENABLED or scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        resource = cached_resource(scope["path"])
+        version = self.versions.get(resource) if resource else None
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+
+        etag = make_etag(resource, version, scope["path"], scope.get("query_string", b""))
+        cache_headers = [
+            (b"etag", etag.encode("latin-1")),
+            (b"cache-control", CACHE_POLICIES[resource].encode("latin-1")),
+        ]
+
+        if_none_match = None
+        for name, value in scope.get("headers", []):
+            if name == b"if-none-match":
+                if_none_match = value.decode("latin-1")
+                break
+
+        if if_none_match is not None and _etag_matches(if_none_match, etag):
+            record_cache_lookup("http_etag", True)
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        record_cache_lookup("http_etag", False)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in (b"etag", b"cache-control")
+                ]
+                message["headers"] = headers + cache_headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,176 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+
+from bunny_cdn import delete_from_bunny_cdn, upload_bytes_to_bunny_storage
+
+logger = logging.getLogger(__name__)
+
+# Target widths for srcset; widths above the original are skipped rather than upscaled
+IMAGE_VARIANT_WIDTHS = sorted(
+    {int(w) for w in os.environ.get("IMAGE_VARIANT_WIDTHS", "320,640,1024,1600").split(",") if w.strip()},
+    reverse=True
+)
+# Formats to produce, most preferred first; a format this Pillow build cannot encode is dropped
+IMAGE_VARIANT_FORMATS = [f.strip().lower() for f in os.environ.get("IMAGE_VARIANT_FORMATS", "avif,webp").split(",") if f.strip()]
+IMAGE_VARIANT_QUALITY = {
+    "webp": int(os.environ.get("IMAGE_WEBP_QUALITY", "80")),
+    "avif": int(os.environ.get("IMAGE_AVIF_QUALITY", "55")),
+}
+IMAGE_PROCESS_WORKERS = int(os.environ.get("IMAGE_PROCESS_WORKERS", "2"))
+# Refuse to decode anything larger than this; guards the workers against decompression bombs
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", str(40_000_000)))
+
+CONTENT_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+# Leading bytes of the formats accepted for upload
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Image format from the first bytes of a file, or None; the client's Content-Type is not trusted"""
+    for signature, kind in _SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "avif"
+    return None
+
+
+def _encodable_formats() -> List[str]:
+    from PIL import features
+    return [fmt for fmt in IMAGE_VARIANT_FORMATS if fmt in CONTENT_TYPES and features.check(fmt)]
+
+
+def _render(data: bytes, widths: List[int], formats: List[str], quality: Dict[str, int]) -> Tuple[int, int, List[Tuple[str, int, bytes]]]:
+    """
+    Runs in a worker process. Decodes once, then downsizes step by step from the widest
+    variant to the narrowest so each resize starts from the previous, smaller image.
+    """
+    from PIL import Image as PILImage, ImageOps
+
+    PILImage.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    with PILImage.open(io.BytesIO(data)) as source:
+        # Pillow only raises above twice MAX_IMAGE_PIXELS (below that it warns), so check the header size here
+        if source.width * source.height > IMAGE_MAX_PIXELS:
+            raise ValueError(f"Image is {source.width}x{source.height}, above IMAGE_MAX_PIXELS")
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+    original_width, original_height = image.size
+    targets = [w for w in widths if w < original_width] or [original_width]
+
+    rendered = []
+    current = image
+    for width in targets:
+        height = max(1, round(original_height * width / original_width))
+        if current.width != width:
+            current = current.resize((width, height), PILImage.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            buffer = io.BytesIO()
+            current.save(buffer, format=fmt.upper(), quality=quality[fmt])
+            rendered.append((fmt, width, buffer.getvalue()))
+    return original_width, original_height, rendered
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that holds Mongo client threads and a running loop is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=IMAGE_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_image_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def render_variants(data: bytes) -> Tuple[int, int, List[Tuple[str, int, bytes]]]:
+    """(width, height, [(format, width, encoded bytes)]) computed off the event loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _pool(), _render, data, IMAGE_VARIANT_WIDTHS, _encodable_formats(), IMAGE_VARIANT_QUALITY
+        )
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image); the pool cannot be reused, so start a fresh one next time
+        shutdown_image_pool()
+        raise
+
+
+def variant_path(destination_path: str, fmt: str, width: int) -> str:
+    stem = destination_path.rsplit(".", 1)[0]
+    return f"{stem}_{width}w.{fmt}"
+
+
+async def upload_image_with_variants(data: bytes, destination_path: str) -> dict:
+    """
+    Upload the original plus its resized WebP/AVIF variants, all concurrently; the storage
+    dependency caps transfers in flight per process and retries transient failures.
+    Returns the original's CDN URL and a variants map {format: {width: url}} for srcset.
+    `data` is one of the formats sniff_image_type recognises (JPEG, PNG, GIF, WebP,
+    AVIF). If Pillow cannot render it, e.g. because it is over IMAGE_MAX_PIXELS or this
+    Pillow build cannot decode AVIF, the original is stored without variants.
+    """
+    # The original goes up while the variants are still being encoded
+    original_upload = asyncio.ensure_future(upload_bytes_to_bunny_storage(data, destination_path))
+    try:
+        width, height, rendered = await render_variants(data)
+    except Exception as e:
+        logger.warning(f"Could not render variants for {destination_path}: {str(e)}")
+        width, height, rendered = None, None, []
+
+    results = await asyncio.gather(*[
+        upload_bytes_to_bunny_storage(content, variant_path(destination_path, fmt, w), CONTENT_TYPES[fmt])
+        for fmt, w, content in rendered
+    ], return_exceptions=True)
+    try:
+        original = await original_upload
+    except Exception:
+        # Without the original the image is not saved, so nothing would ever delete these
+        uploaded = [
+            variant_path(destination_path, fmt, w)
+            for (fmt, w, _), result in zip(rendered, results) if not isinstance(result, BaseException)
+        ]
+        for path, deleted in zip(uploaded, await asyncio.gather(
+            *(delete_from_bunny_cdn(path) for path in uploaded), return_exceptions=True
+        )):
+            if deleted is not True:
+                logger.warning(f"Orphaned image variant left on the CDN: {path}")
+        raise
+
+    variants: Dict[str, Dict[str, str]] = {}
+    for (fmt, w, _), result in zip(rendered, results):
+        if isinstance(result, BaseException):
+            # The original is enough to display the image; a missing size only narrows the srcset
+            logger.warning(f"Variant upload failed for {variant_path(destination_path, fmt, w)}: {str(result)}")
+            continue
+        variants.setdefault(fmt, {})[str(w)] = result["cdn_url"]
+
+    return {"cdn_url": original["cdn_url"], "variants": variants, "width": width, "height": height}
+
+
+def variant_urls(variants: Optional[Dict[str, Dict[str, str]]]) -> List[str]:
+    return [url for by_width in (variants or {}).values() for url in by_width.values()]
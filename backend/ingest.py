@@ -0,0 +1,268 @@
+import hashlib
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from bunny_cdn import delete_bunny_stream_video, upload_video_to_bunny_stream
+from cdn_outbox import STORAGE_FILE, STREAM_VIDEO, deletion_record
+from image_variants import sniff_image_type, upload_image_with_variants, variant_path, variant_urls
+
+logger = logging.getLogger(__name__)
+
+INGEST_CHUNK_BYTES = int(os.environ.get("INGEST_CHUNK_BYTES", str(64 * 1024)))
+IMAGE_UPLOAD_MAX_BYTES = int(os.environ.get("IMAGE_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+VIDEO_UPLOAD_MAX_BYTES = int(os.environ.get("VIDEO_UPLOAD_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+IMAGE_CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+VIDEO_CONTENT_TYPES = {
+    "mp4": "video/mp4",
+    "mov": "video/quicktime",
+    "webm": "video/webm",
+    "mkv": "video/x-matroska",
+    "avi": "video/x-msvideo",
+    "ts": "video/mp2t",
+    "mpeg": "video/mpeg",
+}
+# ISO base media brands that are images rather than video
+_IMAGE_BRANDS = {b"avif", b"avis", b"heic", b"heix", b"mif1", b"msf1"}
+
+
+def sniff_video_type(head: bytes) -> Optional[str]:
+    """Video container from the first bytes of a file, or None"""
+    if head[4:8] == b"ftyp" and head[8:12] not in _IMAGE_BRANDS:
+        return "mov" if head[8:12] == b"qt  " else "mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm" if b"webm" in head[:64] else "mkv"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "avi"
+    if head[:1] == b"\x47" and head[188:189] == b"\x47":
+        return "ts"
+    if head.startswith(b"\x00\x00\x01\xba"):
+        return "mpeg"
+    return None
+
+
+class IngestedFile:
+    """An upload read once: its real type, size and SHA-256, and its bytes when they were kept"""
+
+    def __init__(self, file: UploadFile, kind: str, content_type: str, size: int, sha256: str, data: Optional[bytes]):
+        self.file = file
+        self.kind = kind
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.data = data
+
+    @property
+    def extension(self) -> str:
+        return "jpg" if self.kind == "jpeg" else self.kind
+
+
+async def ingest_upload(
+    file: UploadFile,
+    content_types: Dict[str, str],
+    sniff,
+    max_bytes: int,
+    label: str,
+    keep_bytes: bool = True
+) -> IngestedFile:
+    """
+    Stream an upload once: the type is sniffed from the first chunk (the client's
+    Content-Type is ignored), the size limit is enforced as chunks arrive, and the
+    SHA-256 is computed on the way. Large files are left in the upload's spool file
+    instead of memory when keep_bytes is False.
+    """
+    digest = hashlib.sha256()
+    chunks = [] if keep_bytes else None
+    kind = None
+    size = 0
+    while True:
+        chunk = await file.read(INGEST_CHUNK_BYTES)
+        if not chunk:
+            break
+        if kind is None:
+            kind = sniff(chunk)
+            if kind not in content_types:
+                supported = ", ".join(name.upper() for name in content_types)
+                raise HTTPException(status_code=400, detail=f"{label} must be one of: {supported}")
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"{label} exceeds the {max_bytes // 1024} KB limit")
+        digest.update(chunk)
+        if keep_bytes:
+            chunks.append(chunk)
+    if kind is None:
+        raise HTTPException(status_code=400, detail=f"{label} is empty")
+    if not keep_bytes:
+        await file.seek(0)
+    return IngestedFile(file, kind, content_types[kind], size, digest.hexdigest(), b"".join(chunks) if keep_bytes else None)
+
+
+async def ingest_image(file: UploadFile, max_bytes: int = IMAGE_UPLOAD_MAX_BYTES) -> IngestedFile:
+    return await ingest_upload(file, IMAGE_CONTENT_TYPES, sniff_image_type, max_bytes, "Image")
+
+
+async def ingest_video(file: UploadFile, max_bytes: int = VIDEO_UPLOAD_MAX_BYTES) -> IngestedFile:
+    return await ingest_upload(file, VIDEO_CONTENT_TYPES, sniff_video_type, max_bytes, "Video", keep_bytes=False)
+
+
+# ==================== CONTENT-ADDRESSED BLOBS ====================
+# One blobs row per distinct upload, keyed by SHA-256. ref_count counts the rows
+# pointing at it; the CDN copy is only queued for deletion once it drops to zero.
+
+async def ensure_blob_indexes(db):
+    await db.blobs.create_index("id", unique=True)
+    await db.blobs.create_index("cdn_url", sparse=True)
+    await db.blobs.create_index("video_id", sparse=True)
+
+
+async def _reuse_blob(db, sha256: str) -> Optional[dict]:
+    return await db.blobs.find_one_and_update(
+        {"id": sha256},
+        {"$inc": {"ref_count": 1}, "$set": {"last_used_at": datetime.utcnow().isoformat()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _register_blob(db, blob: dict) -> dict:
+    """Record a freshly uploaded blob; if the same content was registered meanwhile, that row wins"""
+    now = datetime.utcnow().isoformat()
+    for _ in range(2):
+        try:
+            return await db.blobs.find_one_and_update(
+                {"id": blob["id"]},
+                {
+                    "$setOnInsert": {**blob, "created_at": now},
+                    "$inc": {"ref_count": 1},
+                    "$set": {"last_used_at": now}
+                },
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            continue  # Lost an upsert race; the second try finds the winner's row
+    raise HTTPException(status_code=500, detail="Could not register uploaded file")
+
+
+async def store_image(db, ingested: IngestedFile, folder: str) -> dict:
+    """
+    CDN URL and variants for an ingested image. Content already on the CDN is reused
+    without touching Bunny; new content goes to <folder>/<sha256>.<ext>.
+    """
+    blob = await _reuse_blob(db, ingested.sha256)
+    if blob is None:
+        destination_path = f"{folder}/{ingested.sha256}.{ingested.extension}"
+        upload_result = await upload_image_with_variants(ingested.data, destination_path)
+        paths = [destination_path] + [
+            variant_path(destination_path, fmt, int(width))
+            for fmt, by_width in upload_result["variants"].items() for width in by_width
+        ]
+        blob = await _register_blob(db, {
+            "id": ingested.sha256,
+            "content_type": ingested.content_type,
+            "size": ingested.size,
+            "cdn_url": upload_result["cdn_url"],
+            "variants": upload_result["variants"],
+            "width": upload_result["width"],
+            "height": upload_result["height"],
+            "paths": paths,
+        })
+        deduplicated = False
+    else:
+        logger.info(f"Reusing stored image {blob['cdn_url']} for {ingested.file.filename}")
+        deduplicated = True
+    return {
+        "cdn_url": blob["cdn_url"],
+        "variants": blob.get("variants") or {},
+        "width": blob.get("width"),
+        "height": blob.get("height"),
+        "deduplicated": deduplicated,
+    }
+
+
+async def store_stream_video(db, ingested: IngestedFile, title: str) -> dict:
+    """Bunny Stream video for an ingested file, reusing the existing one if this content was uploaded before"""
+    blob = await _reuse_blob(db, ingested.sha256)
+    if blob is not None:
+        logger.info(f"Reusing Bunny Stream video {blob['video_id']} for {ingested.file.filename}")
+        return {**blob["urls"], "video_id": blob["video_id"], "deduplicated": True}
+
+    upload_result = await upload_video_to_bunny_stream(ingested.file, title, ingested.size)
+    urls = {key: upload_result[key] for key in ("embed_url", "playback_url", "thumbnail_url")}
+    blob = await _register_blob(db, {
+        "id": ingested.sha256,
+        "content_type": ingested.content_type,
+        "size": ingested.size,
+        "video_id": upload_result["video_id"],
+        "urls": urls,
+    })
+    if blob["video_id"] != upload_result["video_id"]:
+        # The same file finished uploading concurrently; keep theirs, drop ours
+        try:
+            await delete_bunny_stream_video(upload_result["video_id"])
+        except Exception as e:
+            logger.warning(f"Could not delete duplicate Bunny Stream video {upload_result['video_id']}: {str(e)}")
+    return {**blob["urls"], "video_id": blob["video_id"], "deduplicated": False}
+
+
+async def blob_owners(db, keys: Iterable[str]) -> Dict[str, dict]:
+    """Blob owning each of `keys` (a CDN URL, variant URL or Bunny video id), for keys a blob owns"""
+    keys = list({key for key in keys if key})
+    owners: Dict[str, dict] = {}
+    if not keys:
+        return owners
+    query = {"$or": [{"cdn_url": {"$in": keys}}, {"video_id": {"$in": keys}}]}
+    async for blob in db.blobs.find(query, {"_id": 0}):
+        for key in [blob.get("cdn_url"), blob.get("video_id")] + variant_urls(blob.get("variants")):
+            if key:
+                owners[key] = blob
+    return owners
+
+
+def owned_blob_ids(keys: Iterable[str], owners: Dict[str, dict]) -> List[str]:
+    """Blobs one row references through `keys`, each once"""
+    return list({owners[key]["id"] for key in keys if key in owners})
+
+
+async def release_blobs(db, blob_ids: List[str]) -> int:
+    """
+    Drop one reference per entry of `blob_ids` (a blob may appear several times).
+    Call after the referencing rows are deleted: a crash in between leaks a reference,
+    never deletes a file still in use. Blobs left unreferenced are removed and their
+    CDN copies handed to the cdn_deletions outbox; returns how many were queued.
+    """
+    records = []
+    for blob_id, count in Counter(blob_ids).items():
+        blob = await db.blobs.find_one_and_update(
+            {"id": blob_id},
+            {"$inc": {"ref_count": -count}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["ref_count"] > 0:
+            continue
+        # Only delete if nobody reused it in the meantime
+        deleted = await db.blobs.delete_one({"id": blob_id, "ref_count": {"$lte": 0}})
+        if not deleted.deleted_count:
+            continue
+        if blob.get("video_id"):
+            records.append(deletion_record(STREAM_VIDEO, blob["video_id"], "blobs", blob_id))
+        for path in blob.get("paths", []):
+            records.append(deletion_record(STORAGE_FILE, path, "blobs", blob_id))
+    if records:
+        await db.cdn_deletions.insert_many(records, ordered=False)
+    return len(records)
@@ -0,0 +1,45 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_lease_indexes(db):
+    await db.job_leases.create_index("name", unique=True)
+
+
+class JobLease:
+    """
+    A named lease in job_leases so that a periodic job runs in one worker process
+    at a time. acquire() takes a free or expired lease, or extends one this
+    instance already holds; it returns False while another worker holds it.
+    """
+
+    def __init__(self, db, name: str, seconds: float):
+        self.db = db
+        self.name = name
+        self.seconds = seconds
+        self.owner = str(uuid.uuid4())
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.db.job_leases.update_one(
+                {"name": self.name, "$or": [{"owner": self.owner}, {"lease_until": {"$lt": now.isoformat()}}]},
+                {"$set": {"owner": self.owner, "lease_until": (now + timedelta(seconds=self.seconds)).isoformat()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The row exists and is held by another worker, so the upsert tried to insert a second one
+            return False
+        return True
+
+    async def release(self):
+        try:
+            await self.db.job_leases.delete_one({"name": self.name, "owner": self.owner})
+        except Exception as e:
+            # Expires on its own
+            logger.warning(f"Could not release lease {self.name}: {str(e)}")
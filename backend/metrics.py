@@ -0,0 +1,374 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+# Latency buckets in seconds, tuned for an API whose handlers mostly do one or two Mongo round trips
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ==================== METRIC TYPES ====================
+
+class Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.metric_type}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        # Single dict update; races under threads can only lose an increment, never corrupt
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels: Tuple = ()) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in list(self.values.items())
+        ]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, labels: Tuple = ()):
+        self.values[labels] = value
+
+    def dec(self, labels: Tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class CallbackGauge(Metric):
+    """Gauge whose samples are read from a callback at scrape time"""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Dict[Tuple, float]], labels: Iterable[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class CallbackCounter(CallbackGauge):
+    """Monotonic total kept elsewhere (e.g. a stats() dict), read at scrape time"""
+    metric_type = "counter"
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self.counts: Dict[Tuple, List[int]] = {}
+        self.sums: Dict[Tuple, float] = {}
+
+    def observe(self, value: float, labels: Tuple = ()):
+        counts = self.counts.get(labels)
+        if counts is None:
+            counts = self.counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[labels] = self.sums.get(labels, 0.0) + value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, counts in list(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(self.sums.get(labels, 0.0))}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def callback_gauge(self, name: str, help_text: str, callback, labels: Iterable[str] = ()) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help_text, callback, labels))
+
+    def callback_counter(self, name: str, help_text: str, callback, labels: Iterable[str] = ()) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help_text, callback, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "fitsphere_http_requests_total", "HTTP requests by route, method and status", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "fitsphere_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "fitsphere_http_requests_in_flight", "HTTP requests currently being served", ("method",)
+)
+SOCKET_EVENTS = REGISTRY.counter(
+    "fitsphere_socketio_events_total", "Socket.IO events received by event name", ("event",)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "fitsphere_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc((cache, "hit" if hit else "miss"))
+
+
+# ==================== ASGI MIDDLEWARE ====================
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead) that records
+    request counts, status codes, in-flight requests and latency per route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec((method,))
+            route_label = _route_label(scope)
+            HTTP_REQUESTS.inc((method, route_label, status_code))
+            HTTP_LATENCY.observe(elapsed, (method, route_label))
+
+
+def _route_label(scope) -> str:
+    # FastAPI stores the matched APIRoute in the scope; label by template to bound cardinality
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    root_path = scope.get("root_path")
+    if root_path:
+        return root_path
+    return "<unmatched>"
+
+
+# ==================== SOCKET.IO ====================
+
+def instrument_socket_event(handler):
+    """Count every call of a Socket.IO event handler"""
+    event_name = handler.__name__
+
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        SOCKET_EVENTS.inc((event_name,))
+        return await handler(*args, **kwargs)
+
+    return wrapper
+
+
+def register_socketio_metrics(sio, registry: Registry = REGISTRY):
+    """Expose room membership grouped by room kind (user_*, admin_room, ...)"""
+
+    def room_sizes() -> Dict[Tuple, float]:
+        sizes: Dict[Tuple, float] = {}
+        for namespace, rooms in list(sio.manager.rooms.items()):
+            for room, members in list(rooms.items()):
+                if room is None:
+                    group = "connected"
+                elif "_" in room and room != "admin_room":
+                    group = room.split("_", 1)[0] + "_*"
+                else:
+                    group = room
+                sizes[(namespace, group)] = sizes.get((namespace, group), 0) + len(members)
+        return sizes
+
+    def room_counts() -> Dict[Tuple, float]:
+        return {(namespace,): len(rooms) for namespace, rooms in list(sio.manager.rooms.items())}
+
+    registry.callback_gauge(
+        "fitsphere_socketio_room_members", "Socket.IO room members grouped by room kind", room_sizes, ("namespace", "room")
+    )
+    registry.callback_gauge(
+        "fitsphere_socketio_rooms", "Number of Socket.IO rooms", room_counts, ("namespace",)
+    )
+
+
+# ==================== MONGO CONNECTION POOL ====================
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks pool sizes and checkouts; pymongo calls these from its own threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open: Dict[str, int] = {}
+        self.checked_out: Dict[str, int] = {}
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def _bump(self, table: Dict[str, int], address, delta: int):
+        key = f"{address[0]}:{address[1]}"
+        with self._lock:
+            table[key] = table.get(key, 0) + delta
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_ready(self, event): pass
+
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+
+    def connection_created(self, event):
+        self._bump(self.open, event.address, 1)
+
+    def connection_closed(self, event):
+        self._bump(self.open, event.address, -1)
+
+    def connection_checked_out(self, event):
+        self._bump(self.checked_out, event.address, 1)
+
+    def connection_checked_in(self, event):
+        self._bump(self.checked_out, event.address, -1)
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def register(self, registry: Registry = REGISTRY):
+        registry.callback_gauge(
+            "fitsphere_mongo_pool_connections", "Open Mongo connections per server",
+            lambda: {(address,): count for address, count in self.open.items()}, ("address",)
+        )
+        registry.callback_gauge(
+            "fitsphere_mongo_pool_checked_out", "Mongo connections checked out per server",
+            lambda: {(address,): count for address, count in self.checked_out.items()}, ("address",)
+        )
+        registry.callback_gauge(
+            "fitsphere_mongo_pool_checkout_failures", "Failed Mongo connection checkouts since start",
+            lambda: {(): self.checkout_failures}
+        )
+        return self
+
+
+def register_event_bus_metrics(event_bus, registry: Registry = REGISTRY):
+    def by_subscriber(field: str):
+        def collect() -> Dict[Tuple, float]:
+            return {(name,): stats[field] for name, stats in event_bus.stats()["subscriptions"].items()}
+        return collect
+
+    registry.callback_gauge(
+        "fitsphere_event_bus_queue_depth", "Events waiting per subscriber", by_subscriber("queue_depth"), ("subscriber",)
+    )
+    for field, help_text in (
+        ("dropped", "Events dropped because a subscriber queue was full"),
+        ("failed", "Events whose subscriber handler raised"),
+        ("delivered", "Events delivered per subscriber"),
+    ):
+        registry.callback_counter(f"fitsphere_event_bus_{field}_total", help_text, by_subscriber(field), ("subscriber",))
+
+
+def register_dependency_metrics(dependencies, registry: Registry = REGISTRY):
+    """Circuit state and call outcomes per external dependency (see resilience.py)"""
+    states = {"closed": 0, "half_open": 1, "open": 2}
+
+    def collect(field: str):
+        return lambda: {(dependency.name,): dependency.stats()[field] for dependency in dependencies}
+
+    registry.callback_gauge(
+        "fitsphere_dependency_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+        lambda: {(dependency.name,): states[dependency.breaker.state] for dependency in dependencies}, ("dependency",)
+    )
+    registry.callback_gauge(
+        "fitsphere_dependency_in_flight", "Calls in flight per dependency", collect("in_flight"), ("dependency",)
+    )
+    for field, help_text in (
+        ("success", "Calls that succeeded since start"),
+        ("failure", "Calls that failed after their retries since start"),
+        ("retried", "Retries issued since start"),
+        ("rejected", "Calls failed fast (circuit open or no free slot) since start"),
+    ):
+        registry.callback_counter(f"fitsphere_dependency_{field}_total", help_text, collect(field), ("dependency",))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 import uuid
@@ -41,12 +41,18 @@ class VideoDifficulty(str, Enum):
     INTERMEDIATE = "intermediate"
     ADVANCED = "advanced"
 
+class VideoUploadStatus(str, Enum):
+    PENDING = "pending"  # Created in Bunny Stream, browser upload not confirmed yet
+    READY = "ready"
+    FAILED = "failed"
+
 class NotificationType(str, Enum):
     NEW_ORDER = "new_order"
     FAILED_PAYMENT = "failed_payment"
     LOW_STOCK = "low_stock"
     NEW_USER = "new_user"
     SYSTEM_ERROR = "system_error"
+    CATALOG_UPDATE = "catalog_update"
 
 class ImageType(str, Enum):
     BANNER = "banner"
@@ -138,9 +144,19 @@ class Video(BaseModel):
     is_public: bool = True
     is_free: bool = True  # Free or Premium video
     view_count: int = 0
+    upload_status: VideoUploadStatus = VideoUploadStatus.READY  # Documents without it predate direct uploads
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class DirectVideoUploadResponse(BaseModel):
+    """Everything the browser needs to upload the file straight to Bunny Stream over TUS"""
+    id: str  # Our video document ID, used to complete the upload
+    video_id: str  # Bunny Stream video GUID (TUS VideoId header)
+    library_id: str  # TUS LibraryId header
+    tus_endpoint: str
+    signature: str  # TUS AuthorizationSignature header
+    expires_at: int  # TUS AuthorizationExpire header, unix seconds
+
 class VideoUpdate(BaseModel):
     title: Optional[str] = None
     category: Optional[VideoCategory] = None
@@ -152,6 +168,30 @@ class VideoUpdate(BaseModel):
     is_free: Optional[bool] = None
     # Note: video_url, embed_url, video_id are managed by Bunny Stream, not updated directly
 
+class WatchProgressHeartbeat(BaseModel):
+    position_seconds: float = Field(ge=0)
+    duration_seconds: Optional[float] = Field(default=None, gt=0)
+    completed: bool = False
+
+class WatchProgress(BaseModel):
+    video_id: str
+    position_seconds: float = 0.0
+    duration_seconds: Optional[float] = None
+    completed: bool = False
+    updated_at: Optional[datetime] = None
+
+class ContinueWatchingItem(BaseModel):
+    video: Video
+    progress: WatchProgress
+
+class ProgramProgress(BaseModel):
+    program_id: str
+    total_videos: int
+    started_videos: int
+    completed_videos: int
+    percent_complete: float
+    videos: List[WatchProgress]
+
 class ImageCreate(BaseModel):
     title: str
     image_type: ImageType
@@ -163,9 +203,57 @@ class Image(BaseModel):
     title: str
     image_type: ImageType
     image_url: str
+    # format -> width -> CDN URL, for srcset
+    variants: Dict[str, Dict[str, str]] = {}
     description: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class BulkImageUploadResult(BaseModel):
+    index: int
+    file_name: str
+    success: bool = False
+    image: Optional[Image] = None
+    error: Optional[str] = None
+
+class BulkImageUploadResponse(BaseModel):
+    upload_id: str
+    total: int
+    uploaded: int
+    failed: int
+    results: List[BulkImageUploadResult]
+
+class BulkDeleteRequest(BaseModel):
+    ids: List[str]
+
+class BulkDeleteResponse(BaseModel):
+    requested: int
+    deleted: int
+    not_found: List[str] = []
+    # CDN files handed to the cdn_deletions outbox; removed in the background
+    cdn_deletions_queued: int
+
+class BulkUpdateRequest(BaseModel):
+    # Each item is {"id": ..., <fields of the resource's update model>}; items are
+    # validated one by one so a bad item is reported instead of rejecting the batch
+    items: List[Dict[str, Any]]
+
+class BulkItemStatus(str, Enum):
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
+    INVALID = "invalid"
+
+class BulkItemResult(BaseModel):
+    id: Optional[str] = None
+    status: BulkItemStatus
+    detail: Optional[str] = None
+
+class BulkOperationResponse(BaseModel):
+    requested: int
+    succeeded: int
+    results: List[BulkItemResult]  # One per requested item, in request order
+    cdn_deletions_queued: int = 0
+
 class ProductCreate(BaseModel):
     name: str
     description: str
@@ -273,6 +361,7 @@ class FileUploadResponse(BaseModel):
     cdn_url: str
     video_id: Optional[str] = None
     embed_url: Optional[str] = None
+    variants: Optional[Dict[str, Dict[str, str]]] = None
     message: str = "File uploaded successfully"
 
 class AnalyticsSummary(BaseModel):
@@ -301,6 +390,12 @@ class ChatMessageCreate(BaseModel):
     receiver_id: Optional[str] = None
     message: str
 
+class MarkReadRequest(BaseModel):
+    ids: List[str]
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
 # Testimonial Models
 class TestimonialCreate(BaseModel):
     rating: int  # 1-5
@@ -332,6 +427,7 @@ class TrainerCreate(BaseModel):
     experience_years: int
     bio: str
     image_url: Optional[str] = None
+    variants: Dict[str, Dict[str, str]] = {}
     certifications: List[str] = []
 
 class Trainer(BaseModel):
@@ -344,6 +440,7 @@ class Trainer(BaseModel):
     experience_years: int
     bio: str
     image_url: Optional[str] = None
+    variants: Dict[str, Dict[str, str]] = {}  # resized copies of image_url: format -> width -> URL
     certifications: List[str] = []
     is_active: bool = True
     rating: float = 0.0
@@ -359,6 +456,7 @@ class TrainerUpdate(BaseModel):
     experience_years: Optional[int] = None
     bio: Optional[str] = None
     image_url: Optional[str] = None
+    variants: Optional[Dict[str, Dict[str, str]]] = None
     certifications: Optional[List[str]] = None
     is_active: Optional[bool] = None
 
@@ -397,6 +495,7 @@ class ProgramCreate(BaseModel):
     difficulty: VideoDifficulty
     trainer_id: str
     image_url: Optional[str] = None
+    variants: Dict[str, Dict[str, str]] = {}
     video_ids: List[str] = []  # References to Video IDs in database
     sessions_per_week: int = 3
     supports_gym_attendance: bool = True
@@ -414,6 +513,7 @@ class Program(BaseModel):
     difficulty: VideoDifficulty
     trainer_id: str
     image_url: Optional[str] = None
+    variants: Dict[str, Dict[str, str]] = {}  # resized copies of image_url: format -> width -> URL
     video_ids: List[str] = []  # References to Video IDs in database
     sessions_per_week: int = 3
     supports_gym_attendance: bool = True
@@ -433,6 +533,7 @@ class ProgramUpdate(BaseModel):
     difficulty: Optional[VideoDifficulty] = None
     trainer_id: Optional[str] = None
     image_url: Optional[str] = None
+    variants: Optional[Dict[str, Dict[str, str]]] = None
     video_ids: Optional[List[str]] = None
     sessions_per_week: Optional[int] = None
     supports_gym_attendance: Optional[bool] = None
@@ -547,4 +648,57 @@ class Comment(BaseModel):
     user_id: str
     user_name: str
     text: str
-    created_at: datetime = Field(default_factory=datetime.utcnow)
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CommentPage(BaseModel):
+    comments: List[Comment]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last page
+    latest_cursor: Optional[str] = None  # First page only: pass to the join_video socket event to resume live comments
+    total: int = 0  # The video's comment_count
+
+class RelatedItem(BaseModel):
+    """Enough of a video, program or product to render a card without another read"""
+    type: str
+    id: str
+    title: str
+    image_url: Optional[str] = None
+    category: Optional[str] = None
+    difficulty: Optional[str] = None
+    price: Optional[float] = None
+    is_free: Optional[bool] = None
+    duration: Optional[int] = None
+
+class RelatedItems(BaseModel):
+    type: str
+    id: str
+    videos: List[RelatedItem] = []
+    programs: List[RelatedItem] = []
+    products: List[RelatedItem] = []
+    updated_at: Optional[datetime] = None
+
+class BunnySyncStatus(str, Enum):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    COMPLETED_WITH_ERRORS = "completed_with_errors"  # Some pages could not be fetched; re-run to pick them up
+    FAILED = "failed"
+    INTERRUPTED = "interrupted"
+
+class BunnySyncRun(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str
+    status: BunnySyncStatus
+    started_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    total_items: int = 0
+    total_pages: int = 0
+    pages_done: int = 0
+    failed_pages: List[int] = []
+    seen: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped_recent: int = 0  # Too new to import: may still be mid-upload through upload_video
+    missing_in_bunny: Optional[int] = None  # Stored videos whose Bunny video is gone; only counted on a clean run
+    missing_sample: List[str] = []
+    error: Optional[str] = None
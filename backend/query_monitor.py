@@ -0,0 +1,170 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MONGO_QUERY_BUDGET = int(os.environ.get("MONGO_QUERY_BUDGET", "25"))
+MONGO_LATENCY_BUDGET_MS = float(os.environ.get("MONGO_LATENCY_BUDGET_MS", "250"))
+MONGO_N_PLUS_ONE_THRESHOLD = int(os.environ.get("MONGO_N_PLUS_ONE_THRESHOLD", "5"))
+SERVER_TIMING_ENABLED = os.environ.get("DEBUG", "false").lower() == "true"
+
+# Commands that are driver housekeeping rather than application queries
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "endSessions", "buildInfo"}
+
+MONGO_COMMAND_LATENCY = REGISTRY.histogram(
+    "fitsphere_mongo_command_duration_seconds", "Mongo command latency", ("command", "collection")
+)
+MONGO_COMMANDS_PER_REQUEST = REGISTRY.histogram(
+    "fitsphere_mongo_commands_per_request", "Mongo commands issued per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+
+
+class RequestQueryStats:
+    """Mongo work attributed to one HTTP request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+        self.by_operation: Dict[Tuple[str, str], int] = {}
+
+    def record(self, command: str, collection: str, duration_ms: float, documents: int):
+        with self._lock:
+            self.commands += 1
+            self.duration_ms += duration_ms
+            self.documents += documents
+            key = (command, collection)
+            self.by_operation[key] = self.by_operation.get(key, 0) + 1
+
+    def repeated_operations(self, threshold: int = MONGO_N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        """Operations issued often enough in one request to suggest an N+1 loop"""
+        return {
+            f"{command} {collection}": count
+            for (command, collection), count in self.by_operation.items()
+            if count >= threshold and command != "getMore"
+        }
+
+
+_current_stats: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar(
+    "mongo_request_stats", default=None
+)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _current_stats.get()
+
+
+def _documents_in_reply(reply) -> int:
+    if not isinstance(reply, dict):
+        return 0
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class QueryAccountingListener(monitoring.CommandListener):
+    """
+    Attributes each Mongo command to the request that issued it. Motor runs pymongo
+    on executor threads with a copy of the caller's context, so the request's stats
+    object is visible here through the context variable.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Tuple[Optional[RequestQueryStats], str, str]] = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        with self._lock:
+            self._pending[event.request_id] = (
+                _current_stats.get(), event.command_name, collection if isinstance(collection, str) else ""
+            )
+
+    def _finish(self, event, reply=None):
+        with self._lock:
+            pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        stats, command, collection = pending
+        duration_ms = event.duration_micros / 1000
+        MONGO_COMMAND_LATENCY.observe(duration_ms / 1000, (command, collection))
+        if stats is not None:
+            stats.record(command, collection, duration_ms, _documents_in_reply(reply))
+
+    def succeeded(self, event):
+        self._finish(event, event.reply)
+
+    def failed(self, event):
+        self._finish(event)
+
+
+class QueryAccountingMiddleware:
+    """
+    Opens a per-request accounting scope, logs requests that exceed the query-count
+    or Mongo latency budgets (or repeat one operation N+1 style), and in debug mode
+    reports the totals in a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if SERVER_TIMING_ENABLED and message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'mongo;desc="{stats.commands} commands, {stats.documents} docs";dur={stats.duration_ms:.2f}, '
+                    f'app;dur={total_ms:.2f}'
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats)
+
+    def _report(self, scope, stats: RequestQueryStats):
+        route = scope.get("route")
+        route_label = route.path if route is not None else scope.get("path", "")
+        MONGO_COMMANDS_PER_REQUEST.observe(stats.commands, (route_label,))
+
+        repeated = stats.repeated_operations()
+        over_count = stats.commands > MONGO_QUERY_BUDGET
+        over_latency = stats.duration_ms > MONGO_LATENCY_BUDGET_MS
+        if not (repeated or over_count or over_latency):
+            return
+
+        logger.warning(
+            f"Mongo budget exceeded on {scope.get('method')} {route_label}: "
+            f"{stats.commands} commands (budget {MONGO_QUERY_BUDGET}), "
+            f"{stats.duration_ms:.1f}ms (budget {MONGO_LATENCY_BUDGET_MS:.0f}ms), "
+            f"{stats.documents} docs"
+            + (f", possible N+1: {repeated}" if repeated else "")
+        )
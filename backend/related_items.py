@@ -0,0 +1,443 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from leases import JobLease
+
+logger = logging.getLogger(__name__)
+
+RELATED_TOP_K = int(os.environ.get("RELATED_TOP_K", "12"))
+# Full rebuilds pick up what incremental updates do not track: new orders, enrolments, views
+RELATED_REBUILD_SECONDS = int(os.environ.get("RELATED_REBUILD_SECONDS", str(6 * 3600)))
+# Changes are gathered this long so a burst of admin edits is recomputed once
+RELATED_DEBOUNCE_SECONDS = float(os.environ.get("RELATED_DEBOUNCE_SECONDS", "5"))
+RELATED_RETRY_SECONDS = float(os.environ.get("RELATED_RETRY_SECONDS", "60"))
+# Only the worker holding this lease builds; the others hand their changes over through related_changes
+RELATED_LEASE_SECONDS = float(os.environ.get("RELATED_LEASE_SECONDS", "300"))
+RELATED_ORDER_WINDOW_DAYS = int(os.environ.get("RELATED_ORDER_WINDOW_DAYS", "180"))
+# Products beyond this in one order are ignored for co-purchase (bulk orders say little)
+RELATED_MAX_ORDER_ITEMS = 20
+RELATED_WRITE_BATCH = 1000
+
+ITEM_TYPES = ("video", "program", "product")
+COLLECTIONS = {"video": "videos", "program": "programs", "product": "products"}
+
+# Score per signal; popularity only breaks ties
+SHARED_PROGRAM_WEIGHT = 3.0
+SAME_CATEGORY_WEIGHT = 2.0
+SAME_DIFFICULTY_WEIGHT = 1.0
+CO_PURCHASE_WEIGHT = 4.0
+
+Key = Tuple[str, str]  # (item type, id)
+# A related_changes row asking for a full rebuild instead of naming an item
+REBUILD_KEY: Key = ("*", "rebuild")
+
+
+async def ensure_related_indexes(db):
+    await db.related_items.create_index([("type", 1), ("id", 1)], unique=True)
+    await db.related_items.create_index("updated_at")
+    await db.related_changes.create_index([("type", 1), ("id", 1)], unique=True)
+
+
+def _label(value) -> Optional[str]:
+    if value is None:
+        return None
+    return str(getattr(value, "value", value)).strip().lower() or None
+
+
+class _Item:
+    __slots__ = ("key", "category", "difficulty", "programs", "popularity", "card")
+
+    def __init__(self, key: Key, category, difficulty, popularity: float, card: dict):
+        self.key = key
+        self.category = category
+        self.difficulty = difficulty
+        self.programs: Set[str] = set()  # programs it belongs to; a program belongs to itself
+        self.popularity = popularity
+        self.card = card
+
+
+class RelatedItemsBuilder:
+    """
+    Background job that keeps related_items: for every listed video, active program
+    and product, the top-K videos, programs and products by shared program membership,
+    same category and difficulty, and (product to product) co-purchase in recent paid
+    orders. Readers fetch one row by (type, id).
+
+    The job keeps the last build's features in memory. Admin writes call changed(),
+    and only the rows that can be affected are recomputed: the changed items, the rows
+    that list them, their program co-members and, when a change moves an item in or
+    out of a category's candidate pool, everything in that category.
+
+    Every worker runs the loop, but only the one holding the related_items lease
+    builds. changed() and request_rebuild() in any worker are written to the
+    related_changes queue, which the lease holder drains. A worker that loses the
+    lease drops its features and starts with a full build if it takes it back.
+    """
+
+    def __init__(
+        self,
+        db,
+        cards: Dict[str, Callable[[dict], dict]],
+        filters: Dict[str, dict],
+        top_k: int = RELATED_TOP_K,
+        rebuild_seconds: int = RELATED_REBUILD_SECONDS,
+        debounce_seconds: float = RELATED_DEBOUNCE_SECONDS
+    ):
+        self.db = db
+        self.cards = cards
+        self.filters = filters
+        self.top_k = top_k
+        # Candidates per (type, category) come from its most popular items only
+        self.pool_size = top_k * 4
+        self.rebuild_seconds = rebuild_seconds
+        self.debounce_seconds = debounce_seconds
+
+        self.items: Dict[Key, _Item] = {}
+        self.by_category: Dict[Tuple[str, str], Set[Key]] = defaultdict(set)
+        self.pools: Dict[Tuple[str, str], List[Key]] = {}
+        self.members: Dict[str, Set[Key]] = defaultdict(set)  # program id -> videos in it and the program
+        self.co_purchase: Dict[str, Counter] = {}
+        self.rows: Dict[Key, List[Key]] = {}
+        self.listed_by: Dict[Key, Set[Key]] = defaultdict(set)
+
+        self.lease = JobLease(db, "related_items", RELATED_LEASE_SECONDS)
+        self.leader = False
+        self.pending: Dict[str, Set[str]] = defaultdict(set)
+        self._rebuild_requested = False
+        self.last_full_run: Optional[str] = None
+        self.last_full_seconds: Optional[float] = None
+        self.totals = {"full_builds": 0, "incremental_builds": 0, "rows_written": 0, "failed_builds": 0}
+        self._full_at: Optional[float] = None
+        self._force_full = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- features ----------
+
+    def _item(self, item_type: str, doc: dict) -> _Item:
+        if item_type == "video":
+            popularity = doc.get("view_count", 0)
+        elif item_type == "program":
+            popularity = doc.get("enrolled_count", 0)
+        else:
+            popularity = doc.get("rating", 0)
+        return _Item(
+            (item_type, doc["id"]),
+            _label(doc.get("category")),
+            _label(doc.get("difficulty")),
+            float(popularity or 0),
+            self.cards[item_type](dict(doc))
+        )
+
+    def _add(self, item: _Item):
+        self.items[item.key] = item
+        if item.category:
+            self.by_category[(item.key[0], item.category)].add(item.key)
+
+    def _discard(self, key: Key) -> Optional[_Item]:
+        item = self.items.pop(key, None)
+        if item and item.category:
+            self.by_category[(key[0], item.category)].discard(key)
+        return item
+
+    def _set_program(self, program_id: str, video_ids: Iterable[str]):
+        """Point membership of one program at its current videos; returns the keys whose membership changed"""
+        before = self.members.pop(program_id, set())
+        after = {("video", video_id) for video_id in video_ids if ("video", video_id) in self.items}
+        if ("program", program_id) in self.items:
+            after.add(("program", program_id))
+        for key in before - after:
+            if key in self.items:
+                self.items[key].programs.discard(program_id)
+        for key in after:
+            self.items[key].programs.add(program_id)
+        if after:
+            self.members[program_id] = after
+        return before ^ after
+
+    def _pool(self, pool_key: Tuple[str, str]) -> List[Key]:
+        keys = self.by_category.get(pool_key, ())
+        return heapq.nlargest(self.pool_size, keys, key=lambda key: self.items[key].popularity)
+
+    # ---------- scoring ----------
+
+    def _neighbours(self, source: _Item, target_type: str) -> List[Key]:
+        candidates: Set[Key] = set()
+        if source.category:
+            candidates.update(self.pools.get((target_type, source.category), ()))
+        for program_id in source.programs:
+            candidates.update(key for key in self.members.get(program_id, ()) if key[0] == target_type)
+        co_purchase = self.co_purchase.get(source.key[1]) if source.key[0] == "product" else None
+        if co_purchase and target_type == "product":
+            candidates.update(("product", product_id) for product_id, _ in co_purchase.most_common(self.pool_size))
+        candidates.discard(source.key)
+
+        top_co_purchase = max(co_purchase.values()) if co_purchase else 0
+        scored = []
+        for key in candidates:
+            target = self.items.get(key)
+            if target is None:
+                continue
+            score = SHARED_PROGRAM_WEIGHT * len(source.programs & target.programs)
+            if source.category and source.category == target.category:
+                score += SAME_CATEGORY_WEIGHT
+            if source.difficulty and source.difficulty == target.difficulty:
+                score += SAME_DIFFICULTY_WEIGHT
+            if top_co_purchase and target_type == "product":
+                score += CO_PURCHASE_WEIGHT * co_purchase.get(key[1], 0) / top_co_purchase
+            if score > 0:
+                scored.append((score, target.popularity, key))
+        return [key for _, _, key in heapq.nlargest(self.top_k, scored)]
+
+    def _row(self, key: Key, now: str) -> dict:
+        source = self.items[key]
+        row = {"type": key[0], "id": key[1], "updated_at": now}
+        listed = []
+        for target_type in ITEM_TYPES:
+            neighbours = self._neighbours(source, target_type)
+            listed.extend(neighbours)
+            row[COLLECTIONS[target_type]] = [self.items[n].card for n in neighbours]
+        for old in self.rows.get(key, ()):
+            self.listed_by[old].discard(key)
+        for new in listed:
+            self.listed_by[new].add(key)
+        self.rows[key] = listed
+        return row
+
+    async def _write(self, keys: Iterable[Key], removed: Iterable[Key] = ()) -> int:
+        now = datetime.utcnow().isoformat()
+        operations = [
+            ReplaceOne({"type": key[0], "id": key[1]}, self._row(key, now), upsert=True)
+            for key in keys if key in self.items
+        ]
+        operations.extend(DeleteOne({"type": key[0], "id": key[1]}) for key in removed)
+        for start in range(0, len(operations), RELATED_WRITE_BATCH):
+            await self.db.related_items.bulk_write(operations[start:start + RELATED_WRITE_BATCH], ordered=False)
+        self.totals["rows_written"] += len(operations)
+        return len(operations)
+
+    # ---------- building ----------
+
+    async def _load(self, item_type: str, ids: Optional[List[str]] = None) -> List[dict]:
+        query = dict(self.filters.get(item_type, {}))
+        if ids is not None:
+            query["id"] = {"$in": ids}
+        return await self.db[COLLECTIONS[item_type]].find(query, {"_id": 0}).to_list(None)
+
+    async def _load_co_purchase(self) -> Dict[str, Counter]:
+        since = (datetime.utcnow() - timedelta(days=RELATED_ORDER_WINDOW_DAYS)).isoformat()
+        pairs: Dict[str, Counter] = defaultdict(Counter)
+        async for order in self.db.orders.find(
+            {"payment_status": "success", "created_at": {"$gte": since}},
+            {"_id": 0, "product_ids": 1, "items.product_id": 1}
+        ):
+            product_ids = order.get("product_ids") or [item.get("product_id") for item in order.get("items", [])]
+            product_ids = list(dict.fromkeys(product_id for product_id in product_ids if product_id))
+            if not 1 < len(product_ids) <= RELATED_MAX_ORDER_ITEMS:
+                continue
+            for product_id in product_ids:
+                pairs[product_id].update(other for other in product_ids if other != product_id)
+        return dict(pairs)
+
+    async def run_once(self) -> int:
+        """Rebuild every row from scratch; returns how many rows were written"""
+        started = time.monotonic()
+        build_start = datetime.utcnow().isoformat()
+        docs = {item_type: await self._load(item_type) for item_type in ITEM_TYPES}
+        co_purchase = await self._load_co_purchase()
+
+        self.items, self.by_category, self.members = {}, defaultdict(set), defaultdict(set)
+        self.rows, self.listed_by = {}, defaultdict(set)
+        for item_type in ITEM_TYPES:
+            for doc in docs[item_type]:
+                self._add(self._item(item_type, doc))
+        for program in docs["program"]:
+            self._set_program(program["id"], program.get("video_ids") or [])
+        self.pools = {pool_key: self._pool(pool_key) for pool_key in self.by_category}
+        self.co_purchase = co_purchase
+
+        written = await self._write(list(self.items))
+        # Rows nobody has written since this build started belong to items that are gone
+        await self.db.related_items.delete_many({"updated_at": {"$lt": build_start}})
+
+        self._full_at = time.monotonic()
+        self.last_full_run = datetime.utcnow().isoformat()
+        self.last_full_seconds = round(self._full_at - started, 2)
+        self.totals["full_builds"] += 1
+        logger.info(f"Related items rebuilt: {written} rows in {self.last_full_seconds}s")
+        return written
+
+    async def apply_changes(self, changes: Dict[str, Set[str]]) -> int:
+        """Recompute the rows that changes to these items can affect"""
+        affected: Set[Key] = set()
+        removed: Set[Key] = set()
+        dirty_pools: Set[Tuple[str, str]] = set()
+        programs: Dict[str, List[str]] = {}
+
+        for item_type, ids in changes.items():
+            docs = {doc["id"]: doc for doc in await self._load(item_type, list(ids))}
+            for item_id in ids:
+                key = (item_type, item_id)
+                old = self._discard(key)
+                affected.add(key)
+                affected.update(self.listed_by.get(key, ()))
+                if old:
+                    affected.update(member for program_id in old.programs for member in self.members.get(program_id, ()))
+                    if old.category:
+                        dirty_pools.add((item_type, old.category))
+                doc = docs.get(item_id)
+                if doc is None:
+                    removed.add(key)
+                    for program_id in (old.programs if old else ()):
+                        self.members[program_id].discard(key)
+                    if item_type == "program":
+                        programs[item_id] = []
+                    continue
+                item = self._item(item_type, doc)
+                if old:
+                    item.programs = old.programs
+                self._add(item)
+                if item.category:
+                    dirty_pools.add((item_type, item.category))
+                if item_type == "program":
+                    programs[item_id] = doc.get("video_ids") or []
+
+        for program_id, video_ids in programs.items():
+            changed_members = self._set_program(program_id, video_ids)
+            affected.update(changed_members)
+            affected.update(self.members.get(program_id, ()))
+
+        changed_keys = {(item_type, item_id) for item_type, ids in changes.items() for item_id in ids}
+        for pool_key in dirty_pools:
+            old_pool, pool = set(self.pools.get(pool_key, ())), self._pool(pool_key)
+            self.pools[pool_key] = pool
+            if old_pool != set(pool) or changed_keys & old_pool:
+                # A candidate moved or changed, so every row drawing on this category may rank differently
+                category = pool_key[1]
+                affected.update(key for key, item in self.items.items() if item.category == category)
+
+        for key in removed:
+            affected.discard(key)
+            for listed in self.rows.pop(key, ()):
+                self.listed_by[listed].discard(key)
+        written = await self._write([key for key in affected if key in self.items], removed)
+        self.totals["incremental_builds"] += 1
+        return written
+
+    def changed(self, item_type: str, ids: Iterable[str]):
+        """Note that these items were created, updated or deleted"""
+        self.pending[item_type].update(ids)
+        self._wake.set()
+
+    def request_rebuild(self):
+        self._rebuild_requested = True
+        self._wake.set()
+
+    async def _publish(self):
+        """Hand this worker's changes to the queue the lease holder drains"""
+        keys = [(item_type, item_id) for item_type, ids in self.pending.items() for item_id in ids]
+        if self._rebuild_requested:
+            keys.append(REBUILD_KEY)
+        if not keys:
+            return
+        now = datetime.utcnow().isoformat()
+        await self.db.related_changes.bulk_write([
+            UpdateOne({"type": key[0], "id": key[1]}, {"$set": {"changed_at": now}}, upsert=True) for key in keys
+        ], ordered=False)
+        # Cleared only once written, so a failed publish is retried with the next step
+        self.pending = defaultdict(set)
+        self._rebuild_requested = False
+
+    async def _drain(self):
+        rows = await self.db.related_changes.find({}, {"_id": 0}).to_list(None)
+        if not rows:
+            return
+        changes: Dict[str, Set[str]] = defaultdict(set)
+        for row in rows:
+            if row["type"] in COLLECTIONS:
+                changes[row["type"]].add(row["id"])
+        if any((row["type"], row["id"]) == REBUILD_KEY for row in rows):
+            await self.run_once()
+        elif changes:
+            try:
+                await self.apply_changes(changes)
+            except Exception:
+                # A partly applied change leaves the in-memory features unreliable
+                self._force_full = True
+                raise
+        # Rows changed again since they were read stay queued
+        await self.db.related_changes.bulk_write([
+            DeleteOne({"type": row["type"], "id": row["id"], "changed_at": row["changed_at"]}) for row in rows
+        ], ordered=False)
+
+    async def _next_step(self):
+        await self._publish()
+        if not await self.lease.acquire():
+            if self.leader:
+                logger.info("Related items lease moved to another worker")
+            self.leader = False
+            # Another worker builds meanwhile; these features would be stale on taking the lease back
+            self._full_at = None
+            return
+        self.leader = True
+        full_due = self._full_at is None or time.monotonic() - self._full_at >= self.rebuild_seconds
+        if self._force_full or full_due:
+            self._force_full = False
+            await self.run_once()
+        await self._drain()
+
+    async def _loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                await self._next_step()
+                failed = False
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failed = True
+                self.totals["failed_builds"] += 1
+                logger.error(f"Related items build failed: {str(e)}")
+            if failed:
+                await asyncio.sleep(RELATED_RETRY_SECONDS)
+            elif self.leader:
+                # Polls the queue, which also gathers a burst of changes into one recompute
+                await asyncio.sleep(self.debounce_seconds)
+            else:
+                # Publish changes as they come; try for the lease now and then in case its holder died
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.lease.seconds / 3)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "leader": self.leader,
+            "items": {item_type: sum(1 for key in self.items if key[0] == item_type) for item_type in ITEM_TYPES},
+            "pending": {item_type: len(ids) for item_type, ids in self.pending.items() if ids},
+            "last_full_run": self.last_full_run,
+            "last_full_seconds": self.last_full_seconds,
+            **self.totals,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.leader:
+            # Let another worker take over without waiting for the lease to expire
+            await self.lease.release()
+            self.leader = False
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# Safe to send twice: the upstream ends up in the same state either way
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+class UpstreamUnavailable(HTTPException):
+    """A dependency is down, too slow, or its circuit is open; surfaced as a 503 instead of a hung request"""
+
+    def __init__(self, dependency: str, detail: str, retry_after: Optional[float] = None):
+        headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after else None
+        super().__init__(503, f"{dependency} is unavailable: {detail}", headers)
+        self.dependency = dependency
+
+
+# ==================== CIRCUIT BREAKER ====================
+
+class CircuitBreaker:
+    """
+    closed: calls go through; FAILURE_THRESHOLD consecutive failures open the circuit.
+    open: calls fail immediately for RESET_SECONDS.
+    half_open: one probe call at a time; its success closes the circuit, its failure reopens it.
+    """
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def acquire(self):
+        """Raise UpstreamUnavailable if the call must not be attempted now"""
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                raise UpstreamUnavailable(self.name, "circuit open", self.retry_after())
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit for {self.name} half-open, probing")
+        if self.state == self.HALF_OPEN:
+            if self.probing:
+                raise UpstreamUnavailable(self.name, "circuit half-open, probe in flight", self.reset_seconds)
+            self.probing = True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.name} open after {self.failures} consecutive failure(s)")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """The call ended without telling us anything about the dependency (e.g. it was cancelled)"""
+        self.probing = False
+
+
+# ==================== DEPENDENCIES ====================
+
+class Dependency:
+    """
+    One external service: its own pooled HTTP client with timeouts, a concurrency cap,
+    jittered retries for idempotent calls and a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: httpx.Timeout,
+        retries: int = 2,
+        retry_base_seconds: float = 0.25,
+        max_concurrency: int = 20,
+        queue_seconds: float = 5.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_base_seconds = retry_base_seconds
+        self.max_concurrency = max_concurrency
+        self.queue_seconds = queue_seconds
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_seconds)
+        # Caps calls in flight, so a slow dependency holds at most this many connections or threads;
+        # callers beyond that wait up to queue_seconds for a slot and then fail fast
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.outcomes: Dict[str, int] = {"success": 0, "failure": 0, "rejected": 0, "retried": 0}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, connect: float, read: float, write: float, **defaults) -> "Dependency":
+        """Settings from <PREFIX>_CONNECT_TIMEOUT_SECONDS, _READ_TIMEOUT_SECONDS, _RETRIES, ... with the given defaults"""
+        env = lambda key, default: os.environ.get(f"{prefix}_{key}", str(default))
+        return cls(
+            name,
+            timeout=httpx.Timeout(
+                connect=float(env("CONNECT_TIMEOUT_SECONDS", connect)),
+                read=float(env("READ_TIMEOUT_SECONDS", read)),
+                write=float(env("WRITE_TIMEOUT_SECONDS", write)),
+                pool=float(env("CONNECT_TIMEOUT_SECONDS", connect)),
+            ),
+            retries=int(env("RETRIES", defaults.get("retries", 2))),
+            retry_base_seconds=float(env("RETRY_BASE_SECONDS", defaults.get("retry_base_seconds", 0.25))),
+            max_concurrency=int(env("MAX_CONCURRENCY", defaults.get("max_concurrency", 20))),
+            queue_seconds=float(env("QUEUE_SECONDS", defaults.get("queue_seconds", 5))),
+            failure_threshold=int(env("CIRCUIT_FAILURE_THRESHOLD", defaults.get("failure_threshold", 5))),
+            reset_seconds=float(env("CIRCUIT_RESET_SECONDS", defaults.get("reset_seconds", 30))),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use, inside the worker's event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            )
+        return self._client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Own threads for blocking SDK calls, so a hung dependency cannot use up the loop's default executor
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=self.name)
+        return self._executor
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so callers that failed together do not retry together
+        return random.uniform(0, self.retry_base_seconds * 2 ** attempt)
+
+    async def _attempt(self, call: Callable, is_failure: Callable):
+        """One guarded call: (result, failure description or None); failures count against the circuit"""
+        self.breaker.acquire()
+        try:
+            await asyncio.wait_for(self.slots.acquire(), self.queue_seconds)
+        except asyncio.TimeoutError:
+            self.breaker.release()
+            raise UpstreamUnavailable(self.name, f"{self.max_concurrency} calls already in flight")
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+
+        self.in_flight += 1
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception as e:
+            if not is_failure(e):
+                self.breaker.record_success()
+                raise
+            self.breaker.record_failure()
+            return e, f"{type(e).__name__}: {e}"
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+        failure = is_failure(result)
+        if failure:
+            self.breaker.record_failure()
+            return result, failure
+        self.breaker.record_success()
+        return result, None
+
+    async def _run(self, call: Callable, is_failure: Callable, retries: int):
+        attempt = 0
+        while True:
+            try:
+                result, failure = await self._attempt(call, is_failure)
+            except UpstreamUnavailable:
+                self.outcomes["rejected"] += 1
+                raise
+            if failure is None:
+                self.outcomes["success"] += 1
+                return result
+            if attempt >= retries:
+                self.outcomes["failure"] += 1
+                logger.warning(f"{self.name} call failed after {attempt + 1} attempt(s): {failure}")
+                if isinstance(result, Exception):
+                    raise UpstreamUnavailable(self.name, failure) from result
+                return result  # A final 5xx response goes back to the caller's own status handling
+            self.outcomes["retried"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        idempotent: Optional[bool] = None,
+        retries: Optional[int] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        HTTP call through this dependency's client. Transport errors, timeouts, 429 and 5xx
+        count as failures and are retried for idempotent methods. Raises UpstreamUnavailable
+        when the circuit is open or the request never got a response.
+        """
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if retries is None:
+            retries = self.retries if idempotent else 0
+
+        def is_failure(outcome) -> Optional[str]:
+            if isinstance(outcome, Exception):
+                return isinstance(outcome, httpx.TransportError)
+            if outcome.status_code == 429 or outcome.status_code >= 500:
+                return f"HTTP {outcome.status_code}"
+            return None
+
+        return await self._run(lambda: self.client.request(method, url, **kwargs), is_failure, retries)
+
+    async def call_sync(
+        self,
+        fn: Callable,
+        *args,
+        idempotent: bool = False,
+        is_failure: Callable[[Exception], bool] = lambda e: True
+    ):
+        """
+        Run a blocking SDK call in a worker thread so it cannot stall the event loop.
+        The SDK must enforce its own socket timeouts: a thread cannot be cancelled, so
+        waiting here with a deadline would only hide a stuck thread. `is_failure` says
+        which exceptions mean the dependency is unhealthy (as opposed to a rejected request).
+        """
+        def classify(outcome) -> Optional[str]:
+            if isinstance(outcome, Exception):
+                return is_failure(outcome)
+            return None
+
+        loop = asyncio.get_running_loop()
+        return await self._run(
+            lambda: loop.run_in_executor(self.executor, fn, *args), classify, self.retries if idempotent else 0
+        )
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.in_flight,
+            **self.outcomes,
+        }
+
+
+BUNNY_STREAM = Dependency.from_env("bunny_stream", "BUNNY_STREAM", connect=5, read=15, write=15)
+BUNNY_STORAGE = Dependency.from_env(
+    # Uploads of large originals need a generous write timeout; concurrency is shared by every upload
+    "bunny_storage", "BUNNY_STORAGE", connect=5, read=60, write=120,
+    retries=3, retry_base_seconds=0.5, max_concurrency=4, queue_seconds=300
+)
+RAZORPAY = Dependency.from_env("razorpay", "RAZORPAY", connect=3, read=10, write=10, max_concurrency=10)
+
+DEPENDENCIES = [BUNNY_STREAM, BUNNY_STORAGE, RAZORPAY]
+
+
+async def close_dependencies():
+    for dependency in DEPENDENCIES:
+        await dependency.close()
+
+
+def requests_session(dependency: Dependency):
+    """requests.Session applying the dependency's connect/read timeouts to every call, for blocking SDKs"""
+    import requests
+
+    class TimeoutSession(requests.Session):
+        def request(self, *args, **kwargs):
+            kwargs.setdefault("timeout", (dependency.timeout.connect, dependency.timeout.read))
+            return super().request(*args, **kwargs)
+
+    return TimeoutSession()
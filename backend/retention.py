@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from leases import JobLease
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_READ_TTL_DAYS = int(os.environ.get("NOTIFICATION_READ_TTL_DAYS", "30"))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_BLOCK_COMPRESSOR = os.environ.get("ARCHIVE_BLOCK_COMPRESSOR", "zstd")
+# Every worker runs an Archiver; a run holds this lease so only one of them moves rows
+ARCHIVE_LEASE_SECONDS = int(os.environ.get("ARCHIVE_LEASE_SECONDS", "1800"))
+
+# Collections that only ever grow and are moved to monthly archives
+ARCHIVED_COLLECTIONS = ["notifications", "chat_messages"]
+
+ArchiveHook = Callable[[str, List[dict]], Awaitable[None]]
+
+
+def archive_collection_name(collection: str, created_at: str) -> str:
+    """Monthly archive bucket for a document, e.g. notifications_archive_2026_01"""
+    year, month = created_at[:4], created_at[5:7]
+    return f"{collection}_archive_{year}_{month}"
+
+
+async def ensure_retention_indexes(db):
+    """Create the TTL and archive-scan indexes used by the retention policy"""
+    # TTL only applies to BSON dates, so read notifications carry a read_at datetime
+    await db.notifications.create_index(
+        "read_at",
+        expireAfterSeconds=NOTIFICATION_READ_TTL_DAYS * 86400,
+        partialFilterExpression={"is_read": True},
+        name="read_notifications_ttl"
+    )
+    for collection in ARCHIVED_COLLECTIONS:
+        await db[collection].create_index("created_at")
+
+
+async def _ensure_archive(db, name: str, existing: set):
+    if name in existing:
+        return
+    try:
+        await db.create_collection(
+            name,
+            storageEngine={"wiredTiger": {"configString": f"block_compressor={ARCHIVE_BLOCK_COMPRESSOR}"}}
+        )
+    except CollectionInvalid:
+        pass
+    await db[name].create_index("id", unique=True)
+    await db[name].create_index("created_at")
+    existing.add(name)
+
+
+async def archive_names(db, collection: str) -> List[str]:
+    """Existing archive collections for a base collection, newest month first"""
+    prefix = f"{collection}_archive_"
+    names = await db.list_collection_names(filter={"name": {"$regex": f"^{prefix}"}})
+    return sorted(names, reverse=True)
+
+
+async def archive_old_documents(
+    db,
+    collection: str,
+    older_than: datetime,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    on_archived: Optional[ArchiveHook] = None
+) -> int:
+    """
+    Move documents created before older_than into monthly archive collections.
+    Batches are copied first and deleted second; archives have a unique index on
+    id so a batch interrupted between the two steps can be safely re-run.
+    on_archived gets each batch less the rows a request deleted after it was read,
+    so a row is not accounted for twice.
+    """
+    cutoff = older_than.isoformat()
+    existing = set(await archive_names(db, collection))
+    moved = 0
+
+    while True:
+        docs = await db[collection].find(
+            {"created_at": {"$lt": cutoff}}
+        ).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        fetched = len(docs)
+
+        buckets: Dict[str, List[dict]] = {}
+        for doc in docs:
+            buckets.setdefault(archive_collection_name(collection, str(doc["created_at"])), []).append(doc)
+
+        for name, bucket in buckets.items():
+            await _ensure_archive(db, name, existing)
+            try:
+                await db[name].insert_many(bucket, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate ids were archived by an earlier, interrupted run
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+
+        ids = [doc["_id"] for doc in docs]
+        if on_archived is not None:
+            # Rows a request deleted since the find were accounted for by that request
+            present = set(await db[collection].distinct("_id", {"_id": {"$in": ids}}))
+            docs = [doc for doc in docs if doc["_id"] in present]
+            ids = [doc["_id"] for doc in docs]
+        result = await db[collection].delete_many({"_id": {"$in": ids}})
+        if on_archived is not None and docs:
+            await on_archived(collection, docs)
+        moved += result.deleted_count
+
+        if fetched < batch_size:
+            break
+
+    if moved:
+        logger.info(f"Archived {moved} document(s) from {collection}")
+    return moved
+
+
+def union_with_archives_pipeline(
+    archives: List[str],
+    query: dict,
+    sort: List[tuple],
+    skip: int,
+    limit: int
+) -> List[dict]:
+    """Aggregation pipeline that reads a hot collection together with its archives"""
+    pipeline: List[dict] = [{"$match": query}]
+    for name in archives:
+        pipeline.append({"$unionWith": {"coll": name, "pipeline": [{"$match": query}]}})
+    pipeline.extend([
+        {"$sort": dict(sort)},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": {"_id": 0}},
+    ])
+    return pipeline
+
+
+async def find_including_archives(
+    db,
+    collection: str,
+    query: dict,
+    sort: List[tuple],
+    skip: int,
+    limit: int
+) -> List[dict]:
+    archives = await archive_names(db, collection)
+    pipeline = union_with_archives_pipeline(archives, query, sort, skip, limit)
+    return await db[collection].aggregate(pipeline).to_list(limit)
+
+
+async def collection_sizes(db, collections: List[str]) -> Dict[str, dict]:
+    """Data and index sizes, to check that hot collections stay cache-sized"""
+    sizes = {}
+    for name in collections:
+        try:
+            stats = await db.command("collStats", name)
+        except Exception as e:
+            sizes[name] = {"error": str(e)}
+            continue
+        sizes[name] = {
+            "count": stats.get("count", 0),
+            "size_bytes": stats.get("size", 0),
+            "storage_size_bytes": stats.get("storageSize", 0),
+            "index_size_bytes": stats.get("totalIndexSize", 0),
+        }
+    return sizes
+
+
+class Archiver:
+    """Background task that periodically archives old rows of the growing collections"""
+
+    def __init__(
+        self,
+        db,
+        collections: List[str] = ARCHIVED_COLLECTIONS,
+        archive_after_days: int = ARCHIVE_AFTER_DAYS,
+        interval_seconds: int = ARCHIVE_INTERVAL_SECONDS,
+        on_archived: Optional[ArchiveHook] = None
+    ):
+        self.db = db
+        self.collections = collections
+        self.archive_after_days = archive_after_days
+        self.interval_seconds = interval_seconds
+        self.on_archived = on_archived
+        self.lease = JobLease(db, "archiver", ARCHIVE_LEASE_SECONDS)
+        self.last_run: Optional[str] = None
+        self.last_moved: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> Dict[str, int]:
+        """Rows moved per collection; empty if another worker holds the archive lease"""
+        older_than = datetime.utcnow() - timedelta(days=self.archive_after_days)
+        moved = {}
+        try:
+            for collection in self.collections:
+                # Taken, or extended, before each collection
+                if not await self.lease.acquire():
+                    logger.info("Archive run skipped: another worker holds the lease")
+                    return moved
+                moved[collection] = await archive_old_documents(
+                    self.db, collection, older_than, on_archived=self.on_archived
+                )
+        finally:
+            await self.lease.release()
+        self.last_run = datetime.utcnow().isoformat()
+        self.last_moved = moved
+        return moved
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Archiver run failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
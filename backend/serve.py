@@ -0,0 +1,120 @@
+"""
+Production entry point.
+
+    python serve.py
+
+Runs server:app under uvicorn with one worker per available CPU, uvloop and
+httptools when they are installed, and the socket settings below. On SIGTERM
+each worker stops accepting connections, closes its Socket.IO sessions (clients
+reconnect to a process that is staying up), lets in-flight HTTP requests finish
+within GRACEFUL_SHUTDOWN_SECONDS and then runs the app's shutdown hooks.
+
+`python server.py` remains the single-process, auto-reloading development server.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import List, Optional
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def _available_cpus() -> int:
+    # Respects CPU pinning and container cpusets, which os.cpu_count() does not
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8000"))
+# WEB_CONCURRENCY is the variable most hosting platforms already set
+WORKERS = int(os.environ.get("WEB_CONCURRENCY", str(_available_cpus())))
+# Longer than the idle timeout of the usual load balancers (60s), so the proxy closes idle connections first
+KEEP_ALIVE_SECONDS = int(os.environ.get("KEEP_ALIVE_SECONDS", "75"))
+# Pending connections the kernel queues per listening socket while workers are busy
+SERVER_BACKLOG = int(os.environ.get("SERVER_BACKLOG", "2048"))
+# Per-worker cap on open connections plus running tasks; beyond it new requests get a 503
+LIMIT_CONCURRENCY = int(os.environ.get("LIMIT_CONCURRENCY", "1000"))
+# Time in-flight requests get to finish after SIGTERM before they are cancelled
+GRACEFUL_SHUTDOWN_SECONDS = int(os.environ.get("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+SOCKETIO_DRAIN_SECONDS = float(os.environ.get("SOCKETIO_DRAIN_SECONDS", "5"))
+FORWARDED_ALLOW_IPS = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "info")
+
+
+def _loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") is not None else "asyncio"
+
+
+def _http() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") is not None else "h11"
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that closes Socket.IO sessions before waiting on open connections"""
+
+    async def shutdown(self, sockets: Optional[List] = None) -> None:
+        # Stop accepting first so drained clients cannot reconnect to this worker
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        try:
+            # Imported here: the worker has already loaded server:app by the time it shuts down
+            from server import drain_socketio
+            await asyncio.wait_for(drain_socketio(), timeout=SOCKETIO_DRAIN_SECONDS)
+        except Exception as e:
+            logger.warning(f"Socket.IO drain did not complete: {str(e)}")
+
+        # Websocket and long-poll connections are gone, so this only waits on ordinary requests
+        await super().shutdown(sockets)
+
+
+def build_config(workers: int = WORKERS) -> uvicorn.Config:
+    return uvicorn.Config(
+        "server:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop=_loop(),
+        http=_http(),
+        backlog=SERVER_BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        limit_concurrency=LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        log_level=LOG_LEVEL,
+    )
+
+
+def main():
+    config = build_config()
+    server = DrainingServer(config)
+    logger.info(
+        f"Starting {config.workers} worker(s) on {HOST}:{PORT} "
+        f"(loop={config.loop}, http={config.http}, backlog={SERVER_BACKLOG}, "
+        f"keep-alive={KEEP_ALIVE_SECONDS}s, limit-concurrency={LIMIT_CONCURRENCY})"
+    )
+    if config.workers > 1 and not os.environ.get("SOCKETIO_MESSAGE_QUEUE"):
+        logger.warning(
+            "Running several workers without SOCKETIO_MESSAGE_QUEUE: Socket.IO room emits "
+            "only reach clients connected to the emitting worker"
+        )
+
+    if config.workers > 1:
+        # Same arrangement as uvicorn.run(): the parent binds once and forwards SIGTERM to every worker
+        sock = config.bind_socket()
+        Multiprocess(config, target=server.run, sockets=[sock]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
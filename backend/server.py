@@ -1,23 +1,23 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, status
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Header, status
+from fastapi.responses import StreamingResponse, PlainTextResponse, Response
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import List, Optional, Annotated
+from typing import Dict, List, Optional, Set, Annotated
 
 from datetime import datetime, timedelta
 import os
 import logging
-import razorpay
 import hashlib
 import hmac
 import io
 import csv
 import socketio
-import uvicorn
 import random
-import httpx
+import asyncio
+import uuid
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -25,10 +25,74 @@ load_dotenv(ROOT_DIR / '.env')
 from models import *
 from auth import hash_password, verify_password, create_access_token, get_current_admin, get_current_user, get_current_user_or_admin
 from bunny_cdn import (
-    upload_video_to_bunny_stream,
     delete_bunny_stream_video,
-    upload_to_bunny_storage,
-    delete_from_bunny_cdn
+    delete_from_bunny_cdn,
+    log_bunny_config,
+    create_bunny_video,
+    create_tus_upload_signature,
+    get_bunny_video,
+    bunny_stream_urls,
+    BUNNY_FAILED_STATUSES
+)
+from events import (
+    EventBus,
+    DomainEvent,
+    VideoUploaded,
+    ProductLowStock,
+    OrderCreated,
+    BookingCreated,
+    PaymentFailed,
+    CatalogBulkChanged
+)
+from bulk_ops import apply_updates, bulk_response, delete_existing, unique_ids, validate_updates
+from retention import (
+    Archiver,
+    ensure_retention_indexes,
+    find_including_archives,
+    collection_sizes,
+    ARCHIVED_COLLECTIONS
+)
+from metrics import (
+    REGISTRY,
+    PrometheusMiddleware,
+    MongoPoolListener,
+    instrument_socket_event,
+    register_socketio_metrics,
+    register_event_bus_metrics,
+    register_dependency_metrics
+)
+from query_monitor import QueryAccountingListener, QueryAccountingMiddleware
+from database import MongoRouter, max_read_lag_seconds
+from http_cache import CACHE_VERSION_SETTLE_SECONDS, ResourceVersions, ConditionalGetMiddleware
+from image_variants import variant_urls, shutdown_image_pool
+from video_views import ViewCounter, ensure_view_indexes
+from video_catalog import VideoCatalog
+from related_items import ITEM_TYPES, RelatedItemsBuilder, ensure_related_indexes
+from bunny_sync import BunnyLibrarySync, ensure_bunny_sync_indexes
+from leases import ensure_lease_indexes
+from video_comments import (
+    CommentBroadcaster, adjust_comment_count, backfill_comment_counts, comment_counts, comments_page, comments_since,
+    encode_cursor, ensure_comment_indexes, video_room
+)
+from watch_progress import WatchProgressTracker, ensure_watch_progress_indexes
+from ingest import (
+    ingest_image,
+    ingest_video,
+    store_image,
+    store_stream_video,
+    ensure_blob_indexes,
+    blob_owners,
+    owned_blob_ids,
+    release_blobs
+)
+from resilience import BUNNY_STREAM, RAZORPAY, DEPENDENCIES, close_dependencies, requests_session
+from cdn_outbox import (
+    CdnDeletionWorker,
+    delete_with_outbox,
+    deletion_record,
+    ensure_outbox_indexes,
+    STREAM_VIDEO,
+    STORAGE_FILE
 )
 
 
@@ -46,9 +110,17 @@ try:
     db_name = os.environ.get('DB_NAME')
     if not mongo_url or not db_name:
         raise RuntimeError("MONGO_URL and DB_NAME must be set")
-    client = AsyncIOMotorClient(mongo_url)
-    db = client[db_name]
-    logger.info("MongoDB client initialized")
+    mongo_pool_listener = MongoPoolListener().register()
+    mongo = MongoRouter(
+        mongo_url,
+        db_name,
+        event_listeners=[mongo_pool_listener, QueryAccountingListener()]
+    )
+    # Writes and every path that must read its own writes (carts, orders, payments, admin CRUD)
+    db = mongo.primary
+    # Lag-tolerant scans (dashboards, exports) and public catalogue reads may be served by secondaries
+    analytics_db = mongo.analytics
+    catalog_db = mongo.catalog
 except Exception as e:
     logger.error(f"Failed to initialize MongoDB: {e}")
     raise
@@ -59,20 +131,67 @@ razorpay_key_secret = os.environ.get('RAZORPAY_KEY_SECRET')
 if not razorpay_key_id or not razorpay_key_secret:
     raise RuntimeError("RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET must be set")
 
-razorpay_client = razorpay.Client(auth=(
-    razorpay_key_id,
-    razorpay_key_secret
-))
+razorpay_options = {}
+if os.environ.get('RAZORPAY_BASE_URL'):
+    # Lets benchmarks and tests point the client at a local stand-in
+    razorpay_options['base_url'] = os.environ['RAZORPAY_BASE_URL']
+
+_razorpay_client = None
+
+
+def get_razorpay_client():
+    """Razorpay client, built on first use: the SDK pulls in requests, which only checkout needs"""
+    global _razorpay_client
+    if _razorpay_client is None:
+        import razorpay
+        # The SDK has no timeout of its own; the session applies the RAZORPAY_* timeouts
+        _razorpay_client = razorpay.Client(
+            session=requests_session(RAZORPAY), auth=(razorpay_key_id, razorpay_key_secret), **razorpay_options
+        )
+    return _razorpay_client
+
+
+def razorpay_unavailable(error: Exception) -> bool:
+    """True for errors that mean Razorpay is unhealthy, False when it rejected this particular request"""
+    from razorpay.errors import BadRequestError
+    return not isinstance(error, BadRequestError)
+
+
+async def razorpay_create_order(amount_paise: int) -> dict:
+    """order.create in a worker thread, behind the Razorpay circuit breaker; not retried (POST)"""
+    return await RAZORPAY.call_sync(
+        get_razorpay_client().order.create,
+        {"amount": amount_paise, "currency": "INR", "payment_capture": 1},
+        is_failure=razorpay_unavailable
+    )
+
+# Domain event bus - side effects (notifications, pushes) run off the request path
+event_bus = EventBus(
+    outbox=db.event_outbox if os.environ.get('EVENT_OUTBOX_ENABLED', 'false').lower() == 'true' else None
+)
+
+LOW_STOCK_THRESHOLD = int(os.environ.get('LOW_STOCK_THRESHOLD', '10'))
+
+# Version counters behind the ETags on public catalogue reads; bumped by every write to those collections
+# ETag-cached routes read through catalog_db, so a new version must not be used before
+# the slowest secondary that handle may read from has caught up with the write
+catalog_read_lag = max_read_lag_seconds("catalog")
+resource_versions = ResourceVersions(
+    db.resource_versions, settle_seconds=max(CACHE_VERSION_SETTLE_SECONDS, catalog_read_lag or 0)
+)
 
 # Create the main app
 app = FastAPI(title="FitSphere API")
 
 # Create Socket.IO server
+# With several workers a room emit only reaches clients of the emitting process unless they share a message queue
+socketio_message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
 sio = socketio.AsyncServer(
     async_mode='asgi',
     cors_allowed_origins='*',
     logger=True,
-    engineio_logger=True
+    engineio_logger=True,
+    client_manager=socketio.AsyncRedisManager(socketio_message_queue) if socketio_message_queue else None
 )
 
 # Create API router
@@ -97,6 +216,21 @@ def normalize_media_url(url: Optional[str]) -> Optional[str]:
     return clean_url
 
 
+def reset_stale_variants(update_data: dict):
+    """For an update that sets image_url: clear the old image's variants unless new ones are given"""
+    if 'image_url' in update_data and 'variants' not in update_data:
+        # Variants of the previous image would otherwise be served for the new one
+        update_data['variants'] = {}
+
+
+def normalize_product_images(update_data: dict):
+    """For an update that sets image_urls: normalize them and drop empty ones"""
+    if 'image_urls' in update_data:
+        update_data['image_urls'] = [
+            url for url in (normalize_media_url(url) for url in update_data['image_urls']) if url
+        ]
+
+
 def extract_bunny_video_id(video_url: str) -> Optional[str]:
     if not video_url:
         return None
@@ -237,12 +371,14 @@ def transform_video_response(video: dict) -> dict:
 # ==================== SOCKET.IO EVENT HANDLERS ====================
 
 @sio.event
+@instrument_socket_event
 async def connect(sid, environ):
     """Handle client connection"""
     logger.info(f"Client connected: {sid}")
     return True
 
 @sio.event
+@instrument_socket_event
 async def disconnect(sid):
     """Handle client disconnection"""
     if sid in active_connections:
@@ -250,6 +386,7 @@ async def disconnect(sid):
     logger.info(f"Client disconnected: {sid}")
 
 @sio.event
+@instrument_socket_event
 async def join_room(sid, data):
     """User joins their personal room"""
     user_id = data.get('user_id')
@@ -265,6 +402,7 @@ async def join_room(sid, data):
             logger.info(f"Admin {user_id} joined admin_room")
 
 @sio.event
+@instrument_socket_event
 async def send_message(sid, data):
     """Handle chat message"""
     try:
@@ -281,6 +419,7 @@ async def send_message(sid, data):
         message_dict['created_at'] = message_dict['created_at'].isoformat()
         
         await db.chat_messages.insert_one(message_dict)
+        await adjust_unread_counter(chat_unread_counter_key(data.get('receiver_id')), 1)
         
  # Emit to sender room so sender can see the message instantly
         sender_room = f"user_{data['sender_id']}"
@@ -299,6 +438,51 @@ async def send_message(sid, data):
         logger.error(f"Error sending message: {str(e)}")
         await sio.emit('error', {'message': str(e)}, room=sid)
 
+@sio.event
+@instrument_socket_event
+async def join_video(sid, data):
+    """
+    Viewer joins a video's room for live comment_created / comment_deleted events.
+    With the last cursor it saw, the comments it missed while disconnected are sent
+    back as comments_resume (reset=True means too many were missed: refetch instead).
+    """
+    video_id = (data or {}).get('video_id')
+    if not video_id:
+        return
+    await sio.enter_room(sid, video_room(video_id))
+    cursor = data.get('cursor')
+    if not cursor:
+        return
+    try:
+        missed, reset = await comments_since(db, video_id, cursor)
+    except ValueError:
+        missed, reset = [], True
+    if missed or reset:
+        await sio.emit('comments_resume', {
+            'video_id': video_id,
+            'comments': missed,
+            'cursor': encode_cursor(missed[-1]) if missed else cursor,
+            'reset': reset,
+        }, room=sid)
+
+@sio.event
+@instrument_socket_event
+async def leave_video(sid, data):
+    """Viewer stops receiving a video's comment events"""
+    video_id = (data or {}).get('video_id')
+    if video_id:
+        await sio.leave_room(sid, video_room(video_id))
+
+async def drain_socketio():
+    """Close every Socket.IO session so clients reconnect to a process that is staying up"""
+    sessions = len(sio.eio.sockets)
+    if sessions:
+        logger.info(f"Draining {sessions} Socket.IO session(s)")
+        # An engine.io close reads as a transport drop on the client, which triggers its
+        # reconnection; a Socket.IO-level disconnect would tell it to stay disconnected
+        await sio.eio.disconnect()
+    await sio.shutdown()
+
 # ==================== AUTHENTICATION ENDPOINTS ====================
 
 @api_router.post("/auth/login", response_model=AdminLoginResponse)
@@ -387,26 +571,19 @@ async def upload_video(
     admin: dict = Depends(get_current_admin)
 ):
     """Upload video to Bunny Stream with optional custom thumbnail"""
-    # Validate file type
-    if not file.content_type or not file.content_type.startswith('video/'):
-        raise HTTPException(status_code=400, detail="File must be a video")
+    # Validate both files before anything is sent to Bunny
+    ingested_video = await ingest_video(file)
+    ingested_thumbnail = await ingest_image(thumbnail) if thumbnail else None
     
     try:
          # Upload thumbnail first if provided
         thumbnail_url = None
-        if thumbnail:
-            if not thumbnail.content_type or not thumbnail.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail="Thumbnail must be an image")
-            
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            safe_filename = f"{timestamp}_{thumbnail.filename.replace(' ', '_')}"
-            destination_path = f"thumbnails/{safe_filename}"
-            
-            upload_result = await upload_to_bunny_storage(thumbnail, destination_path)
-            thumbnail_url = upload_result['cdn_url']
+        if ingested_thumbnail:
+            thumbnail_result = await store_image(db, ingested_thumbnail, "thumbnails")
+            thumbnail_url = thumbnail_result['cdn_url']
             logger.info(f"Custom thumbnail uploaded: {thumbnail_url}")
-        # Upload to Bunny Stream (not storage)
-        upload_result = await upload_video_to_bunny_stream(file, title)
+        # Upload to Bunny Stream (not storage); identical files share one Bunny video
+        upload_result = await store_stream_video(db, ingested_video, title)
         
         # Use custom thumbnail if provided, otherwise use Bunny's auto-generated one
         final_thumbnail_url = thumbnail_url or upload_result.get('thumbnail_url')
@@ -434,15 +611,9 @@ async def upload_video(
         logger.info(f"Saving video to database with thumbnail_url: {video_dict.get('thumbnail_url')}")
         
         await db.videos.insert_one(video_dict)
+        await videos_changed(video.id)
         
-        # Create notification
-        notification = Notification(
-            notification_type=NotificationType.NEW_USER,  # Using NEW_USER as generic notification type
-            message=f"New video uploaded: {title}"
-        )
-        notif_dict = notification.model_dump()
-        notif_dict['created_at'] = notif_dict['created_at'].isoformat()
-        await db.notifications.insert_one(notif_dict)
+        await event_bus.publish(VideoUploaded(video_id=video.id, title=title))
         
         return FileUploadResponse(
             success=True,
@@ -463,6 +634,180 @@ async def upload_video(
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# ==================== DIRECT (TUS) VIDEO UPLOADS ====================
+
+# How long a browser may keep starting or resuming a TUS upload with one signature
+DIRECT_UPLOAD_SIGNATURE_SECONDS = int(os.environ.get('DIRECT_UPLOAD_SIGNATURE_SECONDS', '3600'))
+BUNNY_WEBHOOK_TOKEN = os.environ.get('BUNNY_WEBHOOK_TOKEN')
+
+# Pending and failed direct uploads are not part of the catalogue
+LISTED_VIDEO_FILTER = {"upload_status": {"$nin": [VideoUploadStatus.PENDING.value, VideoUploadStatus.FAILED.value]}}
+
+# Listed videos held in memory for the catalogue listings
+video_catalog = VideoCatalog(db, resource_versions, transform_video_response, LISTED_VIDEO_FILTER)
+
+async def videos_changed(*video_ids: str):
+    """After an admin write: invalidate cached listings and patch this worker's catalog"""
+    await resource_versions.bump("videos")
+    related_items.changed("video", video_ids)
+    try:
+        await video_catalog.videos_changed(video_ids)
+    except Exception as e:
+        # The next read reloads it
+        video_catalog.stale = True
+        logger.error(f"Video catalog patch failed: {str(e)}")
+
+async def video_catalog_page(free_only: bool, category, difficulty, search, skip: int, limit: int) -> Response:
+    await video_catalog.ensure_current()
+    body = video_catalog.page(category, difficulty, search, free_only, skip, limit)
+    return Response(content=body, media_type="application/json")
+
+@api_router.get("/video-catalog/stats")
+async def get_video_catalog_stats(admin: dict = Depends(get_current_admin)):
+    """Size, freshness and memory footprint of this worker's video catalog"""
+    await video_catalog.ensure_current()
+    return video_catalog.stats()
+
+
+def direct_upload_response(video: dict) -> DirectVideoUploadResponse:
+    signed = create_tus_upload_signature(video["video_id"], DIRECT_UPLOAD_SIGNATURE_SECONDS)
+    return DirectVideoUploadResponse(
+        id=video["id"],
+        video_id=signed["video_id"],
+        library_id=signed["library_id"],
+        tus_endpoint=signed["endpoint"],
+        signature=signed["signature"],
+        expires_at=signed["expires_at"]
+    )
+
+
+async def finalize_direct_upload(video: dict, bunny_status: int) -> dict:
+    """
+    Move a pending direct upload to ready once Bunny has the file, or to failed if Bunny
+    rejected it. Safe to call from several places at once: the conditional update lets
+    exactly one caller publish VideoUploaded.
+    """
+    if video.get("upload_status") != VideoUploadStatus.PENDING.value:
+        return video
+    if bunny_status in BUNNY_FAILED_STATUSES:
+        upload_status = VideoUploadStatus.FAILED.value
+    elif bunny_status >= 1:
+        upload_status = VideoUploadStatus.READY.value
+    else:
+        return video  # Created but no bytes received yet
+
+    update = {"upload_status": upload_status, "updated_at": datetime.utcnow().isoformat()}
+    result = await db.videos.update_one(
+        {"id": video["id"], "upload_status": VideoUploadStatus.PENDING.value},
+        {"$set": update}
+    )
+    if result.modified_count:
+        logger.info(f"Direct upload for video {video['id']} is now {upload_status}")
+        if upload_status == VideoUploadStatus.READY.value:
+            await videos_changed(video["id"])
+            await event_bus.publish(VideoUploaded(video_id=video["id"], title=video.get("title", "")))
+    return {**video, **update}
+
+
+@api_router.post("/videos/direct-upload", response_model=DirectVideoUploadResponse)
+async def create_direct_video_upload(video_data: VideoCreate, admin: dict = Depends(get_current_admin)):
+    """
+    Start a browser-to-Bunny upload. Creates the Bunny Stream video and a pending video
+    document, and returns a TUS signature. The browser then uploads to tus_endpoint with
+    the headers AuthorizationSignature, AuthorizationExpire, VideoId and LibraryId, and
+    calls POST /videos/{id}/complete-upload when the TUS upload finishes.
+    """
+    bunny_video = await create_bunny_video(video_data.title)
+    bunny_video_id = bunny_video["guid"]
+    urls = bunny_stream_urls(bunny_video_id)
+
+    video = Video(
+        title=video_data.title,
+        category=video_data.category,
+        difficulty=video_data.difficulty,
+        duration=video_data.duration,
+        description=video_data.description,
+        video_url=urls['playback_url'],
+        embed_url=urls['embed_url'],
+        video_id=bunny_video_id,
+        thumbnail_url=video_data.thumbnail_url,
+        is_free=video_data.is_free,
+        upload_status=VideoUploadStatus.PENDING
+    )
+    video_dict = video.model_dump()
+    video_dict['created_at'] = video_dict['created_at'].isoformat()
+    video_dict['updated_at'] = video_dict['updated_at'].isoformat()
+    await db.videos.insert_one(video_dict)
+
+    logger.info(f"Direct upload started for '{video.title}' (video {video.id}, Bunny {bunny_video_id})")
+    return direct_upload_response(video_dict)
+
+
+@api_router.get("/videos/uploads/pending", response_model=List[Video])
+async def get_pending_video_uploads(admin: dict = Depends(get_current_admin)):
+    """Direct uploads that have not completed, so the admin UI can resume or discard them"""
+    videos = await db.videos.find(
+        {"upload_status": {"$in": [VideoUploadStatus.PENDING.value, VideoUploadStatus.FAILED.value]}},
+        {"_id": 0}
+    ).sort("created_at", -1).to_list(100)
+    return [transform_video_response(video) for video in videos]
+
+
+@api_router.post("/videos/{video_id}/upload-signature", response_model=DirectVideoUploadResponse)
+async def renew_direct_upload_signature(video_id: str, admin: dict = Depends(get_current_admin)):
+    """Fresh TUS signature for a pending upload, to resume after the previous one expired"""
+    video = await db.videos.find_one({"id": video_id}, {"_id": 0})
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if video.get("upload_status") != VideoUploadStatus.PENDING.value:
+        raise HTTPException(status_code=409, detail="Video is not awaiting an upload")
+    return direct_upload_response(video)
+
+
+@api_router.post("/videos/{video_id}/complete-upload", response_model=Video)
+async def complete_direct_video_upload(video_id: str, admin: dict = Depends(get_current_admin)):
+    """Called by the browser after its TUS upload finished; Bunny is asked rather than the client trusted"""
+    video = await db.videos.find_one({"id": video_id}, {"_id": 0})
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    if video.get("upload_status") == VideoUploadStatus.PENDING.value:
+        bunny_video = await get_bunny_video(video["video_id"])
+        if bunny_video is None:
+            raise HTTPException(status_code=502, detail="Failed to fetch Bunny video status")
+        video = await finalize_direct_upload(video, bunny_video.get("status", 0))
+        if video["upload_status"] == VideoUploadStatus.PENDING.value:
+            raise HTTPException(status_code=409, detail="Bunny has not received the upload yet")
+
+    return transform_video_response(video)
+
+
+@api_router.post("/webhooks/bunny-stream")
+async def bunny_stream_webhook(request: dict, token: Optional[str] = None):
+    """
+    Bunny Stream status webhook, configured as /api/webhooks/bunny-stream?token=<BUNNY_WEBHOOK_TOKEN>.
+    Finalizes direct uploads whose browser never called complete-upload. Only the
+    VideoGuid is taken from the payload; the status is re-read from the Bunny API.
+    """
+    if not BUNNY_WEBHOOK_TOKEN or not token or not hmac.compare_digest(token, BUNNY_WEBHOOK_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid webhook token")
+
+    bunny_video_id = request.get("VideoGuid")
+    if not bunny_video_id:
+        return {"status": "ignored"}
+
+    video = await db.videos.find_one(
+        {"video_id": bunny_video_id, "upload_status": VideoUploadStatus.PENDING.value}, {"_id": 0}
+    )
+    if not video:
+        return {"status": "ignored"}
+
+    bunny_video = await get_bunny_video(bunny_video_id)
+    if bunny_video is None:
+        raise HTTPException(status_code=502, detail="Failed to fetch Bunny video status")
+    video = await finalize_direct_upload(video, bunny_video.get("status", 0))
+    return {"status": video["upload_status"]}
+
 @api_router.get("/videos", response_model=List[Video])
 async def get_videos(
     category: Optional[str] = None,
@@ -471,24 +816,8 @@ async def get_videos(
     skip: int = 0,
     limit: int = 50
 ):
-    """Get all videos with optional filters"""
-    query = {}
-    if category:
-        query['category'] = category
-    if difficulty:
-        query['difficulty'] = difficulty
-    if search:
-        query['title'] = {"$regex": search, "$options": "i"}
-    
-    videos = await db.videos.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    
-    for video in videos:
-        video = transform_video_response(video)
-        for field in ['created_at', 'updated_at']:
-            if isinstance(video.get(field), str):
-                video[field] = datetime.fromisoformat(video[field])
-    
-    return videos
+    """Get all videos with optional filters, served from the in-memory catalog"""
+    return await video_catalog_page(False, category, difficulty, search, skip, limit)
 
 @api_router.get("/videos/public", response_model=List[Video])
 async def get_public_videos(
@@ -500,25 +829,11 @@ async def get_public_videos(
 ):
     """Get only free/public videos (no authentication required)"""
     try:
-        query = {"is_free": True}
-        if category:
-            query['category'] = category
-        if difficulty:
-            query['difficulty'] = difficulty
-        if search:
-            query['title'] = {"$regex": search, "$options": "i"}
-        
-        videos = await db.videos.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-        
-        # Transform each video to ensure all fields exist
-        for video in videos:
-            video = transform_video_response(video)
-            
-            for field in ['created_at', 'updated_at']:
-                if isinstance(video.get(field), str):
-                    video[field] = datetime.fromisoformat(video[field])
-        
-        return videos
+        # view_count changes with every flush without bumping the catalogue version, so it
+        # is left out of this ETag-cached list; /videos/trending serves popularity
+        return await video_catalog_page(True, category, difficulty, search, skip, limit)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching public videos: {str(e)}")
         raise HTTPException(
@@ -530,11 +845,138 @@ async def get_public_videos(
             }
         )
 
+# ==================== VIDEO VIEWS ====================
+
+TRENDING_MAX_LIMIT = 50
+
+view_counter = ViewCounter(db)
+
+@api_router.post("/videos/{video_id}/view")
+async def record_video_view(video_id: str):
+    """Count one play; buffered in memory and written in batches"""
+    view_counter.record(video_id)
+    return {"status": "recorded"}
+
+@api_router.get("/videos/trending", response_model=List[Video])
+async def get_trending_videos(limit: int = 20):
+    """Videos ranked by time-decayed views over the last few days"""
+    limit = max(1, min(limit, TRENDING_MAX_LIMIT))
+    ranked = await view_counter.trending(limit)
+    if not ranked:
+        return []
+    rank = {video_id: index for index, (video_id, _) in enumerate(ranked)}
+    videos = await catalog_db.videos.find(
+        {"id": {"$in": list(rank)}, **LISTED_VIDEO_FILTER}, {"_id": 0}
+    ).to_list(len(rank))
+    videos.sort(key=lambda video: rank[video['id']])
+    
+    for video in videos:
+        video = transform_video_response(video)
+        for field in ['created_at', 'updated_at']:
+            if isinstance(video.get(field), str):
+                video[field] = datetime.fromisoformat(video[field])
+    
+    return videos
+
+# ==================== WATCH PROGRESS ====================
+
+CONTINUE_WATCHING_MAX_LIMIT = 50
+
+watch_progress = WatchProgressTracker(db)
+
+def watch_progress_response(video_id: str, progress: Optional[dict]) -> WatchProgress:
+    if not progress:
+        return WatchProgress(video_id=video_id)
+    return WatchProgress(
+        video_id=video_id,
+        position_seconds=progress.get('position_seconds', 0.0),
+        duration_seconds=progress.get('duration_seconds'),
+        completed=progress.get('completed', False),
+        updated_at=datetime.fromisoformat(progress['updated_at']) if progress.get('updated_at') else None
+    )
+
+@api_router.post("/videos/{video_id}/progress")
+async def record_watch_progress(
+    video_id: str,
+    heartbeat: WatchProgressHeartbeat,
+    current_user: dict = Depends(get_current_user)
+):
+    """Player heartbeat with the playback position; merged in memory and written in batches"""
+    watch_progress.record(
+        current_user['user_id'], video_id, heartbeat.position_seconds,
+        heartbeat.duration_seconds, heartbeat.completed
+    )
+    return {"status": "recorded"}
+
+@api_router.get("/videos/{video_id}/progress", response_model=WatchProgress)
+async def get_watch_progress(video_id: str, current_user: dict = Depends(get_current_user)):
+    """Where the user left off in a video"""
+    progress = watch_progress.pending(current_user['user_id'], video_id)
+    if progress is None:
+        progress = await db.watch_progress.find_one(
+            {"user_id": current_user['user_id'], "video_id": video_id}, {"_id": 0}
+        )
+    return watch_progress_response(video_id, progress)
+
+@api_router.get("/user/continue-watching", response_model=List[ContinueWatchingItem])
+async def get_continue_watching(limit: int = 12, current_user: dict = Depends(get_current_user)):
+    """Unfinished videos, most recently watched first"""
+    limit = max(1, min(limit, CONTINUE_WATCHING_MAX_LIMIT))
+    rows = await watch_progress.recent(current_user['user_id'], limit)
+    if not rows:
+        return []
+    videos = await catalog_db.videos.find(
+        {"id": {"$in": [row['video_id'] for row in rows]}, **LISTED_VIDEO_FILTER}, {"_id": 0}
+    ).to_list(len(rows))
+    videos_by_id = {video['id']: transform_video_response(video) for video in videos}
+
+    items = []
+    for row in rows:
+        video = videos_by_id.get(row['video_id'])
+        if video:
+            items.append(ContinueWatchingItem(video=video, progress=watch_progress_response(row['video_id'], row)))
+    return items
+
+@api_router.get("/user/programs/{program_id}/progress", response_model=ProgramProgress)
+async def get_program_progress(program_id: str, current_user: dict = Depends(get_current_user)):
+    """Per-video progress through a program's videos"""
+    program = await catalog_db.programs.find_one({"id": program_id}, {"_id": 0, "video_ids": 1})
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+
+    video_ids = program.get('video_ids', [])
+    rows = await watch_progress.for_videos(current_user['user_id'], video_ids) if video_ids else {}
+    videos = [watch_progress_response(video_id, rows.get(video_id)) for video_id in video_ids]
+    completed = sum(1 for progress in videos if progress.completed)
+    return ProgramProgress(
+        program_id=program_id,
+        total_videos=len(video_ids),
+        started_videos=sum(1 for video_id in video_ids if video_id in rows),
+        completed_videos=completed,
+        percent_complete=round(completed / len(video_ids) * 100, 1) if video_ids else 0.0,
+        videos=videos
+    )
+
+# ==================== VIDEO COMMENT COUNTS ====================
+
+COMMENT_COUNTS_MAX_IDS = 200
+
+# Declared before /videos/{video_id} so "comment-counts" is not taken for an id
+@api_router.get("/videos/comment-counts", response_model=Dict[str, int])
+async def get_video_comment_counts(video_ids: str):
+    """Comment counts for a comma-separated list of video ids, for listing grids"""
+    ids = list(dict.fromkeys(video_id.strip() for video_id in video_ids.split(",") if video_id.strip()))
+    if len(ids) > COMMENT_COUNTS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {COMMENT_COUNTS_MAX_IDS} video ids per request")
+    if not ids:
+        return {}
+    return await comment_counts(catalog_db, ids)
+
 @api_router.get("/videos/{video_id}", response_model=Video)
 async def get_video(video_id: str):
     """Get single video by ID"""
     try:
-        video = await db.videos.find_one(
+        video = await catalog_db.videos.find_one(
             {
                 "$or": [
                     {"id": video_id},
@@ -581,6 +1023,7 @@ async def update_video(
     update_data['updated_at'] = datetime.utcnow().isoformat()
     
     result = await db.videos.update_one({"id": video_id}, {"$set": update_data})
+    await videos_changed(video_id)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Video not found")
     
@@ -594,17 +1037,17 @@ async def update_video(
 
 @api_router.delete("/videos/{video_id}")
 async def delete_video(video_id: str, admin: dict = Depends(get_current_admin)):
-    """Delete video from database and Bunny Stream"""
+    """Delete video from database; the Bunny Stream video is removed in the background"""
     video = await db.videos.find_one({"id": video_id}, {"_id": 0})
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
     
-    # Delete from Bunny Stream using the stored video_id
-    bunny_video_id = video.get('video_id')
-    if bunny_video_id:
-        await delete_bunny_stream_video(bunny_video_id)
-    
-    await db.videos.delete_one({"id": video_id})
+    owners = await blob_owners(db, video_cdn_keys(video))
+    deleted = await delete_with_outbox(db, "videos", [video_id], video_cdn_deletions(video, owners))
+    if deleted:
+        await release_blobs(db, owned_blob_ids(video_cdn_keys(video), owners))
+    await videos_changed(video_id)
+    cdn_deletions.notify()
     
     return {"message": "Video deleted successfully"}
 
@@ -623,7 +1066,8 @@ async def get_video_status(video_id: str):
     # Check Bunny Stream API for video status
     config = {
         "stream_library_id": os.environ.get("BUNNY_STREAM_LIBRARY_ID"),
-        "stream_api_key": os.environ.get("BUNNY_STREAM_API_KEY")
+        "stream_api_key": os.environ.get("BUNNY_STREAM_API_KEY"),
+        "stream_api_url": os.environ.get("BUNNY_STREAM_API_URL", "https://video.bunnycdn.com").rstrip("/")
     }
     
     # Check configuration first
@@ -631,17 +1075,18 @@ async def get_video_status(video_id: str):
         return {"status": "config_error", "ready": False}
     
     try:
-        url = f"https://video.bunnycdn.com/library/{config['stream_library_id']}/videos/{bunny_video_id}"
+        url = f"{config['stream_api_url']}/library/{config['stream_library_id']}/videos/{bunny_video_id}"
         headers = {"AccessKey": config["stream_api_key"]}
         
-        async with httpx.AsyncClient() as client:
-            res = await client.get(url, headers=headers)
+        res = await BUNNY_STREAM.request("GET", url, headers=headers)
 
         if res.status_code == 200:
             data = res.json()
             # status: 0=queued, 1=processing, 2=encoding, 3=finished, 4=resolution_finished, 5=error
             status_code = data.get('status', 0)
             is_ready = status_code >= 3
+            # The status poll doubles as the completion tracker for direct uploads
+            video = await finalize_direct_upload(video, status_code)
             thumbnail_url = f"https://vz-{config['stream_library_id']}.b-cdn.net/{bunny_video_id}/thumbnail.jpg" if is_ready else None
 
             if is_ready and thumbnail_url and not video.get("thumbnail_url"):
@@ -649,6 +1094,7 @@ async def get_video_status(video_id: str):
                     {"id": video_id},
                     {"$set": {"thumbnail_url": thumbnail_url, "updated_at": datetime.utcnow().isoformat()}}
                 )
+                await videos_changed(video_id)
 
             return {
                 "status": status_code,
@@ -694,11 +1140,11 @@ async def update_video_thumbnail(video_id: str, admin: dict = Depends(get_curren
         }
 
 
-    url = f"https://video.bunnycdn.com/library/{stream_library_id}/videos/{bunny_video_id}"
+    stream_api_url = os.environ.get("BUNNY_STREAM_API_URL", "https://video.bunnycdn.com").rstrip("/")
+    url = f"{stream_api_url}/library/{stream_library_id}/videos/{bunny_video_id}"
     headers = {"AccessKey": stream_api_key}
 
-    async with httpx.AsyncClient() as client:
-        res = await client.get(url, headers=headers)
+    res = await BUNNY_STREAM.request("GET", url, headers=headers)
 
     if res.status_code != 200:
         raise HTTPException(status_code=502, detail="Failed to fetch Bunny video status")
@@ -713,6 +1159,7 @@ async def update_video_thumbnail(video_id: str, admin: dict = Depends(get_curren
         {"id": video_id},
         {"$set": {"thumbnail_url": thumbnail_url, "updated_at": datetime.utcnow().isoformat()}}
     )
+    await videos_changed(video_id)
 
     return {
         "success": True,
@@ -730,21 +1177,17 @@ async def upload_image(
     description: Optional[str] = Form(None),
     admin: dict = Depends(get_current_admin)
 ):
-    """Upload image to Bunny Storage"""
-    if not file.content_type or not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
-    
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename.replace(' ', '_')}"
-    destination_path = f"images/{safe_filename}"
+    """Upload image and its resized WebP/AVIF variants to Bunny Storage"""
+    ingested = await ingest_image(file)
     
     try:
-        upload_result = await upload_to_bunny_storage(file, destination_path)
+        upload_result = await store_image(db, ingested, "images")
         
         image = Image(
             title=title,
             image_type=ImageType(image_type),
             image_url=upload_result['cdn_url'],
+            variants=upload_result['variants'],
             description=description
         )
         
@@ -757,13 +1200,113 @@ async def upload_image(
             success=True,
             file_name=file.filename,
             file_url=upload_result['cdn_url'],
-            cdn_url=upload_result['cdn_url']
+            cdn_url=upload_result['cdn_url'],
+            variants=upload_result['variants']
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Image upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+BULK_IMAGE_MAX_FILES = int(os.environ.get('BULK_IMAGE_MAX_FILES', '50'))
+BULK_IMAGE_MAX_BYTES = int(os.environ.get('BULK_IMAGE_MAX_BYTES', str(10 * 1024 * 1024)))
+# Files decoded and held in memory at once per bulk request; CDN transfers have their own limit
+BULK_IMAGE_PARALLEL_FILES = int(os.environ.get('BULK_IMAGE_PARALLEL_FILES', '4'))
+
+@api_router.post("/images/upload/bulk", response_model=BulkImageUploadResponse)
+async def bulk_upload_images(
+    files: List[UploadFile] = File(...),
+    image_type: str = Form(...),
+    description: Optional[str] = Form(None),
+    upload_id: Optional[str] = Form(None),
+    admin: dict = Depends(get_current_admin)
+):
+    """
+    Upload several images in one request. Each file gets its own result; progress is
+    pushed to the admin's Socket.IO room as bulk_upload_progress events.
+    """
+    if len(files) > BULK_IMAGE_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_IMAGE_MAX_FILES} files per request")
+    try:
+        image_kind = ImageType(image_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid image type: {image_type}")
+
+    upload_id = upload_id or str(uuid.uuid4())
+    admin_room = f"user_{admin['admin_id']}"
+    file_slots = asyncio.Semaphore(BULK_IMAGE_PARALLEL_FILES)
+    completed = 0
+
+    async def process(index: int, file: UploadFile) -> BulkImageUploadResult:
+        nonlocal completed
+        file_name = file.filename or f"image_{index}"
+        result = BulkImageUploadResult(index=index, file_name=file_name)
+        async with file_slots:
+            try:
+                ingested = await ingest_image(file, BULK_IMAGE_MAX_BYTES)
+                upload_result = await store_image(db, ingested, "images")
+                result.image = Image(
+                    title=Path(file_name).stem,
+                    image_type=image_kind,
+                    image_url=upload_result['cdn_url'],
+                    variants=upload_result['variants'],
+                    description=description
+                )
+                result.success = True
+            except HTTPException as e:
+                result.error = str(e.detail)
+            except Exception as e:
+                logger.error(f"Bulk image upload error for {file_name}: {str(e)}")
+                result.error = str(e)
+        completed += 1
+        await sio.emit('bulk_upload_progress', {
+            'upload_id': upload_id,
+            'index': index,
+            'file_name': file_name,
+            'success': result.success,
+            'error': result.error,
+            'completed': completed,
+            'total': len(files)
+        }, room=admin_room)
+        return result
+
+    results = await asyncio.gather(*(process(index, file) for index, file in enumerate(files)))
+
+    uploaded = [result for result in results if result.success]
+    if uploaded:
+        image_dicts = []
+        for result in uploaded:
+            image_dict = result.image.model_dump()
+            image_dict['created_at'] = image_dict['created_at'].isoformat()
+            image_dicts.append(image_dict)
+        try:
+            await db.images.insert_many(image_dicts)
+        except Exception as e:
+            logger.error(f"Bulk image insert failed for upload {upload_id}: {str(e)}")
+            # An ordered insert stops at the first error; everything before it was written
+            saved = e.details.get('nInserted', 0) if isinstance(e, BulkWriteError) else 0
+            for result in uploaded[saved:]:
+                result.success = False
+                result.image = None
+                result.error = "Uploaded to storage but the image record could not be saved"
+
+    uploaded_count = sum(1 for result in results if result.success)
+    await sio.emit('bulk_upload_complete', {
+        'upload_id': upload_id,
+        'uploaded': uploaded_count,
+        'failed': len(results) - uploaded_count
+    }, room=admin_room)
+
+    return BulkImageUploadResponse(
+        upload_id=upload_id,
+        total=len(results),
+        uploaded=uploaded_count,
+        failed=len(results) - uploaded_count,
+        results=results
+    )
+
 @api_router.get("/images", response_model=List[Image])
 async def get_images(
     image_type: Optional[str] = None,
@@ -785,20 +1328,49 @@ async def get_images(
 
 @api_router.delete("/images/{image_id}")
 async def delete_image(image_id: str, admin: dict = Depends(get_current_admin)):
-    """Delete image"""
+    """Delete image; its CDN files are removed in the background"""
     image = await db.images.find_one({"id": image_id}, {"_id": 0})
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    cdn_url = image.get('image_url', '')
-    if 'images/' in cdn_url:
-        file_path = cdn_url.split('/')[-2] + '/' + cdn_url.split('/')[-1]
-        await delete_from_bunny_cdn(file_path)
-    
-    await db.images.delete_one({"id": image_id})
+    owners = await blob_owners(db, image_cdn_keys(image))
+    deleted = await delete_with_outbox(db, "images", [image_id], image_cdn_deletions(image, owners))
+    if deleted:
+        await release_blobs(db, owned_blob_ids(image_cdn_keys(image), owners))
+    cdn_deletions.notify()
     
     return {"message": "Image deleted successfully"}
 
+@api_router.post("/images/bulk-delete", response_model=BulkDeleteResponse)
+async def bulk_delete_images(request: BulkDeleteRequest, admin: dict = Depends(get_current_admin)):
+    """Delete many images at once; returns as soon as the rows are gone and their CDN files queued"""
+    ids = list(dict.fromkeys(request.ids))
+    if len(ids) > BULK_DELETE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_DELETE_MAX_ITEMS} ids per request")
+
+    images = await db.images.find({"id": {"$in": ids}}, {"_id": 0}).to_list(len(ids))
+    found = {image['id'] for image in images}
+    owners = await blob_owners(db, [key for image in images for key in image_cdn_keys(image)])
+    records = [record for image in images for record in image_cdn_deletions(image, owners)]
+
+    deleted = await delete_with_outbox(db, "images", list(found), records) if found else 0
+    queued = len(records)
+    if deleted == len(found):
+        queued += await release_blobs(db, [
+            blob_id for image in images for blob_id in owned_blob_ids(image_cdn_keys(image), owners)
+        ])
+    else:
+        # Some rows went in a concurrent delete that releases them itself; rather leak references than drop them twice
+        logger.warning(f"Bulk image delete removed {deleted} of {len(found)} images; their blob references are kept")
+    cdn_deletions.notify()
+
+    return BulkDeleteResponse(
+        requested=len(ids),
+        deleted=deleted,
+        not_found=[image_id for image_id in ids if image_id not in found],
+        cdn_deletions_queued=queued
+    )
+
 # ==================== PROGRAM IMAGE UPLOAD ENDPOINT ====================
 
 @api_router.post("/programs/upload-image", response_model=FileUploadResponse)
@@ -806,24 +1378,22 @@ async def upload_program_image(
     file: UploadFile = File(...),
     admin: dict = Depends(get_current_admin)
 ):
-    """Upload program image to Bunny Storage"""
-    if not file.content_type or not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
-    
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{file.filename.replace(' ', '_')}"
-    destination_path = f"programs/{safe_filename}"
+    """Upload program image and its resized variants to Bunny Storage"""
+    ingested = await ingest_image(file)
     
     try:
-        upload_result = await upload_to_bunny_storage(file, destination_path)
+        upload_result = await store_image(db, ingested, "programs")
         
         return FileUploadResponse(
             success=True,
             file_name=file.filename,
             file_url=upload_result['cdn_url'],
-            cdn_url=upload_result['cdn_url']
+            cdn_url=upload_result['cdn_url'],
+            variants=upload_result['variants']
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Program image upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -842,16 +1412,16 @@ async def create_product(product: ProductCreate, admin: dict = Depends(get_curre
     product_dict['updated_at'] = product_dict['updated_at'].isoformat()
     
     await db.products.insert_one(product_dict)
+    await resource_versions.bump("products")
+    related_items.changed("product", [new_product.id])
     
     # Check for low stock and create notification
-    if new_product.stock < 10:
-        notification = Notification(
-            notification_type=NotificationType.LOW_STOCK,
-            message=f"Low stock alert: {new_product.name} has only {new_product.stock} items left"
-        )
-        notif_dict = notification.model_dump()
-        notif_dict['created_at'] = notif_dict['created_at'].isoformat()
-        await db.notifications.insert_one(notif_dict)
+    if new_product.stock < LOW_STOCK_THRESHOLD:
+        await event_bus.publish(ProductLowStock(
+            product_id=new_product.id,
+            name=new_product.name,
+            stock=new_product.stock
+        ))
     
     return new_product
 
@@ -869,7 +1439,7 @@ async def get_products(
     if search:
         query['name'] = {"$regex": search, "$options": "i"}
     
-    products = await db.products.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
+    products = await catalog_db.products.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
     
     for product in products:
         product = ensure_product_media(product)
@@ -882,7 +1452,7 @@ async def get_products(
 @api_router.get("/products/{product_id}", response_model=Product)
 async def get_product(product_id: str):
     """Get single product"""
-    product = await db.products.find_one({"id": product_id}, {"_id": 0})
+    product = await catalog_db.products.find_one({"id": product_id}, {"_id": 0})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -907,15 +1477,17 @@ async def update_product(
         raise HTTPException(status_code=400, detail="No fields to update")
     
     update_data['updated_at'] = datetime.utcnow().isoformat()
+    normalize_product_images(update_data)
     
-    # Normalize image URLs if provided
-    if 'image_urls' in update_data and update_data['image_urls'] is not None:
-        update_data['image_urls'] = [
-            url for url in (normalize_media_url(url) for url in update_data.get('image_urls', [])) if url
-        ]
-    
-    result = await db.products.update_one({"id": product_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.products.find_one_and_update(
+        {"id": product_id},
+        {"$set": update_data},
+        projection={"_id": 0, "stock": 1},
+        return_document=ReturnDocument.BEFORE
+    )
+    await resource_versions.bump("products")
+    related_items.changed("product", [product_id])
+    if previous is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
     updated_product = await db.products.find_one({"id": product_id}, {"_id": 0})
@@ -925,15 +1497,13 @@ async def update_product(
         if isinstance(updated_product.get(field), str):
             updated_product[field] = datetime.fromisoformat(updated_product[field])
     
-    # Check for low stock
-    if updated_product.get('stock', 0) < 10:
-        notification = Notification(
-            notification_type=NotificationType.LOW_STOCK,
-            message=f"Low stock alert: {updated_product['name']} has only {updated_product['stock']} items left"
-        )
-        notif_dict = notification.model_dump()
-        notif_dict['created_at'] = notif_dict['created_at'].isoformat()
-        await db.notifications.insert_one(notif_dict)
+    # Only alert when stock crosses the threshold, not on every edit while it is low
+    if updated_product.get('stock', 0) < LOW_STOCK_THRESHOLD <= previous.get('stock', 0):
+        await event_bus.publish(ProductLowStock(
+            product_id=product_id,
+            name=updated_product['name'],
+            stock=updated_product['stock']
+        ))
     
     return updated_product
 
@@ -941,6 +1511,8 @@ async def update_product(
 async def delete_product(product_id: str, admin: dict = Depends(get_current_admin)):
     """Delete product"""
     result = await db.products.delete_one({"id": product_id})
+    await resource_versions.bump("products")
+    related_items.changed("product", [product_id])
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
@@ -1146,11 +1718,7 @@ async def create_razorpay_order(order_data: OrderCreate, user: dict = Depends(ge
         total_amount = round(total_amount, 2)
         
         # Create order in Razorpay (amount in paise)
-        razorpay_order = razorpay_client.order.create({
-            "amount": int(total_amount * 100),  # Convert to paise
-            "currency": "INR",
-            "payment_capture": 1
-        })
+        razorpay_order = await razorpay_create_order(int(total_amount * 100))
         
         now = datetime.utcnow()
         estimated_delivery_date, estimated_delivery_time = get_delivery_estimate(now)
@@ -1181,14 +1749,11 @@ async def create_razorpay_order(order_data: OrderCreate, user: dict = Depends(ge
         
         await db.orders.insert_one(order_dict)
         
-        # Create notification
-        notification = Notification(
-            notification_type=NotificationType.NEW_ORDER,
-            message=f"New order received: {order_data.customer_name} - ₹{total_amount}"
-        )
-        notif_dict = notification.model_dump()
-        notif_dict['created_at'] = notif_dict['created_at'].isoformat()
-        await db.notifications.insert_one(notif_dict)
+        await event_bus.publish(OrderCreated(
+            order_id=order.id,
+            customer_name=order_data.customer_name,
+            total_amount=total_amount
+        ))
         
         return {
             "order_id": order.id,
@@ -1296,12 +1861,14 @@ async def verify_payment(
         
         await db.payments.insert_one(payment_dict)
         
-        # Update product stock
-        for item in order['items']:
-            await db.products.update_one(
-                {"id": item['product_id']},
-                {"$inc": {"stock": -item['quantity']}}
-            )
+        # Update product stock in one round trip
+        stock_updates = [
+            UpdateOne({"id": item['product_id']}, {"$inc": {"stock": -item['quantity']}})
+            for item in order['items']
+        ]
+        if stock_updates:
+            await db.products.bulk_write(stock_updates, ordered=False)
+            await resource_versions.bump("products")
         
         logger.info(f"Payment verified successfully for order: {order['id']}")
         
@@ -1406,14 +1973,7 @@ async def razorpay_webhook(request: dict):
                 }
             )
             
-            # Create notification
-            notification = Notification(
-                notification_type=NotificationType.FAILED_PAYMENT,
-                message=f"Payment failed for order {razorpay_order_id}"
-            )
-            notif_dict = notification.model_dump()
-            notif_dict['created_at'] = notif_dict['created_at'].isoformat()
-            await db.notifications.insert_one(notif_dict)
+            await event_bus.publish(PaymentFailed(razorpay_order_id=razorpay_order_id or ""))
         
         return {"status": "success", "message": "Webhook processed"}
     
@@ -1512,7 +2072,7 @@ async def update_delivery_time(
 @api_router.get("/orders/export/csv")
 async def export_orders_csv(admin: dict = Depends(get_current_admin)):
     """Export orders to CSV"""
-    orders = await db.orders.find({}, {"_id": 0}).to_list(1000)
+    orders = await analytics_db.orders.find({}, {"_id": 0}).to_list(1000)
     
     # Create CSV in memory
     output = io.StringIO()
@@ -1555,7 +2115,7 @@ async def get_users(
     admin: dict = Depends(get_current_admin)
 ):
     """Get all users"""
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).skip(skip).limit(limit).to_list(limit)
+    users = await analytics_db.users.find({}, {"_id": 0, "password_hash": 0}).skip(skip).limit(limit).to_list(limit)
     
     for user in users:
         if isinstance(user.get('created_at'), str):
@@ -1566,12 +2126,12 @@ async def get_users(
 @api_router.get("/users/{user_id}")
 async def get_user(user_id: str, admin: dict = Depends(get_current_admin)):
     """Get single user with purchase history"""
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+    user = await analytics_db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Get user's orders
-    orders = await db.orders.find({"user_id": user_id}, {"_id": 0}).to_list(100)
+    orders = await analytics_db.orders.find({"user_id": user_id}, {"_id": 0}).to_list(100)
     
     if isinstance(user.get('created_at'), str):
         user['created_at'] = datetime.fromisoformat(user['created_at'])
@@ -1587,66 +2147,69 @@ async def get_user(user_id: str, admin: dict = Depends(get_current_admin)):
 async def get_dashboard_analytics(admin: dict = Depends(get_current_admin)):
     """Get dashboard analytics"""
     # Total users
-    total_users = await db.users.count_documents({})
+    total_users = await analytics_db.users.count_documents({})
     
     # Total revenue and orders
-    orders = await db.orders.find({"payment_status": PaymentStatus.SUCCESS.value}, {"_id": 0}).to_list(10000)
+    orders = await analytics_db.orders.find(
+        {"payment_status": PaymentStatus.SUCCESS.value},
+        {"_id": 0, "total_amount": 1, "items": 1, "created_at": 1}
+    ).to_list(10000)
     total_revenue = sum(order['total_amount'] for order in orders)
     total_orders = len(orders)
     
     # Orders today
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-    orders_today = await db.orders.count_documents({
+    orders_today = await analytics_db.orders.count_documents({
         "created_at": {"$gte": today_start},
         "payment_status": PaymentStatus.SUCCESS.value
     })
     
     # Popular products (top 5)
-    all_orders = await db.orders.find({"payment_status": PaymentStatus.SUCCESS.value}, {"_id": 0}).to_list(10000)
     product_sales = {}
-    for order in all_orders:
+    for order in orders:
         for item in order.get('items', []):
             product_id = item['product_id']
             product_sales[product_id] = product_sales.get(product_id, 0) + item['quantity']
     
     popular_product_ids = sorted(product_sales.items(), key=lambda x: x[1], reverse=True)[:5]
+    product_names = {
+        product['id']: product['name']
+        for product in await analytics_db.products.find(
+            {"id": {"$in": [prod_id for prod_id, _ in popular_product_ids]}},
+            {"_id": 0, "id": 1, "name": 1}
+        ).to_list(len(popular_product_ids))
+    }
     popular_products = []
     for prod_id, quantity in popular_product_ids:
-        product = await db.products.find_one({"id": prod_id}, {"_id": 0})
-        if product:
+        if prod_id in product_names:
             popular_products.append({
-                "name": product['name'],
+                "name": product_names[prod_id],
                 "sales": quantity
             })
     
     # Most watched videos (top 5)
-    most_watched = await db.videos.find(
+    most_watched = await analytics_db.videos.find(
         {},
         {"_id": 0, "title": 1, "view_count": 1}
     ).sort("view_count", -1).limit(5).to_list(5)
     
     # Payment success rate
-    all_payments = await db.payments.find({}, {"_id": 0}).to_list(10000)
+    all_payments = await analytics_db.payments.find({}, {"_id": 0}).to_list(10000)
     total_payments = len(all_payments)
     successful_payments = sum(1 for p in all_payments if p['status'] == PaymentStatus.SUCCESS.value)
     payment_success_rate = (successful_payments / total_payments * 100) if total_payments > 0 else 0
     
-    # Monthly revenue (last 6 months)
+    # Monthly revenue (last 6 months), bucketed from the successful orders already loaded
     monthly_revenue = []
-    from datetime import timedelta
     for i in range(6):
         month_start = (datetime.utcnow().replace(day=1) - timedelta(days=30*i)).replace(day=1)
         month_end = (month_start + timedelta(days=32)).replace(day=1)
+        month_start_iso, month_end_iso = month_start.isoformat(), month_end.isoformat()
         
-        month_orders = await db.orders.find({
-            "payment_status": PaymentStatus.SUCCESS.value,
-            "created_at": {
-                "$gte": month_start.isoformat(),
-                "$lt": month_end.isoformat()
-            }
-        }, {"_id": 0}).to_list(10000)
-        
-        month_total = sum(order['total_amount'] for order in month_orders)
+        month_total = sum(
+            order['total_amount'] for order in orders
+            if month_start_iso <= str(order.get('created_at', '')) < month_end_iso
+        )
         monthly_revenue.insert(0, {
             "month": month_start.strftime("%b %Y"),
             "revenue": month_total
@@ -1663,11 +2226,158 @@ async def get_dashboard_analytics(admin: dict = Depends(get_current_admin)):
         monthly_revenue=monthly_revenue
     )
 
+# ==================== UNREAD COUNTERS ====================
+
+# Notifications are shared by all admins, so they use a single counter
+ADMIN_NOTIFICATIONS_COUNTER = "notifications:admin"
+
+
+def chat_unread_counter_key(receiver_id: Optional[str]) -> str:
+    """Counter key for a chat inbox (messages without a receiver go to the admins)"""
+    return f"chat:{receiver_id or 'admin'}"
+
+
+def chat_unread_query(receiver_id: Optional[str]) -> dict:
+    return {"receiver_id": receiver_id, "is_read": False}
+
+
+def unread_source(key: str):
+    """The collection and query a counter key counts"""
+    if key == ADMIN_NOTIFICATIONS_COUNTER:
+        return db.notifications, {"is_read": False}
+    receiver_id = key.split(":", 1)[1]
+    return db.chat_messages, chat_unread_query(None if receiver_id == 'admin' else receiver_id)
+
+
+async def seed_unread_counter(key: str):
+    """Create a missing counter from a count over its rows; a no-op if it exists"""
+    collection, unread_query = unread_source(key)
+    unread = await collection.count_documents(unread_query)
+    await db.unread_counters.update_one({"key": key}, {"$setOnInsert": {"count": unread}}, upsert=True)
+
+
+async def adjust_unread_counter(key: str, delta: int):
+    """
+    Atomically move an unread counter by delta, after the rows were written. A
+    missing counter is seeded from the rows instead, which already include this
+    change; upserting it at delta would drop the unread backlog from before
+    counters existed.
+    """
+    if not delta:
+        return
+    result = await db.unread_counters.update_one({"key": key}, {"$inc": {"count": delta}})
+    if result.matched_count == 0:
+        await seed_unread_counter(key)
+
+
+async def get_unread_counter(key: str) -> int:
+    """
+    Read an unread counter. A missing counter is seeded once from a count over
+    the collection, after which every read is a single indexed lookup.
+    """
+    counter = await db.unread_counters.find_one({"key": key}, {"_id": 0, "count": 1})
+    if counter is None:
+        await seed_unread_counter(key)
+        counter = await db.unread_counters.find_one({"key": key}, {"_id": 0, "count": 1})
+    return max(0, int(counter.get("count", 0)))
+
+# ==================== DOMAIN EVENT SUBSCRIBERS ====================
+
+def notification_for_event(event: DomainEvent) -> Optional[Notification]:
+    """Map a domain event to the admin notification it should produce"""
+    if isinstance(event, VideoUploaded):
+        # Using NEW_USER as generic notification type
+        return Notification(
+            notification_type=NotificationType.NEW_USER,
+            message=f"New video uploaded: {event.title}",
+            metadata={"video_id": event.video_id}
+        )
+    if isinstance(event, ProductLowStock):
+        return Notification(
+            notification_type=NotificationType.LOW_STOCK,
+            message=f"Low stock alert: {event.name} has only {event.stock} items left",
+            metadata={"product_id": event.product_id}
+        )
+    if isinstance(event, OrderCreated):
+        return Notification(
+            notification_type=NotificationType.NEW_ORDER,
+            message=f"New order received: {event.customer_name} - ₹{event.total_amount}",
+            metadata={"order_id": event.order_id}
+        )
+    if isinstance(event, BookingCreated):
+        attendance_text = "at gym" if event.attendance_type == AttendanceType.GYM.value else "at home"
+        return Notification(
+            notification_type=NotificationType.NEW_ORDER,
+            message=f"New booking: {event.user_name} booked {event.program_title} {attendance_text} on {event.booking_date}",
+            metadata={"booking_id": event.booking_id}
+        )
+    if isinstance(event, PaymentFailed):
+        return Notification(
+            notification_type=NotificationType.FAILED_PAYMENT,
+            message=f"Payment failed for order {event.razorpay_order_id}",
+            metadata={"razorpay_order_id": event.razorpay_order_id}
+        )
+    if isinstance(event, CatalogBulkChanged):
+        verb = {"update": "updated", "delete": "deleted", "import": "imported"}.get(event.action, event.action)
+        return Notification(
+            notification_type=NotificationType.CATALOG_UPDATE,
+            message=f"Bulk {event.action}: {event.count} {event.resource} {verb}",
+            metadata={"resource": event.resource, "action": event.action, "ids": event.ids}
+        )
+    return None
+
+
+async def persist_notifications(events: List[DomainEvent]):
+    """Batch-insert notifications for a batch of events and push them to admins"""
+    notif_dicts = []
+    for event in events:
+        notification = notification_for_event(event)
+        if notification is None:
+            continue
+        notif_dict = notification.model_dump()
+        # Keyed on the event, so an outbox replay (here or in another worker) cannot notify twice
+        notif_dict['id'] = event.id
+        notif_dict['created_at'] = event.occurred_at.isoformat()
+        notif_dicts.append(notif_dict)
+
+    if not notif_dicts:
+        return
+
+    operations = [UpdateOne({"id": n['id']}, {"$setOnInsert": dict(n)}, upsert=True) for n in notif_dicts]
+    try:
+        upserted = (await db.notifications.bulk_write(operations, ordered=False)).upserted_ids
+    except BulkWriteError as e:
+        # A concurrent replay inserted the same id first; anything else is a real failure
+        if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+            raise
+        upserted = {row['index']: row['_id'] for row in e.details.get('upserted', [])}
+    inserted = [notif_dicts[index] for index in sorted(upserted)]
+
+    await adjust_unread_counter(ADMIN_NOTIFICATIONS_COUNTER, len(inserted))
+    for notif_dict in inserted:
+        await sio.emit('new_notification', notif_dict, room='admin_room')
+
+
+event_bus.subscribe(
+    "notifications",
+    persist_notifications,
+    event_types=[VideoUploaded, ProductLowStock, OrderCreated, BookingCreated, PaymentFailed, CatalogBulkChanged],
+    batch_size=int(os.environ.get('NOTIFICATION_BATCH_SIZE', '50')),
+    batch_interval=float(os.environ.get('NOTIFICATION_BATCH_INTERVAL_SECONDS', '0.5'))
+)
+
+
+@api_router.get("/events/stats")
+async def get_event_bus_stats(admin: dict = Depends(get_current_admin)):
+    """Queue depths, drops and failures per event subscriber"""
+    return event_bus.stats()
+
 # ==================== NOTIFICATION ENDPOINTS ====================
 
 @api_router.get("/notifications", response_model=List[Notification])
 async def get_notifications(
     unread_only: bool = False,
+    include_archived: bool = False,
     skip: int = 0,
     limit: int = 20,
     admin: dict = Depends(get_current_admin)
@@ -1677,7 +2387,12 @@ async def get_notifications(
     if unread_only:
         query['is_read'] = False
     
-    notifications = await db.notifications.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
+    if include_archived:
+        notifications = await find_including_archives(
+            db, "notifications", query, [("created_at", -1)], skip, limit
+        )
+    else:
+        notifications = await db.notifications.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
     
     for notif in notifications:
         if isinstance(notif.get('created_at'), str):
@@ -1685,6 +2400,37 @@ async def get_notifications(
     
     return notifications
 
+@api_router.get("/notifications/unread-count", response_model=UnreadCountResponse)
+async def get_unread_notification_count(admin: dict = Depends(get_current_admin)):
+    """Unread notification badge count, served from the maintained counter"""
+    unread = await get_unread_counter(ADMIN_NOTIFICATIONS_COUNTER)
+    return UnreadCountResponse(unread_count=unread)
+
+@api_router.put("/notifications/mark-all-read")
+async def mark_all_notifications_read(admin: dict = Depends(get_current_admin)):
+    """Mark every unread notification as read in one update"""
+    result = await db.notifications.update_many(
+        {"is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.utcnow()}}
+    )
+    await adjust_unread_counter(ADMIN_NOTIFICATIONS_COUNTER, -result.modified_count)
+    
+    return {"message": "Notifications marked as read", "updated": result.modified_count}
+
+@api_router.put("/notifications/mark-read")
+async def mark_notifications_read(payload: MarkReadRequest, admin: dict = Depends(get_current_admin)):
+    """Mark a list of notifications as read in one update"""
+    if not payload.ids:
+        return {"message": "Notifications marked as read", "updated": 0}
+    
+    result = await db.notifications.update_many(
+        {"id": {"$in": payload.ids}, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.utcnow()}}
+    )
+    await adjust_unread_counter(ADMIN_NOTIFICATIONS_COUNTER, -result.modified_count)
+    
+    return {"message": "Notifications marked as read", "updated": result.modified_count}
+
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(
     notification_id: str,
@@ -1692,20 +2438,180 @@ async def mark_notification_read(
 ):
     """Mark notification as read"""
     result = await db.notifications.update_one(
-        {"id": notification_id},
-        {"$set": {"is_read": True}}
+        {"id": notification_id, "is_read": False},
+        {"$set": {"is_read": True, "read_at": datetime.utcnow()}}
     )
     
     if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Notification not found")
+        # Already read (keep its original read_at for the TTL) or missing
+        if not await db.notifications.find_one({"id": notification_id}, {"_id": 0, "id": 1}):
+            raise HTTPException(status_code=404, detail="Notification not found")
+    else:
+        await adjust_unread_counter(ADMIN_NOTIFICATIONS_COUNTER, -1)
     
     return {"message": "Notification marked as read"}
 
+# ==================== RETENTION ENDPOINTS ====================
+
+async def release_archived_unread(collection: str, docs: List[dict]):
+    """Keep unread counters in step with unread rows moved to the archives"""
+    deltas = {}
+    for doc in docs:
+        if doc.get('is_read'):
+            continue
+        if collection == "notifications":
+            key = ADMIN_NOTIFICATIONS_COUNTER
+        else:
+            key = chat_unread_counter_key(doc.get('receiver_id'))
+        deltas[key] = deltas.get(key, 0) - 1
+    for key, delta in deltas.items():
+        await adjust_unread_counter(key, delta)
+
+
+archiver = Archiver(db, on_archived=release_archived_unread)
+
+
+@api_router.get("/retention/stats")
+async def get_retention_stats(admin: dict = Depends(get_current_admin)):
+    """Sizes of the hot collections and the outcome of the last archive run"""
+    return {
+        "collections": await collection_sizes(db, ARCHIVED_COLLECTIONS),
+        "last_run": archiver.last_run,
+        "last_moved": archiver.last_moved
+    }
+
+
+@api_router.post("/retention/run")
+async def run_retention(admin: dict = Depends(get_current_admin)):
+    """Run the archiver immediately"""
+    moved = await archiver.run_once()
+    return {"message": "Archive run complete", "moved": moved}
+
+# ==================== CDN DELETION OUTBOX ====================
+
+BULK_DELETE_MAX_ITEMS = int(os.environ.get('BULK_DELETE_MAX_ITEMS', '500'))
+
+
+def cdn_storage_path(cdn_url: str, folder: str) -> Optional[str]:
+    """'<folder>/<file>' for a Bunny Storage URL under `folder`, None for anything else"""
+    if not cdn_url or f"{folder}/" not in cdn_url:
+        return None
+    return cdn_url.split('/')[-2] + '/' + cdn_url.split('/')[-1]
+
+
+def video_cdn_keys(video: dict) -> List[str]:
+    return [key for key in (video.get('video_id'), video.get('thumbnail_url')) if key]
+
+
+def image_cdn_keys(image: dict) -> List[str]:
+    return [key for key in [image.get('image_url')] + variant_urls(image.get('variants')) if key]
+
+
+def video_cdn_deletions(video: dict, owners: Dict[str, dict]) -> List[dict]:
+    """
+    Outbox records for a video's Bunny Stream video and custom thumbnail. Assets owned
+    by a blob are skipped; they go when release_blobs drops the last reference.
+    """
+    records = []
+    if video.get('video_id') and video['video_id'] not in owners:
+        records.append(deletion_record(STREAM_VIDEO, video['video_id'], "videos", video['id']))
+    thumbnail_path = cdn_storage_path(video.get('thumbnail_url', ''), "thumbnails")
+    if thumbnail_path and video['thumbnail_url'] not in owners:
+        records.append(deletion_record(STORAGE_FILE, thumbnail_path, "videos", video['id']))
+    return records
+
+
+def image_cdn_deletions(image: dict, owners: Dict[str, dict]) -> List[dict]:
+    """Outbox records for an image's original and its resized variants, other than blob-owned ones"""
+    records = []
+    for cdn_url in image_cdn_keys(image):
+        file_path = cdn_storage_path(cdn_url, "images")
+        if file_path and cdn_url not in owners:
+            records.append(deletion_record(STORAGE_FILE, file_path, "images", image['id']))
+    return records
+
+
+cdn_deletions = CdnDeletionWorker(db, {
+    STREAM_VIDEO: delete_bunny_stream_video,
+    STORAGE_FILE: delete_from_bunny_cdn
+})
+
+
+# Every field that may hold the URL of a stored image: uploads are deduplicated by
+# content and admins paste gallery URLs into other records, so any of them can share
+# a blob with a trainer or program
+IMAGE_URL_FIELDS = (
+    ("trainers", "image_url"),
+    ("programs", "image_url"),
+    ("images", "image_url"),
+    ("videos", "thumbnail_url"),
+    ("products", "image_urls"),
+    ("testimonials", "image_url"),
+    ("carts", "items.image_url"),
+    ("orders", "items.product_image_url"),
+)
+
+
+async def image_urls_in_use(urls: Set[str]) -> Set[str]:
+    """The subset of `urls` still referenced by some row"""
+    in_use = set()
+    for collection, field in IMAGE_URL_FIELDS:
+        values = await db[collection].distinct(field, {field: {"$in": list(urls)}})
+        in_use.update(value for value in values if value in urls)
+    return in_use
+
+
+async def release_unused_images(rows: List[dict]) -> int:
+    """
+    Drop the blob references held by the image_url of trainer or program rows that
+    were deleted or given a new image. A trainer or program image upload takes one
+    reference however many rows reuse its URL, so a blob is kept while any row in
+    IMAGE_URL_FIELDS still points at its original or one of its variants.
+    """
+    urls = {row['image_url'] for row in rows if row.get('image_url')}
+    if not urls:
+        return 0
+    owners = await blob_owners(db, urls)
+    blobs = {owners[url]['id']: owners[url] for url in urls if url in owners}
+    if not blobs:
+        return 0
+    keys = {
+        blob_id: {key for key in [blob.get('cdn_url')] + variant_urls(blob.get('variants')) if key}
+        for blob_id, blob in blobs.items()
+    }
+    in_use = await image_urls_in_use(set().union(*keys.values()))
+    queued = await release_blobs(db, [blob_id for blob_id, blob_keys in keys.items() if not blob_keys & in_use])
+    if queued:
+        cdn_deletions.notify()
+    return queued
+
+
+def replaced_images(previous: Dict[str, dict], updates: Dict[str, dict]) -> List[dict]:
+    """Previous rows whose image_url an update replaced"""
+    return [
+        row for row_id, row in previous.items()
+        if 'image_url' in updates[row_id] and updates[row_id]['image_url'] != row.get('image_url')
+    ]
+
+
+@api_router.get("/cdn-deletions/stats")
+async def get_cdn_deletion_stats(admin: dict = Depends(get_current_admin)):
+    """Pending and dead-lettered CDN deletions, plus outcomes since this worker started"""
+    return await cdn_deletions.stats()
+
+
+@api_router.post("/cdn-deletions/requeue-dead")
+async def requeue_dead_cdn_deletions(admin: dict = Depends(get_current_admin)):
+    """Give dead-lettered CDN deletions a fresh set of attempts"""
+    requeued = await cdn_deletions.requeue_dead()
+    return {"message": "Dead CDN deletions requeued", "requeued": requeued}
+
 # ==================== CHAT ENDPOINTS ====================
 
 @api_router.get("/chat/messages", response_model=List[ChatMessage])
 async def get_chat_messages(
     user_id: Optional[str] = None,
+    include_archived: bool = False,
     skip: int = 0,
     limit: int = 50,
     user: dict = Depends(get_current_user)
@@ -1718,7 +2624,12 @@ async def get_chat_messages(
         ]
     }
     
-    messages = await db.chat_messages.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", 1).to_list(limit)
+    if include_archived:
+        messages = await find_including_archives(
+            db, "chat_messages", query, [("created_at", 1)], skip, limit
+        )
+    else:
+        messages = await db.chat_messages.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", 1).to_list(limit)
     
     for msg in messages:
         if isinstance(msg.get('created_at'), str):
@@ -1729,6 +2640,7 @@ async def get_chat_messages(
 @api_router.get("/chat/admin/messages", response_model=List[ChatMessage])
 async def get_admin_chat_messages(
     user_id: Optional[str] = None,
+    include_archived: bool = False,
     skip: int = 0,
     limit: int = 100,
     admin: dict = Depends(get_current_admin)
@@ -1743,7 +2655,12 @@ async def get_admin_chat_messages(
             ]
         }
     
-    messages = await db.chat_messages.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", 1).to_list(limit)
+    if include_archived:
+        messages = await find_including_archives(
+            db, "chat_messages", query, [("created_at", 1)], skip, limit
+        )
+    else:
+        messages = await db.chat_messages.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", 1).to_list(limit)
     
     for msg in messages:
         if isinstance(msg.get('created_at'), str):
@@ -1751,16 +2668,64 @@ async def get_admin_chat_messages(
     
     return messages
 
+@api_router.get("/chat/unread-count", response_model=UnreadCountResponse)
+async def get_chat_unread_count(user: dict = Depends(get_current_user)):
+    """Unread chat messages addressed to the current user"""
+    unread = await get_unread_counter(chat_unread_counter_key(user['user_id']))
+    return UnreadCountResponse(unread_count=unread)
+
+@api_router.get("/chat/admin/unread-count", response_model=UnreadCountResponse)
+async def get_admin_chat_unread_count(admin: dict = Depends(get_current_admin)):
+    """Unread chat messages sent to the admin inbox"""
+    unread = await get_unread_counter(chat_unread_counter_key(None))
+    return UnreadCountResponse(unread_count=unread)
+
+@api_router.put("/chat/messages/mark-read")
+async def mark_messages_read(payload: MarkReadRequest, user: dict = Depends(get_current_user)):
+    """Mark a list of the current user's received messages as read in one update"""
+    if not payload.ids:
+        return {"message": "Messages marked as read", "updated": 0}
+    
+    result = await db.chat_messages.update_many(
+        {"id": {"$in": payload.ids}, **chat_unread_query(user['user_id'])},
+        {"$set": {"is_read": True}}
+    )
+    await adjust_unread_counter(chat_unread_counter_key(user['user_id']), -result.modified_count)
+    
+    return {"message": "Messages marked as read", "updated": result.modified_count}
+
+@api_router.put("/chat/admin/messages/mark-read")
+async def mark_admin_messages_read(
+    payload: Optional[MarkReadRequest] = None,
+    sender_id: Optional[str] = None,
+    admin: dict = Depends(get_current_admin)
+):
+    """Mark admin inbox messages as read, by id list and/or for one sender"""
+    query = chat_unread_query(None)
+    if payload and payload.ids:
+        query['id'] = {"$in": payload.ids}
+    if sender_id:
+        query['sender_id'] = sender_id
+    
+    result = await db.chat_messages.update_many(query, {"$set": {"is_read": True}})
+    await adjust_unread_counter(chat_unread_counter_key(None), -result.modified_count)
+    
+    return {"message": "Messages marked as read", "updated": result.modified_count}
+
 @api_router.put("/chat/messages/{message_id}/read")
 async def mark_message_read(message_id: str, user: dict = Depends(get_current_user)):
     """Mark message as read"""
-    result = await db.chat_messages.update_one(
-        {"id": message_id},
-        {"$set": {"is_read": True}}
+    message = await db.chat_messages.find_one_and_update(
+        {"id": message_id, "is_read": False},
+        {"$set": {"is_read": True}},
+        projection={"_id": 0, "receiver_id": 1}
     )
     
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Message not found")
+    if message is None:
+        if not await db.chat_messages.find_one({"id": message_id}, {"_id": 0, "id": 1}):
+            raise HTTPException(status_code=404, detail="Message not found")
+    else:
+        await adjust_unread_counter(chat_unread_counter_key(message.get('receiver_id')), -1)
     
     return {"message": "Message marked as read"}
 @api_router.post("/chat/send", response_model=ChatMessage)
@@ -1786,6 +2751,7 @@ async def send_chat_message(
         message_dict['created_at'] = message_dict['created_at'].isoformat()
         
         await db.chat_messages.insert_one(message_dict)
+        await adjust_unread_counter(chat_unread_counter_key(receiver_id), 1)
         
         # Emit via socket if available
         try:
@@ -1832,6 +2798,7 @@ async def create_testimonial(
         testimonial_dict['date'] = testimonial_dict['date'].isoformat()
     
     await db.testimonials.insert_one(testimonial_dict)
+    await resource_versions.bump("testimonials")
     
     # Notify admin via Socket.IO
     await sio.emit('new_testimonial', testimonial_dict, room='admin_room')
@@ -1855,7 +2822,7 @@ async def get_testimonials(
     if service_type:
         query['service_type'] = service_type
     
-    testimonials = await db.testimonials.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
+    testimonials = await catalog_db.testimonials.find(query, {"_id": 0}).skip(skip).limit(limit).sort("created_at", -1).to_list(limit)
     
     for testimonial in testimonials:
         if isinstance(testimonial.get('created_at'), str):
@@ -1909,6 +2876,7 @@ async def approve_testimonial(
             "approval_status": "approved"
         }}
     )
+    await resource_versions.bump("testimonials")
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Testimonial not found")
@@ -1928,6 +2896,7 @@ async def reject_testimonial(
             "approval_status": "rejected"
         }}
     )
+    await resource_versions.bump("testimonials")
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Testimonial not found")
@@ -1941,6 +2910,7 @@ async def delete_testimonial(
 ):
     """Delete testimonial"""
     result = await db.testimonials.delete_one({"id": testimonial_id})
+    await resource_versions.bump("testimonials")
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Testimonial not found")
     
@@ -2040,6 +3010,7 @@ async def create_trainer(trainer: TrainerCreate, admin: dict = Depends(get_curre
     trainer_dict['updated_at'] = trainer_dict['updated_at'].isoformat()
     
     await db.trainers.insert_one(trainer_dict)
+    await resource_versions.bump("trainers")
     
     return new_trainer
 
@@ -2055,7 +3026,7 @@ async def get_trainers(
     if specialization:
         query['specialization'] = specialization
     
-    trainers = await db.trainers.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
+    trainers = await catalog_db.trainers.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
     
     for trainer in trainers:
         for field in ['created_at', 'updated_at']:
@@ -2067,7 +3038,7 @@ async def get_trainers(
 @api_router.get("/trainers/{trainer_id}", response_model=Trainer)
 async def get_trainer(trainer_id: str):
     """Get single trainer"""
-    trainer = await db.trainers.find_one({"id": trainer_id}, {"_id": 0})
+    trainer = await catalog_db.trainers.find_one({"id": trainer_id}, {"_id": 0})
     if not trainer:
         raise HTTPException(status_code=404, detail="Trainer not found")
     
@@ -2085,14 +3056,20 @@ async def update_trainer(
 ):
     """Update trainer"""
     update_data = {k: v for k, v in trainer_update.model_dump().items() if v is not None}
+    reset_stale_variants(update_data)
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
     update_data['updated_at'] = datetime.utcnow().isoformat()
     
-    result = await db.trainers.update_one({"id": trainer_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.trainers.find_one_and_update(
+        {"id": trainer_id}, {"$set": update_data}, projection={"_id": 0, "image_url": 1}
+    )
+    await resource_versions.bump("trainers")
+    if previous is None:
         raise HTTPException(status_code=404, detail="Trainer not found")
+    if 'image_url' in update_data and update_data['image_url'] != previous.get('image_url'):
+        await release_unused_images([previous])
     
     updated_trainer = await db.trainers.find_one({"id": trainer_id}, {"_id": 0})
     
@@ -2105,9 +3082,11 @@ async def update_trainer(
 @api_router.delete("/trainers/{trainer_id}")
 async def delete_trainer(trainer_id: str, admin: dict = Depends(get_current_admin)):
     """Delete trainer"""
-    result = await db.trainers.delete_one({"id": trainer_id})
-    if result.deleted_count == 0:
+    trainer = await db.trainers.find_one_and_delete({"id": trainer_id}, projection={"_id": 0, "image_url": 1})
+    await resource_versions.bump("trainers")
+    if trainer is None:
         raise HTTPException(status_code=404, detail="Trainer not found")
+    await release_unused_images([trainer])
     
     return {"message": "Trainer deleted successfully"}
 
@@ -2128,6 +3107,8 @@ async def create_program(program: ProgramCreate, admin: dict = Depends(get_curre
     program_dict['updated_at'] = program_dict['updated_at'].isoformat()
     
     await db.programs.insert_one(program_dict)
+    await resource_versions.bump("programs")
+    related_items.changed("program", [new_program.id])
     
     return new_program
 
@@ -2149,7 +3130,7 @@ async def get_programs(
     if trainer_id:
         query['trainer_id'] = trainer_id
     
-    programs = await db.programs.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
+    programs = await catalog_db.programs.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
     
     for program in programs:
         for field in ['created_at', 'updated_at']:
@@ -2161,7 +3142,7 @@ async def get_programs(
 @api_router.get("/programs/{program_id}", response_model=Program)
 async def get_program(program_id: str):
     """Get single program"""
-    program = await db.programs.find_one({"id": program_id}, {"_id": 0})
+    program = await catalog_db.programs.find_one({"id": program_id}, {"_id": 0})
     if not program:
         raise HTTPException(status_code=404, detail="Program not found")
     
@@ -2179,14 +3160,21 @@ async def update_program(
 ):
     """Update program"""
     update_data = {k: v for k, v in program_update.model_dump().items() if v is not None}
+    reset_stale_variants(update_data)
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
     update_data['updated_at'] = datetime.utcnow().isoformat()
     
-    result = await db.programs.update_one({"id": program_id}, {"$set": update_data})
-    if result.matched_count == 0:
+    previous = await db.programs.find_one_and_update(
+        {"id": program_id}, {"$set": update_data}, projection={"_id": 0, "image_url": 1}
+    )
+    await resource_versions.bump("programs")
+    related_items.changed("program", [program_id])
+    if previous is None:
         raise HTTPException(status_code=404, detail="Program not found")
+    if 'image_url' in update_data and update_data['image_url'] != previous.get('image_url'):
+        await release_unused_images([previous])
     
     updated_program = await db.programs.find_one({"id": program_id}, {"_id": 0})
     
@@ -2199,12 +3187,220 @@ async def update_program(
 @api_router.delete("/programs/{program_id}")
 async def delete_program(program_id: str, admin: dict = Depends(get_current_admin)):
     """Delete program"""
-    result = await db.programs.delete_one({"id": program_id})
-    if result.deleted_count == 0:
+    program = await db.programs.find_one_and_delete({"id": program_id}, projection={"_id": 0, "image_url": 1})
+    await resource_versions.bump("programs")
+    related_items.changed("program", [program_id])
+    if program is None:
         raise HTTPException(status_code=404, detail="Program not found")
+    await release_unused_images([program])
     
     return {"message": "Program deleted successfully"}
 
+# ==================== BULK ADMIN OPERATIONS ====================
+# Each batch is validated per item, written with one round trip, invalidated once
+# and announced with one CatalogBulkChanged event.
+
+BULK_UPDATE_MAX_ITEMS = int(os.environ.get('BULK_UPDATE_MAX_ITEMS', '500'))
+
+async def announce_bulk_change(resource: str, action: str, ids: List[str]):
+    if ids:
+        await event_bus.publish(CatalogBulkChanged(resource=resource, action=action, count=len(ids), ids=ids))
+
+@api_router.patch("/videos/bulk", response_model=BulkOperationResponse)
+async def bulk_update_videos(request: BulkUpdateRequest, admin: dict = Depends(get_current_admin)):
+    """Update metadata on many videos at once"""
+    results, updates = validate_updates(request.items, VideoUpdate, BULK_UPDATE_MAX_ITEMS)
+    found = await apply_updates(db.videos, updates, datetime.utcnow().isoformat())
+    if found:
+        await videos_changed(*found)
+    await announce_bulk_change("videos", "update", list(found))
+    return bulk_response(results, found)
+
+@api_router.post("/videos/bulk-delete", response_model=BulkOperationResponse)
+async def bulk_delete_videos(request: BulkDeleteRequest, admin: dict = Depends(get_current_admin)):
+    """Delete many videos at once; their Bunny Stream videos are removed in the background"""
+    results, ids = unique_ids(request.ids, BULK_DELETE_MAX_ITEMS)
+    videos = await db.videos.find({"id": {"$in": ids}}, {"_id": 0}).to_list(len(ids))
+    found = [video['id'] for video in videos]
+    owners = await blob_owners(db, [key for video in videos for key in video_cdn_keys(video)])
+    records = [record for video in videos for record in video_cdn_deletions(video, owners)]
+
+    deleted = await delete_with_outbox(db, "videos", found, records) if found else 0
+    queued = len(records)
+    if deleted == len(found):
+        queued += await release_blobs(db, [
+            blob_id for video in videos for blob_id in owned_blob_ids(video_cdn_keys(video), owners)
+        ])
+    else:
+        # Same as bulk image delete: a concurrent delete releases its own references
+        logger.warning(f"Bulk video delete removed {deleted} of {len(found)} videos; their blob references are kept")
+    if found:
+        await videos_changed(*found)
+    cdn_deletions.notify()
+    await announce_bulk_change("videos", "delete", found)
+    return bulk_response(results, found, queued)
+
+@api_router.patch("/products/bulk", response_model=BulkOperationResponse)
+async def bulk_update_products(request: BulkUpdateRequest, admin: dict = Depends(get_current_admin)):
+    """Update many products at once, e.g. a seasonal price change"""
+    results, updates = validate_updates(request.items, ProductUpdate, BULK_UPDATE_MAX_ITEMS, normalize_product_images)
+    found = await apply_updates(db.products, updates, datetime.utcnow().isoformat(), {"name": 1, "stock": 1})
+    if found:
+        await resource_versions.bump("products")
+        related_items.changed("product", found)
+    await announce_bulk_change("products", "update", list(found))
+
+    # Low-stock alerts stay per product, and still only when stock crosses the threshold
+    for product_id, previous in found.items():
+        update = updates[product_id]
+        stock = update.get('stock', previous.get('stock', 0))
+        if stock < LOW_STOCK_THRESHOLD <= previous.get('stock', 0):
+            await event_bus.publish(ProductLowStock(
+                product_id=product_id,
+                name=update.get('name', previous.get('name', '')),
+                stock=stock
+            ))
+    return bulk_response(results, found)
+
+@api_router.post("/products/bulk-delete", response_model=BulkOperationResponse)
+async def bulk_delete_products(request: BulkDeleteRequest, admin: dict = Depends(get_current_admin)):
+    """Delete many products at once"""
+    results, ids = unique_ids(request.ids, BULK_DELETE_MAX_ITEMS)
+    found = await delete_existing(db.products, ids)
+    if found:
+        await resource_versions.bump("products")
+        related_items.changed("product", found)
+    await announce_bulk_change("products", "delete", found)
+    return bulk_response(results, found)
+
+@api_router.patch("/trainers/bulk", response_model=BulkOperationResponse)
+async def bulk_update_trainers(request: BulkUpdateRequest, admin: dict = Depends(get_current_admin)):
+    """Update many trainers at once"""
+    results, updates = validate_updates(request.items, TrainerUpdate, BULK_UPDATE_MAX_ITEMS, reset_stale_variants)
+    found = await apply_updates(db.trainers, updates, datetime.utcnow().isoformat(), {"image_url": 1})
+    await release_unused_images(replaced_images(found, updates))
+    if found:
+        await resource_versions.bump("trainers")
+    await announce_bulk_change("trainers", "update", list(found))
+    return bulk_response(results, found)
+
+@api_router.post("/trainers/bulk-delete", response_model=BulkOperationResponse)
+async def bulk_delete_trainers(request: BulkDeleteRequest, admin: dict = Depends(get_current_admin)):
+    """Delete many trainers at once"""
+    results, ids = unique_ids(request.ids, BULK_DELETE_MAX_ITEMS)
+    rows = await db.trainers.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "image_url": 1}).to_list(len(ids))
+    found = await delete_existing(db.trainers, ids)
+    deleted = set(found)
+    await release_unused_images([row for row in rows if row['id'] in deleted])
+    if found:
+        await resource_versions.bump("trainers")
+    await announce_bulk_change("trainers", "delete", found)
+    return bulk_response(results, found)
+
+@api_router.patch("/programs/bulk", response_model=BulkOperationResponse)
+async def bulk_update_programs(request: BulkUpdateRequest, admin: dict = Depends(get_current_admin)):
+    """Update many programs at once"""
+    results, updates = validate_updates(request.items, ProgramUpdate, BULK_UPDATE_MAX_ITEMS, reset_stale_variants)
+    found = await apply_updates(db.programs, updates, datetime.utcnow().isoformat(), {"image_url": 1})
+    await release_unused_images(replaced_images(found, updates))
+    if found:
+        await resource_versions.bump("programs")
+        related_items.changed("program", found)
+    await announce_bulk_change("programs", "update", list(found))
+    return bulk_response(results, found)
+
+@api_router.post("/programs/bulk-delete", response_model=BulkOperationResponse)
+async def bulk_delete_programs(request: BulkDeleteRequest, admin: dict = Depends(get_current_admin)):
+    """Delete many programs at once"""
+    results, ids = unique_ids(request.ids, BULK_DELETE_MAX_ITEMS)
+    rows = await db.programs.find({"id": {"$in": ids}}, {"_id": 0, "id": 1, "image_url": 1}).to_list(len(ids))
+    found = await delete_existing(db.programs, ids)
+    deleted = set(found)
+    await release_unused_images([row for row in rows if row['id'] in deleted])
+    if found:
+        await resource_versions.bump("programs")
+        related_items.changed("program", found)
+    await announce_bulk_change("programs", "delete", found)
+    return bulk_response(results, found)
+
+# ==================== RELATED ITEMS ====================
+
+def related_video_card(video: dict) -> dict:
+    video = transform_video_response(video)
+    return RelatedItem(
+        type="video", id=video['id'], title=video.get('title', ''), image_url=video.get('thumbnail_url'),
+        category=video.get('category'), difficulty=video.get('difficulty'),
+        is_free=video.get('is_free'), duration=video.get('duration')
+    ).model_dump(mode="json")
+
+def related_program_card(program: dict) -> dict:
+    return RelatedItem(
+        type="program", id=program['id'], title=program.get('title', ''),
+        image_url=normalize_media_url(program.get('image_url')), category=program.get('category'),
+        difficulty=program.get('difficulty'), price=program.get('price')
+    ).model_dump(mode="json")
+
+def related_product_card(product: dict) -> dict:
+    product = ensure_product_media(product)
+    return RelatedItem(
+        type="product", id=product['id'], title=product.get('name', ''),
+        image_url=(product.get('image_urls') or [None])[0], category=product.get('category'),
+        price=product.get('price')
+    ).model_dump(mode="json")
+
+related_items = RelatedItemsBuilder(
+    db,
+    cards={"video": related_video_card, "program": related_program_card, "product": related_product_card},
+    filters={"video": LISTED_VIDEO_FILTER, "program": {"is_active": True}, "product": {"is_active": {"$ne": False}}}
+)
+
+@api_router.get("/related/stats")
+async def get_related_items_stats(admin: dict = Depends(get_current_admin)):
+    """Size and last runs of the related-items job in this worker"""
+    return related_items.stats()
+
+@api_router.post("/related/rebuild")
+async def rebuild_related_items(admin: dict = Depends(get_current_admin)):
+    """Schedule a full rebuild of related items in the background"""
+    related_items.request_rebuild()
+    return {"message": "Related items rebuild scheduled"}
+
+@api_router.get("/related/{item_type}/{item_id}", response_model=RelatedItems)
+async def get_related_items(item_type: str, item_id: str):
+    """Precomputed related videos, programs and products for a video, program or product"""
+    if item_type not in ITEM_TYPES:
+        raise HTTPException(status_code=400, detail=f"item_type must be one of: {', '.join(ITEM_TYPES)}")
+    row = await catalog_db.related_items.find_one({"type": item_type, "id": item_id}, {"_id": 0})
+    # Not built yet (new item, or the first build is still running)
+    if not row:
+        return RelatedItems(type=item_type, id=item_id)
+    return row
+
+# ==================== BUNNY LIBRARY SYNC ====================
+
+async def bunny_sync_changed(video_ids: List[str]):
+    await videos_changed(*video_ids)
+
+async def bunny_sync_finished(run: dict):
+    if run["created"]:
+        # One notification for the whole import rather than one VideoUploaded per video
+        await event_bus.publish(CatalogBulkChanged(resource="videos", action="import", count=run["created"]))
+
+bunny_library_sync = BunnyLibrarySync(db, on_changed=bunny_sync_changed, on_finished=bunny_sync_finished)
+
+@api_router.post("/bunny/library-sync", response_model=BunnySyncRun)
+async def start_bunny_library_sync(admin: dict = Depends(get_current_admin)):
+    """Import and refresh videos from the Bunny Stream library in the background (409 if one is running)"""
+    return await bunny_library_sync.start()
+
+@api_router.get("/bunny/library-sync", response_model=BunnySyncRun)
+async def get_bunny_library_sync(admin: dict = Depends(get_current_admin)):
+    """Progress of the current or most recent library sync, from any worker"""
+    run = await bunny_library_sync.latest()
+    if not run:
+        raise HTTPException(status_code=404, detail="No Bunny library sync has run yet")
+    return run
+
 # ==================== BOOKING/SESSION ENDPOINTS ====================
 
 @api_router.post("/bookings", response_model=Booking)
@@ -2283,15 +3479,13 @@ async def create_booking(booking_data: BookingCreate, user: dict = Depends(get_c
     
     await db.bookings.insert_one(booking_dict)
     
-    # Create notification for admin
-    attendance_text = "at gym" if booking_data.attendance_type == "gym" else "at home"
-    notification = Notification(
-        notification_type=NotificationType.NEW_ORDER,
-        message=f"New booking: {user_data['name']} booked {program['title']} {attendance_text} on {booking_data.booking_date}"
-    )
-    notif_dict = notification.model_dump()
-    notif_dict['created_at'] = notif_dict['created_at'].isoformat()
-    await db.notifications.insert_one(notif_dict)
+    await event_bus.publish(BookingCreated(
+        booking_id=booking.id,
+        user_name=user_data['name'],
+        program_title=program['title'],
+        attendance_type=booking.attendance_type.value,
+        booking_date=booking_data.booking_date
+    ))
     
     return booking
 
@@ -2458,11 +3652,7 @@ async def create_booking_payment(booking_id: str, user: dict = Depends(get_curre
     
     try:
         # Create order in Razorpay
-        razorpay_order = razorpay_client.order.create({
-            "amount": int(booking['amount'] * 100),  # Convert to paise
-            "currency": "INR",
-            "payment_capture": 1
-        })
+        razorpay_order = await razorpay_create_order(int(booking['amount'] * 100))
         
         # Update booking with razorpay order ID
         await db.bookings.update_one(
@@ -2478,6 +3668,8 @@ async def create_booking_payment(booking_id: str, user: dict = Depends(get_curre
             "razorpay_key_id": os.environ.get('RAZORPAY_KEY_ID', '')
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Payment creation error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2590,6 +3782,8 @@ async def verify_booking_payment(
             {"id": booking['program_id']},
             {"$inc": {"enrolled_count": 1}}
         )
+        # Both counters are part of the public trainer and program payloads
+        await resource_versions.bump("trainers", "programs")
         
         logger.info(f"Booking payment verified successfully: {booking_id}")
         
@@ -2616,7 +3810,7 @@ async def verify_booking_payment(
 @api_router.get("/bookings/export/csv")
 async def export_bookings_csv(admin: dict = Depends(get_current_admin)):
     """Export bookings to CSV"""
-    bookings = await db.bookings.find({}, {"_id": 0}).to_list(1000)
+    bookings = await analytics_db.bookings.find({}, {"_id": 0}).to_list(1000)
     
     # Create CSV in memory
     output = io.StringIO()
@@ -2757,7 +3951,7 @@ async def check_user_access(
 @api_router.get("/gym-settings")
 async def get_gym_settings():
     """Get gym settings (public endpoint)"""
-    settings = await db.gym_settings.find_one({}, {"_id": 0})
+    settings = await catalog_db.gym_settings.find_one({}, {"_id": 0})
     if not settings:
         return None
     
@@ -2800,6 +3994,7 @@ async def save_gym_settings(settings_data: GymSettingsCreate, admin: dict = Depe
             {"id": existing['id']},
             {"$set": update_data}
         )
+        await resource_versions.bump("gym_settings")
         
         return {"message": "Gym settings updated successfully"}
     else:
@@ -2817,6 +4012,7 @@ async def save_gym_settings(settings_data: GymSettingsCreate, admin: dict = Depe
         settings_dict['updated_at'] = settings_dict['updated_at'].isoformat()
         
         await db.gym_settings.insert_one(settings_dict)
+        await resource_versions.bump("gym_settings")
         
         return {"message": "Gym settings created successfully"}
 
@@ -2827,17 +4023,29 @@ async def save_gym_settings(settings_data: GymSettingsCreate, admin: dict = Depe
 
 # ==================== VIDEO COMMENTS ENDPOINTS ====================
 
-@api_router.get("/videos/{video_id}/comments", response_model=List[Comment])
-async def get_video_comments(video_id: str, skip: int = 0, limit: int = 100):
-    """Get all comments for a video (public)"""
-    comments = await db.video_comments.find(
-        {"video_id": video_id}, {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+COMMENTS_PAGE_MAX_LIMIT = 100
+
+comment_broadcaster = CommentBroadcaster(sio)
+
+@api_router.get("/videos/{video_id}/comments", response_model=CommentPage)
+async def get_video_comments(video_id: str, cursor: Optional[str] = None, limit: int = 20):
+    """A page of a video's comments, newest first (public); follow next_cursor for older ones"""
+    limit = max(1, min(limit, COMMENTS_PAGE_MAX_LIMIT))
+    try:
+        comments, next_cursor = await comments_page(db, video_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    video = await db.videos.find_one({"id": video_id}, {"_id": 0, "comment_count": 1})
 
     for c in comments:
         if isinstance(c.get('created_at'), str):
             c['created_at'] = datetime.fromisoformat(c['created_at'])
-    return comments
+    return CommentPage(
+        comments=comments,
+        next_cursor=next_cursor,
+        latest_cursor=encode_cursor(comments[0]) if comments and not cursor else None,
+        total=(video or {}).get('comment_count', 0)
+    )
 
 
 @api_router.post("/videos/{video_id}/comment", response_model=Comment)
@@ -2872,6 +4080,9 @@ async def create_video_comment(
     c_dict = comment.model_dump()
     c_dict['created_at'] = c_dict['created_at'].isoformat()
     await db.video_comments.insert_one(c_dict)
+    await adjust_comment_count(db, video_id, 1)
+    c_dict.pop('_id', None)
+    comment_broadcaster.created(c_dict)
     return comment
 
 
@@ -2893,40 +4104,38 @@ async def delete_video_comment(
     if not is_admin and comment.get('user_id') != owner_id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this comment")
 
-    await db.video_comments.delete_one({"id": comment_id})
+    result = await db.video_comments.delete_one({"id": comment_id})
+    # Only the request that actually removed it decrements, so concurrent deletes count once
+    if result.deleted_count:
+        await adjust_comment_count(db, video_id, -1)
+        comment_broadcaster.deleted(video_id, comment_id)
     return {"message": "Comment deleted successfully"}
 
 
 # ==================== TRAINER IMAGE UPLOAD ====================
 
+TRAINER_IMAGE_MAX_BYTES = int(os.environ.get('TRAINER_IMAGE_MAX_BYTES', str(5 * 1024 * 1024)))
+
 @api_router.post("/trainers/upload-image", response_model=FileUploadResponse)
 async def upload_trainer_image(
     file: UploadFile = File(...),
     admin: dict = Depends(get_current_admin)
 ):
-    """Upload trainer image to Bunny Storage and return a CDN URL."""
-    if not file.content_type or not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
-
-    # Size validation (max 5MB)
-    contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="Image size must be under 5MB")
-    # Reset stream for downstream upload
-    await file.seek(0)
-
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    safe_filename = f"{timestamp}_{(file.filename or 'trainer').replace(' ', '_')}"
-    destination_path = f"trainers/{safe_filename}"
+    """Upload trainer image and its resized variants to Bunny Storage and return the CDN URLs."""
+    # Max 5MB, enforced while the upload streams in
+    ingested = await ingest_image(file, TRAINER_IMAGE_MAX_BYTES)
 
     try:
-        upload_result = await upload_to_bunny_storage(file, destination_path)
+        upload_result = await store_image(db, ingested, "trainers")
         return FileUploadResponse(
             success=True,
-            file_name=file.filename or safe_filename,
+            file_name=file.filename or f"{ingested.sha256}.{ingested.extension}",
             file_url=upload_result['cdn_url'],
-            cdn_url=upload_result['cdn_url']
+            cdn_url=upload_result['cdn_url'],
+            variants=upload_result['variants']
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Trainer image upload error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -2957,6 +4166,12 @@ async def health_check():
 # Include router
 app.include_router(api_router)
 
+# Conditional GETs for the public catalogue; innermost, so 304s still get CORS headers and metrics
+if catalog_read_lag is not None:
+    app.add_middleware(ConditionalGetMiddleware, versions=resource_versions)
+else:
+    logger.warning("Catalog reads have no maxStaleness bound; conditional GET caching is disabled")
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -2966,57 +4181,136 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request Mongo accounting (budgets, N+1 detection, Server-Timing in debug mode)
+app.add_middleware(QueryAccountingMiddleware)
+
+# Per-route request metrics, exposed on /metrics
+if os.environ.get('METRICS_ENABLED', 'true').lower() == 'true':
+    app.add_middleware(PrometheusMiddleware)
+register_socketio_metrics(sio)
+register_event_bus_metrics(event_bus)
+register_dependency_metrics(DEPENDENCIES)
+
 # Mount Socket.IO to the FastAPI app (FIXED: removed circular reference)
 app.mount("/socket.io", socketio.ASGIApp(sio))
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of request, Socket.IO, cache, event bus and Mongo pool metrics"""
+    metrics_token = os.environ.get('METRICS_TOKEN')
+    if metrics_token and authorization != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.api_route("/ping", methods=["GET", "HEAD"])
 async def ping():
     """Uptime monitoring endpoint - called every 5 minutes"""
-    return {"status": "running", "timestamp": datetime.utcnow().isoformat()}
+    return {"status": "running", "ready": startup_state["ready"], "timestamp": datetime.utcnow().isoformat()}
+
+# Set once the Mongo-dependent startup work has finished
+startup_state = {"ready": False, "task": None}
+WARMUP_RETRY_MAX_SECONDS = float(os.environ.get('WARMUP_RETRY_MAX_SECONDS', '30'))
+
+async def ensure_default_admin():
+    """Create the default admin account if none exists"""
+    if await db.admins.count_documents({}) > 0:
+        return
+    logger.info("Creating default admin account...")
+    # bcrypt is deliberately slow; keep it off the event loop
+    password_hash = os.environ.get('DEFAULT_ADMIN_PASSWORD_HASH') or await asyncio.to_thread(hash_password, "Admin@123")
+    default_admin = Admin(
+        email="admin@fitsphere.com",
+        name="Admin",
+        password_hash=password_hash,
+        role=UserRole.ADMIN
+    )
+    admin_dict = default_admin.model_dump()
+    admin_dict['created_at'] = admin_dict['created_at'].isoformat()
+    if admin_dict.get('last_login'):
+        admin_dict['last_login'] = admin_dict['last_login'].isoformat()
+
+    await db.admins.insert_one(admin_dict)
+    logger.info("✅ Default admin created: admin@fitsphere.com")
+
+async def warm_up():
+    """Mongo-dependent startup work, run after the server is already accepting requests"""
+    delay = 1.0
+    while True:
+        try:
+            await db.command('ping')
+            logger.info(f"✅ MongoDB connected successfully: {mongo.describe()}")
+            log_bunny_config()
+
+            await db.unread_counters.create_index("key", unique=True)
+            await db.notifications.create_index("id", unique=True)
+            await event_bus.replay_outbox()
+            await ensure_lease_indexes(db)
+            await ensure_retention_indexes(db)
+            if os.environ.get('ARCHIVER_ENABLED', 'true').lower() == 'true':
+                archiver.start()
+            await ensure_outbox_indexes(db)
+            await ensure_blob_indexes(db)
+            await ensure_view_indexes(db)
+            view_counter.start()
+            await ensure_watch_progress_indexes(db)
+            watch_progress.start()
+            await ensure_comment_indexes(db)
+            await backfill_comment_counts(db)
+            if os.environ.get('CDN_OUTBOX_ENABLED', 'true').lower() == 'true':
+                cdn_deletions.start()
+            await ensure_bunny_sync_indexes(db)
+            await ensure_related_indexes(db)
+            if os.environ.get('RELATED_ITEMS_ENABLED', 'true').lower() == 'true':
+                related_items.start()
+
+            await resource_versions.start()
+            await ensure_default_admin()
+
+            startup_state["ready"] = True
+            logger.info("✅ Server warm-up complete")
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Startup warm-up failed, retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
     logger.info("Starting FitSphere API server...")
-    
-    try:
-        # Test MongoDB connection
-        await db.command('ping')
-        logger.info("✅ MongoDB connected successfully")
-        
-        # Create default admin on startup if none exists
-        admin_count = await db.admins.count_documents({})
-        if admin_count == 0:
-            logger.info("Creating default admin account...")
-            default_admin = Admin(
-                email="admin@fitsphere.com",
-                name="Admin",
-                password_hash=hash_password("Admin@123"),
-                role=UserRole.ADMIN
-            )
-            admin_dict = default_admin.model_dump()
-            admin_dict['created_at'] = admin_dict['created_at'].isoformat()
-            if admin_dict.get('last_login'):
-                admin_dict['last_login'] = admin_dict['last_login'].isoformat()
-            
-            await db.admins.insert_one(admin_dict)
-            logger.info("✅ Default admin created: admin@fitsphere.com / Admin@123")
-        
-        logger.info("✅ Server startup complete")
-        
-    except Exception as e:
-        logger.error(f"❌ Startup error: {e}")
-        raise e
+    # uvicorn only opens the socket once this returns, so anything waiting on Mongo runs in the background;
+    # that includes the event outbox replay, while live events are dispatched from here on
+    await event_bus.start()
+    comment_broadcaster.start()
+    startup_state["task"] = asyncio.create_task(warm_up())
+    logger.info("✅ Server startup complete")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down server...")
-    client.close()
+    if startup_state["task"] is not None:
+        startup_state["task"].cancel()
+        await asyncio.gather(startup_state["task"], return_exceptions=True)
+    await archiver.stop()
+    await cdn_deletions.stop()
+    await bunny_library_sync.stop()
+    await related_items.stop()
+    await view_counter.stop()
+    await watch_progress.stop()
+    await comment_broadcaster.stop()
+    await event_bus.stop()
+    await resource_versions.stop()
+    shutdown_image_pool()
+    await close_dependencies()
+    mongo.close()
     logger.info("MongoDB connection closed")
 
-# For running directly with Python
+# For running directly with Python (development; production uses serve.py)
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(
         "server:app",
         host="127.0.0.1",
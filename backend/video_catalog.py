@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from models import Video
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how stale view counts and other non-admin changes can get
+VIDEO_CATALOG_MAX_AGE_SECONDS = float(os.environ.get("VIDEO_CATALOG_MAX_AGE_SECONDS", "300"))
+
+
+# Positions of the set bits in each byte value
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def _set_bits(mask: int):
+    """Set bit positions in ascending order; walks bytes so each step is not a big-int operation"""
+    for index, byte in enumerate(mask.to_bytes((mask.bit_length() + 7) // 8, "little")):
+        if byte:
+            base = index * 8
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+class _Row:
+    __slots__ = ("id", "title", "full", "public")
+
+    def __init__(self, video_id: str, title: str, full: bytes, public: bytes):
+        self.id = video_id
+        self.title = title
+        self.full = full  # JSON as GET /videos returns it
+        self.public = public  # JSON as GET /videos/public returns it (no view_count)
+
+
+class VideoCatalog:
+    """
+    The listed videos held in-process: each row transformed and JSON-encoded once,
+    plus a bitset (a Python int, bit n = slot n) per category, difficulty and free
+    flag. A filtered page is an AND of bitsets and a walk over the first set bits.
+
+    Slots are handed out in load order and never reused until the next full load,
+    so listings keep the collection's natural order. Admin writes in this worker
+    patch the changed rows in place; a version bump from another worker, or age,
+    triggers a full reload from the primary on the next read.
+    """
+
+    def __init__(self, db, versions, transform: Callable[[dict], dict], listed_filter: dict):
+        self.db = db
+        self.versions = versions
+        self.transform = transform
+        self.listed_filter = listed_filter
+        self.rows: List[Optional[_Row]] = []
+        self.slots: Dict[str, int] = {}
+        self.live = 0
+        self.free = 0
+        self.by_category: Dict[str, int] = {}
+        self.by_difficulty: Dict[str, int] = {}
+        self.version: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        self.stale = True
+        self.totals = {"full_loads": 0, "patched_rows": 0}
+        self._lock = asyncio.Lock()
+
+    # ---------- building ----------
+
+    def _encode(self, doc: dict) -> _Row:
+        video = Video.model_validate(self.transform(dict(doc)))
+        return _Row(
+            video.id,
+            video.title.lower(),
+            video.model_dump_json().encode(),
+            video.model_copy(update={"view_count": 0}).model_dump_json().encode()
+        )
+
+    def _clear_slot(self, slot: int):
+        bit = 1 << slot
+        self.live &= ~bit
+        self.free &= ~bit
+        for bitsets in (self.by_category, self.by_difficulty):
+            for key in list(bitsets):
+                bitsets[key] &= ~bit
+                if not bitsets[key]:
+                    del bitsets[key]
+        self.rows[slot] = None
+
+    def _put(self, doc: dict):
+        try:
+            row = self._encode(doc)
+        except Exception as e:
+            logger.warning(f"Video {doc.get('id')} left out of the catalog: {str(e)}")
+            self._remove(doc.get("id"))
+            return
+        slot = self.slots.get(row.id)
+        if slot is None:
+            slot = len(self.rows)
+            self.rows.append(None)
+            self.slots[row.id] = slot
+        else:
+            self._clear_slot(slot)
+        bit = 1 << slot
+        self.rows[slot] = row
+        self.live |= bit
+        if doc.get("is_free") is True:
+            self.free |= bit
+        for bitsets, value in ((self.by_category, doc.get("category")), (self.by_difficulty, doc.get("difficulty"))):
+            if value is not None:
+                bitsets[str(value)] = bitsets.get(str(value), 0) | bit
+
+    def _remove(self, video_id: Optional[str]):
+        slot = self.slots.pop(video_id, None)
+        if slot is not None:
+            self._clear_slot(slot)
+
+    async def _load(self, version: Optional[int]):
+        docs = await self.db.videos.find(self.listed_filter, {"_id": 0}).to_list(None)
+        self.rows, self.slots = [], {}
+        self.live, self.free = 0, 0
+        self.by_category, self.by_difficulty = {}, {}
+        for doc in docs:
+            self._put(doc)
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.stale = False
+        self.totals["full_loads"] += 1
+
+    async def ensure_current(self):
+        # Loads read the primary, so a new version is usable at once; the settle window
+        # in get() only guards bodies read from secondaries
+        version = self.versions.latest("videos")
+        expired = self.loaded_at is None or time.monotonic() - self.loaded_at > VIDEO_CATALOG_MAX_AGE_SECONDS
+        if not self.stale and not expired and (version is None or version == self.version):
+            return
+        async with self._lock:
+            version = self.versions.latest("videos")
+            expired = self.loaded_at is None or time.monotonic() - self.loaded_at > VIDEO_CATALOG_MAX_AGE_SECONDS
+            if self.stale or expired or (version is not None and version != self.version):
+                await self._load(version)
+
+    async def videos_changed(self, video_ids: Iterable[str]):
+        """
+        Call after an admin write and its version bump. If this worker's copy was
+        current just before the bump, only the changed rows are re-read; otherwise
+        the next read reloads everything.
+        """
+        video_ids = list(video_ids)
+        latest = self.versions.latest("videos")
+        async with self._lock:
+            if self.stale or self.version is None or latest is None or latest != self.version + 1:
+                self.stale = True
+                return
+            docs = await self.db.videos.find(
+                {"id": {"$in": video_ids}, **self.listed_filter}, {"_id": 0}
+            ).to_list(len(video_ids))
+            found = {doc["id"] for doc in docs}
+            for doc in docs:
+                self._put(doc)
+            for video_id in video_ids:
+                if video_id not in found:
+                    self._remove(video_id)
+            self.version = latest
+            self.totals["patched_rows"] += len(video_ids)
+
+    # ---------- reading ----------
+
+    def _mask(self, category: Optional[str], difficulty: Optional[str], free_only: bool) -> int:
+        mask = self.live
+        if category:
+            mask &= self.by_category.get(category, 0)
+        if difficulty:
+            mask &= self.by_difficulty.get(difficulty, 0)
+        if free_only:
+            mask &= self.free
+        return mask
+
+    def page(
+        self,
+        category: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        search: Optional[str] = None,
+        free_only: bool = False,
+        skip: int = 0,
+        limit: int = 50
+    ) -> bytes:
+        """A JSON array of matching rows in catalog order; search is a case-insensitive title substring"""
+        mask = self._mask(category, difficulty, free_only)
+        # Plain substring, never a regex: search comes from unauthenticated requests and a
+        # backtracking pattern would stall this worker's event loop
+        needle = search.lower() if search else None
+        skip, limit = max(0, skip), max(0, limit)
+        selected = []
+        for slot in _set_bits(mask):
+            if len(selected) >= limit:
+                break
+            row = self.rows[slot]
+            if needle is not None and needle not in row.title:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            selected.append(row.public if free_only else row.full)
+        return b"[" + b",".join(selected) + b"]"
+
+    def stats(self) -> dict:
+        rows = [row for row in self.rows if row is not None]
+        bitsets = [self.live, self.free] + list(self.by_category.values()) + list(self.by_difficulty.values())
+        encoded = sum(len(row.full) + len(row.public) for row in rows)
+        overhead = (
+            sys.getsizeof(self.rows) + sys.getsizeof(self.slots)
+            + sum(sys.getsizeof(row) + sys.getsizeof(row.id) + sys.getsizeof(row.title) for row in rows)
+            + sum(sys.getsizeof(bitset) for bitset in bitsets)
+        )
+        return {
+            "videos": len(rows),
+            "slots": len(self.rows),
+            "categories": {key: bin(bits).count("1") for key, bits in self.by_category.items()},
+            "difficulties": {key: bin(bits).count("1") for key, bits in self.by_difficulty.items()},
+            "free": bin(self.free).count("1"),
+            "version": self.version,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+            "encoded_bytes": encoded,
+            "memory_bytes": encoded + overhead,
+            **self.totals,
+        }
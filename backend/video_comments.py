@@ -0,0 +1,177 @@
+import base64
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from coalescer import WriteCoalescer
+
+logger = logging.getLogger(__name__)
+
+# Comment events for one video are gathered this long and sent to its room together
+COMMENT_EMIT_SECONDS = float(os.environ.get("COMMENT_EMIT_SECONDS", "0.5"))
+# Most comments replayed to a reconnecting viewer; beyond this it is told to refetch
+COMMENT_RESUME_MAX = int(os.environ.get("COMMENT_RESUME_MAX", "100"))
+
+
+def video_room(video_id: str) -> str:
+    return f"video_{video_id}"
+
+
+async def ensure_comment_indexes(db):
+    # Serves one video's comments newest first, with id as the tie-breaker for cursors
+    await db.video_comments.create_index([("video_id", 1), ("created_at", -1), ("id", -1)])
+    await db.video_comments.create_index("id")
+
+
+async def backfill_comment_counts(db) -> int:
+    """Set videos.comment_count on videos that predate it; returns how many were set"""
+    video_ids = [row["id"] for row in await db.videos.find(
+        {"comment_count": {"$exists": False}}, {"_id": 0, "id": 1}
+    ).to_list(None)]
+    if not video_ids:
+        return 0
+    counts = {row["_id"]: row["count"] async for row in db.video_comments.aggregate([
+        {"$match": {"video_id": {"$in": video_ids}}},
+        {"$group": {"_id": "$video_id", "count": {"$sum": 1}}},
+    ])}
+    # Only where still missing, so a count seeded meanwhile by adjust_comment_count is not overwritten
+    await db.videos.bulk_write([
+        UpdateOne({"id": video_id, "comment_count": {"$exists": False}}, {"$set": {"comment_count": counts.get(video_id, 0)}})
+        for video_id in video_ids
+    ], ordered=False)
+    logger.info(f"Backfilled comment_count on {len(video_ids)} videos")
+    return len(video_ids)
+
+
+async def adjust_comment_count(db, video_id: str, delta: int):
+    """
+    Move a video's comment_count after a comment was inserted or deleted. A video
+    without the field yet is seeded from a count, which already includes this
+    change; an $inc would create it at delta and the backfill would then skip it.
+    """
+    result = await db.videos.update_one(
+        {"id": video_id, "comment_count": {"$exists": True}}, {"$inc": {"comment_count": delta}}
+    )
+    if result.matched_count == 0:
+        count = await db.video_comments.count_documents({"video_id": video_id})
+        await db.videos.update_one({"id": video_id, "comment_count": {"$exists": False}}, {"$set": {"comment_count": count}})
+
+
+def encode_cursor(comment: dict) -> str:
+    raw = f"{comment['created_at']}|{comment['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(created_at, id) of the last comment on the previous page; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except Exception:
+        raise ValueError("Invalid cursor")
+    created_at, sep, comment_id = raw.partition("|")
+    if not sep or not created_at or not comment_id:
+        raise ValueError("Invalid cursor")
+    return created_at, comment_id
+
+
+async def comments_page(db, video_id: str, cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of a video's comments, newest first, and the cursor for the next page
+    (None on the last one). Seeks on (created_at, id) instead of skipping, so deep
+    pages cost the same as the first.
+    """
+    query = {"video_id": video_id}
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": comment_id}},
+        ]
+    comments = await db.video_comments.find(query, {"_id": 0}).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    if len(comments) > limit:
+        return comments[:limit], encode_cursor(comments[limit - 1])
+    return comments, None
+
+
+async def comments_since(db, video_id: str, cursor: str, limit: int = COMMENT_RESUME_MAX) -> Tuple[List[dict], bool]:
+    """
+    Comments newer than the cursor, oldest first, and whether there were more than
+    limit (the caller should refetch the first page instead of replaying).
+    """
+    created_at, comment_id = decode_cursor(cursor)
+    comments = await db.video_comments.find({
+        "video_id": video_id,
+        "$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "id": {"$gt": comment_id}},
+        ],
+    }, {"_id": 0}).sort([("created_at", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    return comments[:limit], len(comments) > limit
+
+
+async def comment_counts(db, video_ids: Iterable[str]) -> Dict[str, int]:
+    """comment_count per video id; unknown ids are left out"""
+    video_ids = list(video_ids)
+    rows = await db.videos.find(
+        {"id": {"$in": video_ids}}, {"_id": 0, "id": 1, "comment_count": 1}
+    ).to_list(len(video_ids))
+    return {row["id"]: row.get("comment_count", 0) for row in rows}
+
+
+def _merge_events(old: dict, new: dict) -> dict:
+    created = {**old["created"], **new["created"]}
+    deleted = old["deleted"] | new["deleted"]
+    # Posted and removed within one window: nobody needs to see either
+    for comment_id in list(deleted):
+        if created.pop(comment_id, None) is not None:
+            deleted.discard(comment_id)
+    return {"created": created, "deleted": deleted}
+
+
+class CommentBroadcaster:
+    """
+    Live comment events for video_{id} rooms. Creates and deletes are merged per
+    video for COMMENT_EMIT_SECONDS and sent as one comment_created and one
+    comment_deleted emit, so a burst on a popular video costs a handful of emits
+    rather than one per comment per viewer.
+    """
+
+    def __init__(self, sio, flush_seconds: float = COMMENT_EMIT_SECONDS):
+        self.sio = sio
+        self.coalescer = WriteCoalescer("comment events", self._emit, _merge_events, flush_seconds)
+
+    def created(self, comment: dict):
+        self.coalescer.add(comment["video_id"], {"created": {comment["id"]: comment}, "deleted": set()})
+
+    def deleted(self, video_id: str, comment_id: str):
+        self.coalescer.add(video_id, {"created": {}, "deleted": {comment_id}})
+
+    async def _emit(self, batch: Dict[str, dict]):
+        for video_id, events in batch.items():
+            room = video_room(video_id)
+            if events["created"]:
+                comments = sorted(events["created"].values(), key=lambda c: (c["created_at"], c["id"]))
+                await self.sio.emit("comment_created", {
+                    "video_id": video_id,
+                    "comments": comments,
+                    # Pass back in join_video after a reconnect to receive what was missed
+                    "cursor": encode_cursor(comments[-1]),
+                }, room=room)
+            if events["deleted"]:
+                await self.sio.emit("comment_deleted", {
+                    "video_id": video_id,
+                    "comment_ids": sorted(events["deleted"]),
+                }, room=room)
+
+    def stats(self) -> dict:
+        return self.coalescer.stats()
+
+    def start(self):
+        self.coalescer.start()
+
+    async def stop(self):
+        await self.coalescer.stop()
@@ -0,0 +1,114 @@
+import logging
+import operator
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from pymongo import UpdateOne
+
+from coalescer import WriteCoalescer
+
+logger = logging.getLogger(__name__)
+
+VIEW_FLUSH_SECONDS = float(os.environ.get("VIEW_FLUSH_SECONDS", "5"))
+# Hourly buckets are kept this long; trending never looks further back
+VIEW_BUCKET_RETENTION_DAYS = int(os.environ.get("VIEW_BUCKET_RETENTION_DAYS", "14"))
+TRENDING_WINDOW_HOURS = int(os.environ.get("TRENDING_WINDOW_HOURS", "72"))
+# A view this old counts half as much as one from the current hour
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_CACHE_SECONDS = float(os.environ.get("TRENDING_CACHE_SECONDS", "60"))
+
+
+def view_hour(now: datetime = None) -> str:
+    return (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+async def ensure_view_indexes(db):
+    await db.video_view_buckets.create_index([("video_id", 1), ("hour", 1)], unique=True)
+    await db.video_view_buckets.create_index("hour")
+    # TTL only applies to BSON dates
+    await db.video_view_buckets.create_index("expires_at", expireAfterSeconds=0)
+    # The dashboard's "most watched"
+    await db.videos.create_index([("view_count", -1)])
+
+
+class ViewCounter:
+    """
+    Per-worker view counts. Pings only touch two in-memory maps; every flush turns them
+    into one bulk $inc on videos.view_count and one bulk upsert into hourly buckets.
+    """
+
+    def __init__(self, db, flush_seconds: float = VIEW_FLUSH_SECONDS):
+        self.db = db
+        self.totals = WriteCoalescer("video view totals", self._write_totals, operator.add, flush_seconds)
+        self.buckets = WriteCoalescer("video view buckets", self._write_buckets, operator.add, flush_seconds)
+        self._trending: Dict[Tuple[int, int], Tuple[float, List[Tuple[str, float]]]] = {}
+
+    def record(self, video_id: str, count: int = 1):
+        self.totals.add(video_id, count)
+        self.buckets.add((video_id, view_hour()), count)
+
+    async def _existing(self, video_ids) -> set:
+        # Pings are unauthenticated, so unknown ids are dropped here rather than checked per ping
+        rows = await self.db.videos.find({"id": {"$in": list(video_ids)}}, {"_id": 0, "id": 1}).to_list(None)
+        return {row["id"] for row in rows}
+
+    async def _write_totals(self, batch: Dict[str, int]):
+        existing = await self._existing(batch)
+        operations = [UpdateOne({"id": video_id}, {"$inc": {"view_count": count}}) for video_id, count in batch.items() if video_id in existing]
+        if operations:
+            await self.db.videos.bulk_write(operations, ordered=False)
+
+    async def _write_buckets(self, batch: Dict[Tuple[str, str], int]):
+        existing = await self._existing({video_id for video_id, _ in batch})
+        operations = []
+        for (video_id, hour), count in batch.items():
+            if video_id not in existing:
+                continue
+            expires_at = datetime.fromisoformat(hour) + timedelta(days=VIEW_BUCKET_RETENTION_DAYS)
+            operations.append(UpdateOne(
+                {"video_id": video_id, "hour": hour},
+                {"$inc": {"count": count}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True
+            ))
+        if operations:
+            await self.db.video_view_buckets.bulk_write(operations, ordered=False)
+
+    async def trending(self, limit: int, window_hours: int = TRENDING_WINDOW_HOURS) -> List[Tuple[str, float]]:
+        """
+        (video_id, score) by time-decayed views over the window, best first. Each bucket
+        counts count * 0.5 ** (age_hours / half_life); computed from the hourly buckets
+        and cached for TRENDING_CACHE_SECONDS.
+        """
+        key = (limit, window_hours)
+        cached = self._trending.get(key)
+        if cached and time.monotonic() - cached[0] < TRENDING_CACHE_SECONDS:
+            return cached[1]
+
+        now = datetime.utcnow()
+        since = view_hour(now - timedelta(hours=window_hours))
+        age_hours = {"$divide": [{"$subtract": [now, {"$dateFromString": {"dateString": "$hour"}}]}, 3600 * 1000]}
+        pipeline = [
+            {"$match": {"hour": {"$gte": since}}},
+            {"$group": {
+                "_id": "$video_id",
+                "score": {"$sum": {"$multiply": ["$count", {"$pow": [0.5, {"$divide": [age_hours, TRENDING_HALF_LIFE_HOURS]}]}]}}
+            }},
+            {"$sort": {"score": -1}},
+            {"$limit": limit},
+        ]
+        ranked = [(row["_id"], row["score"]) async for row in self.db.video_view_buckets.aggregate(pipeline)]
+        self._trending[key] = (time.monotonic(), ranked)
+        return ranked
+
+    def stats(self) -> dict:
+        return {"totals": self.totals.stats(), "buckets": self.buckets.stats()}
+
+    def start(self):
+        self.totals.start()
+        self.buckets.start()
+
+    async def stop(self):
+        await self.totals.stop()
+        await self.buckets.stop()
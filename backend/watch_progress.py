@@ -0,0 +1,95 @@
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from coalescer import WriteCoalescer
+
+logger = logging.getLogger(__name__)
+
+# Longest a (user, video) position waits in memory; also the most often it is written
+WATCH_PROGRESS_FLUSH_SECONDS = float(os.environ.get("WATCH_PROGRESS_FLUSH_SECONDS", "15"))
+# Share of the duration after which a video counts as watched
+WATCH_COMPLETE_RATIO = float(os.environ.get("WATCH_COMPLETE_RATIO", "0.9"))
+
+
+async def ensure_watch_progress_indexes(db):
+    await db.watch_progress.create_index([("user_id", 1), ("video_id", 1)], unique=True)
+    await db.watch_progress.create_index([("user_id", 1), ("updated_at", -1)])
+
+
+def _latest(old: dict, new: dict) -> dict:
+    # Last heartbeat wins, but a video once finished stays finished
+    return {**new, "completed": old["completed"] or new["completed"]}
+
+
+class WatchProgressTracker:
+    """
+    Playback positions from player heartbeats. Heartbeats for the same (user, video)
+    are merged in memory and written as one bulk_write of upserts per flush, so write
+    volume depends on how many people are watching, not how often players report.
+    """
+
+    def __init__(self, db, flush_seconds: float = WATCH_PROGRESS_FLUSH_SECONDS):
+        self.db = db
+        self.coalescer = WriteCoalescer("watch progress", self._write, _latest, flush_seconds)
+
+    def record(self, user_id: str, video_id: str, position_seconds: float,
+               duration_seconds: Optional[float] = None, completed: bool = False):
+        if duration_seconds and position_seconds >= duration_seconds * WATCH_COMPLETE_RATIO:
+            completed = True
+        self.coalescer.add((user_id, video_id), {
+            "position_seconds": position_seconds,
+            "duration_seconds": duration_seconds,
+            "completed": completed,
+            "updated_at": datetime.utcnow().isoformat(),
+        })
+
+    async def _write(self, batch: Dict[Tuple[str, str], dict]):
+        operations = []
+        for (user_id, video_id), progress in batch.items():
+            updated_at = progress["updated_at"]
+            # Heartbeats for one (user, video) can be flushed by different workers in any
+            # order; only a newer heartbeat may move the stored position
+            newer = {"$lt": ["$updated_at", updated_at]}  # also true while the row is missing
+            operations.append(UpdateOne(
+                {"user_id": user_id, "video_id": video_id},
+                [{"$set": {
+                    "id": {"$ifNull": ["$id", str(uuid.uuid4())]},
+                    "created_at": {"$ifNull": ["$created_at", updated_at]},
+                    "position_seconds": {"$cond": [newer, {"$literal": progress["position_seconds"]}, "$position_seconds"]},
+                    "duration_seconds": {"$cond": [newer, {"$literal": progress["duration_seconds"]}, "$duration_seconds"]},
+                    "updated_at": {"$cond": [newer, updated_at, "$updated_at"]},
+                    "completed": {"$or": [{"$ifNull": ["$completed", False]}, progress["completed"]]},
+                }}],
+                upsert=True
+            ))
+        await self.db.watch_progress.bulk_write(operations, ordered=False)
+
+    def pending(self, user_id: str, video_id: str) -> Optional[dict]:
+        """A heartbeat this worker has not written yet, so a resume right after pausing is not stale"""
+        return self.coalescer.pending.get((user_id, video_id))
+
+    async def recent(self, user_id: str, limit: int) -> List[dict]:
+        """Unfinished videos, most recently watched first"""
+        return await self.db.watch_progress.find(
+            {"user_id": user_id, "completed": False}, {"_id": 0}
+        ).sort("updated_at", -1).limit(limit).to_list(limit)
+
+    async def for_videos(self, user_id: str, video_ids: List[str]) -> Dict[str, dict]:
+        rows = await self.db.watch_progress.find(
+            {"user_id": user_id, "video_id": {"$in": video_ids}}, {"_id": 0}
+        ).to_list(len(video_ids))
+        return {row["video_id"]: row for row in rows}
+
+    def stats(self) -> dict:
+        return self.coalescer.stats()
+
+    def start(self):
+        self.coalescer.start()
+
+    async def stop(self):
+        await self.coalescer.stop()
@@ -93,6 +93,9 @@ export const analyticsAPI = {
 export const notificationAPI = {
   getAll: (params) => api.get('/notifications', { params }),
   markRead: (id) => api.put(`/notifications/${id}/read`),
+  markManyRead: (ids) => api.put('/notifications/mark-read', { ids }),
+  markAllRead: () => api.put('/notifications/mark-all-read'),
+  getUnreadCount: () => api.get('/notifications/unread-count'),
 };
 
 // Chat APIs
@@ -13,7 +13,7 @@ import {
   Sparkles, TrendingUp, Star, Award, Zap, Layers,
   Grid, List, Video, Calendar, Users, Activity,
   ArrowLeft, Maximize2, Minimize2, Volume2, VolumeX,
-  Settings, Download, AlertCircle, CheckCircle
+  Settings, Download, AlertCircle, CheckCircle, MessageCircle
 } from 'lucide-react';
 import { videoAPI } from '../utils/api';
 import { toast } from 'sonner';
@@ -26,6 +26,7 @@ import { UserLayout } from '@/components/user/UserLayout';
 export default function UserVideosPage() {
   const navigate = useNavigate();
   const [videos, setVideos] = useState([]);
+  const [commentCounts, setCommentCounts] = useState({});
   const [filteredVideos, setFilteredVideos] = useState([]);
   const [loading, setLoading] = useState(true);
   const [searchQuery, setSearchQuery] = useState('');
@@ -62,6 +63,7 @@ export default function UserVideosPage() {
       const response = await videoAPI.getAll({ limit: 100 });
       setVideos(response.data);
       setStats(prev => ({ ...prev, totalVideos: response.data.length }));
+      loadCommentCounts(response.data);
     } catch (error) {
       console.error('Error fetching videos:', error);
       toast.error('Failed to load videos', {
@@ -72,6 +74,18 @@ export default function UserVideosPage() {
     }
   };
 
+  const loadCommentCounts = async (list) => {
+    const ids = list.map((video) => video.id).filter(Boolean);
+    if (ids.length === 0) return;
+    try {
+      // One request for the whole grid instead of one per card
+      const response = await videoAPI.getCommentCounts(ids);
+      setCommentCounts(response.data || {});
+    } catch (error) {
+      console.error('Error fetching comment counts:', error);
+    }
+  };
+
   const loadUserPreferences = () => {
     // Load favorites from localStorage
     const savedFavorites = localStorage.getItem('videoFavorites');
@@ -542,9 +556,15 @@ export default function UserVideosPage() {
                           <Badge variant="outline" className="border-cyan-500/30 text-cyan-400">
                             {video.category}
                           </Badge>
-                          <div className="flex items-center text-sm text-zinc-400">
-                            <Eye className="h-3 w-3 mr-1" />
-                            {video.view_count || 0}
+                          <div className="flex items-center gap-3 text-sm text-zinc-400">
+                            <span className="flex items-center">
+                              <Eye className="h-3 w-3 mr-1" />
+                              {video.view_count || 0}
+                            </span>
+                            <span className="flex items-center">
+                              <MessageCircle className="h-3 w-3 mr-1" />
+                              {commentCounts[video.id] || 0}
+                            </span>
                           </div>
                         </div>
 
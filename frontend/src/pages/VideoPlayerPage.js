@@ -9,7 +9,8 @@ import {
   ChevronDown, ChevronUp, Star, Award, TrendingUp, Users, Sparkles,
   AlertCircle, CheckCircle, X, PlayCircle, PauseCircle
 } from 'lucide-react';
-import { videoAPI } from '../utils/api';
+import { videoAPI, relatedAPI } from '../utils/api';
+import { subscribeToVideoComments } from '../utils/socket';
 import { toast } from 'sonner';
 import Hls from 'hls.js';
 import { motion, AnimatePresence } from 'framer-motion';
@@ -17,6 +18,9 @@ import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar';
 import { Progress } from '@/components/ui/progress';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 
+// How often a playing video reports its position; the server merges heartbeats before writing
+const PROGRESS_HEARTBEAT_MS = 10000;
+
 export default function VideoPlayerPage() {
   const { videoId } = useParams();
   const navigate = useNavigate();
@@ -43,6 +47,11 @@ export default function VideoPlayerPage() {
   const [notes, setNotes] = useState('');
   const [showNotes, setShowNotes] = useState(false);
   const [comments, setComments] = useState([]);
+  const [commentsCursor, setCommentsCursor] = useState(null);
+  const [commentTotal, setCommentTotal] = useState(0);
+  // Newest comment seen, so a reconnect only replays what was missed
+  const liveCursorRef = useRef(null);
+  const commentIdsRef = useRef(new Set());
     const [newCommentText, setNewCommentText] = useState('');
   const [postingComment, setPostingComment] = useState(false);
   const [relatedVideos, setRelatedVideos] = useState([]);
@@ -92,6 +101,25 @@ export default function VideoPlayerPage() {
     return () => clearInterval(timer);
   }, []);
 
+  const sendProgressHeartbeat = useCallback(() => {
+    const player = videoRef.current;
+    if (!player || !player.currentTime || !localStorage.getItem('token')) return;
+    videoAPI.saveProgress(videoId, {
+      position_seconds: player.currentTime,
+      duration_seconds: Number.isFinite(player.duration) ? player.duration : null,
+    }).catch(() => {});
+  }, [videoId]);
+
+  useEffect(() => {
+    // Report while playing, and once more on pause or when leaving the page
+    if (!isPlaying) return undefined;
+    const timer = setInterval(sendProgressHeartbeat, PROGRESS_HEARTBEAT_MS);
+    return () => {
+      clearInterval(timer);
+      sendProgressHeartbeat();
+    };
+  }, [isPlaying, sendProgressHeartbeat]);
+
   useEffect(() => {
     // Hide controls after inactivity
     let timeout;
@@ -161,33 +189,68 @@ export default function VideoPlayerPage() {
       // Shuffle and take first 8
       const shuffled = otherVideos.sort(() => 0.5 - Math.random());
       setRecommendations(shuffled.slice(0, 8));
-      
-      // Also set related videos (same category)
-      if (video) {
-        const sameCategory = otherVideos.filter(v => v.category === video.category);
-        setRelatedVideos(sameCategory.slice(0, 4));
-      }
+
+      // Related videos are precomputed server-side (shared programs, category, difficulty)
+      const related = await relatedAPI.get('video', videoId);
+      setRelatedVideos(related.data?.videos || []);
     } catch (error) {
       console.error('Failed to load recommendations:', error);
     }
   };
 
-  const loadComments = async () => {
+  const loadComments = async (cursor = null) => {
     try {
       const token = localStorage.getItem('token');
       const backendUrl = process.env.REACT_APP_BACKEND_URL;
-      const res = await fetch(`${backendUrl}/api/videos/${videoId}/comments`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`${backendUrl}/api/videos/${videoId}/comments${query}`, {
         headers: token ? { Authorization: `Bearer ${token}` } : {}
       });
       if (!res.ok) throw new Error('Failed to load comments');
       const data = await res.json();
-      setComments(Array.isArray(data) ? data : []);
+      const page = Array.isArray(data?.comments) ? data.comments : [];
+      if (!cursor) {
+        commentIdsRef.current = new Set();
+        liveCursorRef.current = data?.latest_cursor || null;
+      }
+      page.forEach((comment) => commentIdsRef.current.add(comment.id));
+      setComments((prev) => (cursor ? [...prev, ...page] : page));
+      setCommentsCursor(data?.next_cursor || null);
+      setCommentTotal(data?.total ?? page.length);
     } catch (error) {
       console.error('Error loading comments:', error);
-      setComments([]);
+      if (!cursor) setComments([]);
     }
   };
 
+  const addLiveComments = ({ comments: incoming = [], cursor }) => {
+    if (cursor) liveCursorRef.current = cursor;
+    // Our own posts come back over the socket too
+    const fresh = incoming.filter((comment) => !commentIdsRef.current.has(comment.id));
+    if (fresh.length === 0) return;
+    fresh.forEach((comment) => commentIdsRef.current.add(comment.id));
+    setComments((prev) => [...fresh.reverse(), ...prev]);
+    setCommentTotal((prev) => prev + fresh.length);
+  };
+
+  const removeLiveComments = ({ comment_ids: ids = [] }) => {
+    const removed = ids.filter((id) => commentIdsRef.current.delete(id));
+    if (removed.length === 0) return;
+    setComments((prev) => prev.filter((comment) => !removed.includes(comment.id)));
+    setCommentTotal((prev) => Math.max(0, prev - removed.length));
+  };
+
+  useEffect(() => {
+    if (!videoId || videoId === 'undefined' || videoId === 'null') return undefined;
+    return subscribeToVideoComments(videoId, {
+      getCursor: () => liveCursorRef.current,
+      onCreated: addLiveComments,
+      onDeleted: removeLiveComments,
+      onResume: (payload) => (payload.reset ? loadComments() : addLiveComments(payload))
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [videoId]);
+
   const postComment = async () => {
     const text = (newCommentText || '').trim();
     if (!text) {
@@ -215,7 +278,11 @@ export default function VideoPlayerPage() {
         throw new Error(err.detail || 'Failed to post comment');
       }
       const created = await res.json();
-      setComments((prev) => [created, ...prev]);
+      if (!commentIdsRef.current.has(created.id)) {
+        commentIdsRef.current.add(created.id);
+        setComments((prev) => [created, ...prev]);
+        setCommentTotal((prev) => prev + 1);
+      }
       setNewCommentText('');
       toast.success('Comment posted');
     } catch (e) {
@@ -316,11 +383,20 @@ export default function VideoPlayerPage() {
       videoRef.current.src = videoUrl;
     }
 
-    // Load saved progress
+    // Load saved progress: this device's copy first, then the account's if signed in
     const savedTime = localStorage.getItem(`video-progress-${videoId}`);
     if (savedTime) {
       videoRef.current.currentTime = parseFloat(savedTime);
     }
+    if (localStorage.getItem('token')) {
+      videoAPI.getProgress(videoId)
+        .then(({ data }) => {
+          if (videoRef.current && data.position_seconds > 0 && !data.completed) {
+            videoRef.current.currentTime = data.position_seconds;
+          }
+        })
+        .catch(() => {});
+    }
   };
 
   const updateProgress = () => {
@@ -920,7 +996,7 @@ export default function VideoPlayerPage() {
                 <div className="flex items-center justify-between mb-6">
                   <h3 className="text-xl font-semibold text-white flex items-center">
                     <Users className="mr-2 h-5 w-5 text-cyan-400" />
-                    Comments ({comments.length})
+                    Comments ({Math.max(commentTotal, comments.length)})
                   </h3>
                   <Badge className="bg-white/5 text-zinc-300">Join the conversation</Badge>
                 </div>
@@ -1007,6 +1083,19 @@ export default function VideoPlayerPage() {
                     );
                   })}
                 </div>
+                {commentsCursor && (
+                  <div className="flex justify-center mt-4">
+                    <Button
+                      size="sm"
+                      variant="ghost"
+                      className="text-cyan-400"
+                      onClick={() => loadComments(commentsCursor)}
+                      data-testid="comments-load-more-btn"
+                    >
+                      Load more comments
+                    </Button>
+                  </div>
+                )}
               </Card>
             </motion.div>
           </div>
@@ -1105,9 +1194,9 @@ export default function VideoPlayerPage() {
                           >
                             <div className="flex gap-3 p-2 rounded-xl hover:bg-white/5 transition-colors">
                               <div className="relative w-20 h-14 flex-shrink-0 overflow-hidden rounded-lg bg-zinc-800">
-                                {recVideo.thumbnail_url && (
+                                {(recVideo.thumbnail_url || recVideo.image_url) && (
                                   <img
-                                    src={recVideo.thumbnail_url}
+                                    src={recVideo.thumbnail_url || recVideo.image_url}
                                     alt={recVideo.title}
                                     className="w-full h-full object-cover"
                                   />
@@ -39,6 +39,25 @@ export const videoAPI = {
   getOne: (id) => api.get(`/videos/${id}`),
   update: (id, data) => api.put(`/videos/${id}`, data),
   delete: (id) => api.delete(`/videos/${id}`),
+  bulkUpdate: (items) => api.patch('/videos/bulk', { items }),
+  bulkDelete: (ids) => api.post('/videos/bulk-delete', { ids }),
+  incrementViews: (id) => api.post(`/videos/${id}/view`),
+  getTrending: (params) => api.get('/videos/trending', { params }),
+  getProgress: (id) => api.get(`/videos/${id}/progress`),
+  saveProgress: (id, data) => api.post(`/videos/${id}/progress`, data),
+  getContinueWatching: (params) => api.get('/user/continue-watching', { params }),
+  getCommentCounts: (ids) => api.get('/videos/comment-counts', { params: { video_ids: ids.join(',') } }),
+};
+
+// Related content (precomputed per video, program and product)
+export const relatedAPI = {
+  get: (type, id) => api.get(`/related/${type}/${id}`),
+};
+
+// Bunny Stream library sync (admin)
+export const bunnyAPI = {
+  startLibrarySync: () => api.post('/bunny/library-sync'),
+  getLibrarySync: () => api.get('/bunny/library-sync'),
 };
 
 // Image APIs
@@ -57,6 +76,8 @@ export const productAPI = {
   getOne: (id) => api.get(`/products/${id}`),
   update: (id, data) => api.put(`/products/${id}`, data),
   delete: (id) => api.delete(`/products/${id}`),
+  bulkUpdate: (items) => api.patch('/products/bulk', { items }),
+  bulkDelete: (ids) => api.post('/products/bulk-delete', { ids }),
 };
 
 
@@ -102,6 +123,9 @@ export const analyticsAPI = {
 export const notificationAPI = {
   getAll: (params) => api.get('/notifications', { params }),
   markRead: (id) => api.put(`/notifications/${id}/read`),
+  markManyRead: (ids) => api.put('/notifications/mark-read', { ids }),
+  markAllRead: () => api.put('/notifications/mark-all-read'),
+  getUnreadCount: () => api.get('/notifications/unread-count'),
 };
 
 // Chat APIs
@@ -138,6 +162,8 @@ export const trainerAPI = {
   getOne: (id) => api.get(`/trainers/${id}`),
   update: (id, data) => api.put(`/trainers/${id}`, data),
   delete: (id) => api.delete(`/trainers/${id}`),
+  bulkUpdate: (items) => api.patch('/trainers/bulk', { items }),
+  bulkDelete: (ids) => api.post('/trainers/bulk-delete', { ids }),
 };
 
 // Program APIs
@@ -147,6 +173,9 @@ export const programAPI = {
   getOne: (id) => api.get(`/programs/${id}`),
   update: (id, data) => api.put(`/programs/${id}`, data),
   delete: (id) => api.delete(`/programs/${id}`),
+  bulkUpdate: (items) => api.patch('/programs/bulk', { items }),
+  bulkDelete: (ids) => api.post('/programs/bulk-delete', { ids }),
+  getMyProgress: (id) => api.get(`/user/programs/${id}/progress`),
 };
 
 // Booking APIs
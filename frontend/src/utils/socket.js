@@ -55,6 +55,38 @@ export const onMessageSent = (callback) => {
   socket.on('message_sent', callback);
 };
 
+// Live comments are public, so they use their own connection rather than the signed-in chat socket
+let videoSocket = null;
+
+// Joins video_{id} and rejoins with the last seen cursor after every reconnect; returns an unsubscribe function
+export const subscribeToVideoComments = (videoId, { getCursor, onCreated, onDeleted, onResume }) => {
+  if (!videoSocket) {
+    videoSocket = io(BACKEND_URL, {
+      transports: ['websocket', 'polling'],
+      reconnection: true,
+      reconnectionDelay: 1000
+    });
+  }
+
+  const join = () => videoSocket.emit('join_video', { video_id: videoId, cursor: getCursor() });
+  const forVideo = (callback) => (payload) => {
+    if (payload?.video_id === videoId) callback(payload);
+  };
+  const handlers = {
+    connect: join,
+    comment_created: forVideo(onCreated),
+    comment_deleted: forVideo(onDeleted),
+    comments_resume: forVideo(onResume)
+  };
+  Object.entries(handlers).forEach(([event, handler]) => videoSocket.on(event, handler));
+  if (videoSocket.connected) join();
+
+  return () => {
+    Object.entries(handlers).forEach(([event, handler]) => videoSocket.off(event, handler));
+    videoSocket.emit('leave_video', { video_id: videoId });
+  };
+};
+
 export const disconnectSocket = () => {
   if (socket) {
     socket.disconnect();
@@ -0,0 +1,160 @@
+"""
+Cold-start profile and budget check for the API.
+
+Three measurements, each the median of --runs fresh processes:
+
+  - import: wall time of `import server`, plus the slowest top-level imports
+    from `python -X importtime`
+  - lazy modules: integrations that must not be imported until first use
+  - first response: time from spawning backend/serve.py to the first
+    200 from /ping
+
+    python tests/benchmarks/cold_start.py --import-budget-ms 1500 --first-response-budget-ms 3000
+
+/ping does not depend on Mongo, so no mongod is needed. Mongo work happens in
+the background after startup; --mongo-url only changes what that work talks
+to. The script exits non-zero when a budget is exceeded or a lazy module was
+imported eagerly.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parents[1] / "backend"
+sys.path.insert(0, str(BENCH_DIR))
+
+from run_bench import free_port, stop  # noqa: E402
+
+# Only checkout and the dev entry point need these
+LAZY_MODULES = ["razorpay", "uvicorn"]
+
+
+def app_env(mongo_url: str) -> Dict[str, str]:
+    return dict(
+        os.environ,
+        MONGO_URL=mongo_url,
+        DB_NAME="fitsphere_cold_start",
+        RAZORPAY_KEY_ID="rzp_cold_start",
+        RAZORPAY_KEY_SECRET="cold_start_secret",
+        ARCHIVER_ENABLED="false",
+        LOG_LEVEL="warning",
+    )
+
+
+def import_profile(env: Dict[str, str]) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """Wall time of `import server` in ms, slowest top-level imports, eagerly loaded lazy modules"""
+    probe = (
+        "import sys, time\n"
+        "began = time.perf_counter()\n"
+        "import server\n"
+        "print('wall', (time.perf_counter() - began) * 1000)\n"
+        f"print('eager', *[m for m in {LAZY_MODULES!r} if m in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    report = {line.split()[0]: line.split()[1:] for line in result.stdout.splitlines() if line.strip()}
+    wall_ms, eager = float(report["wall"][0]), report["eager"]
+
+    # "import time: self [us] | cumulative | name", children listed before their parent and
+    # indented two spaces per level; server's direct imports sit just above its own line
+    rows = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]
+        rows.append((len(name) - len(name.lstrip()), name.strip(), int(parts[1]) / 1000))
+    end = max(i for i, (depth, name, _) in enumerate(rows) if depth == 0 and name == "server")
+    modules = []
+    for depth, name, cumulative in reversed(rows[:end]):
+        if depth == 0:
+            break
+        if depth == 2:
+            modules.append((name, cumulative))
+    modules.sort(key=lambda item: item[1], reverse=True)
+    return wall_ms, modules, eager
+
+
+def first_response(env: Dict[str, str], timeout: float = 60.0) -> float:
+    """ms from spawning the production launcher to the first successful /ping"""
+    port = free_port()
+    env = dict(env, HOST="127.0.0.1", PORT=str(port), WEB_CONCURRENCY="1")
+    began = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - began < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"serve.py exited with {process.returncode} before answering")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/ping").status_code == 200:
+                        return (time.perf_counter() - began) * 1000
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"/ping did not answer within {timeout}s")
+    finally:
+        stop(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="slowest top-level imports to list")
+    parser.add_argument("--import-budget-ms", type=float, help="fail if the median import time exceeds this")
+    parser.add_argument("--first-response-budget-ms", type=float, help="fail if the median time to first /ping exceeds this")
+    parser.add_argument("--mongo-url", default="mongodb://127.0.0.1:27017/?serverSelectionTimeoutMS=2000")
+    args = parser.parse_args()
+
+    env = app_env(args.mongo_url)
+    failures = []
+
+    walls, profiles, eager = [], [], set()
+    for _ in range(args.runs):
+        wall_ms, modules, loaded = import_profile(env)
+        walls.append(wall_ms)
+        profiles.append(dict(modules))
+        eager.update(loaded)
+    import_ms = statistics.median(walls)
+    print(f"import server: median {import_ms:.0f}ms over {args.runs} runs (min {min(walls):.0f}, max {max(walls):.0f})")
+    medians = {
+        name: statistics.median(profile.get(name, 0.0) for profile in profiles)
+        for name in profiles[0]
+    }
+    for name, cumulative in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<28}{cumulative:>8.1f}ms")
+
+    if eager:
+        failures.append(f"imported at startup but meant to be lazy: {', '.join(sorted(eager))}")
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        failures.append(f"import took {import_ms:.0f}ms, budget {args.import_budget_ms:.0f}ms")
+
+    responses = [first_response(env) for _ in range(args.runs)]
+    response_ms = statistics.median(responses)
+    print(f"first /ping: median {response_ms:.0f}ms (min {min(responses):.0f}, max {max(responses):.0f})")
+    if args.first_response_budget_ms is not None and response_ms > args.first_response_budget_ms:
+        failures.append(f"first response took {response_ms:.0f}ms, budget {args.first_response_budget_ms:.0f}ms")
+
+    if failures:
+        print("\nCold-start check failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nCold start within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Diff two run_bench.py reports, e.g. from the parent commit and the current one.
+
+    python tests/benchmarks/compare.py bench-base.json bench-head.json --max-p95-regression 10
+
+Exits non-zero when --max-p95-regression is given and any scenario's p95 got
+worse by more than that percentage.
+"""
+import argparse
+import json
+import sys
+from typing import Optional
+
+
+def _change(old: Optional[float], new: Optional[float]) -> str:
+    if old in (None, 0) or new is None:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--max-p95-regression", type=float, help="fail if p95 grows by more than this percent")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for key in ("scale", "concurrency", "requests_per_scenario", "api_workers", "upstream_latency_ms"):
+        if base["meta"].get(key) != head["meta"].get(key):
+            print(f"warning: {key} differs ({base['meta'].get(key)} vs {head['meta'].get(key)})")
+
+    def describe(report: dict) -> str:
+        meta = report["meta"]
+        return f"{meta.get('git_revision')} ({meta.get('api_launcher', 'uvicorn')}, {meta.get('api_workers')} worker(s))"
+
+    print(f"base {describe(base)}  ->  head {describe(head)}\n")
+    header = f"{'scenario':<24}{'metric':<16}{'base':>12}{'head':>12}{'change':>10}"
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+    for name in sorted(set(base["scenarios"]) | set(head["scenarios"])):
+        old, new = base["scenarios"].get(name), head["scenarios"].get(name)
+        if old is None or new is None:
+            print(f"{name:<24}{'only in ' + ('head' if old is None else 'base')}")
+            continue
+        rows = [
+            ("throughput_rps", old["throughput_rps"], new["throughput_rps"]),
+            ("p50_ms", old["latency_ms"]["p50"], new["latency_ms"]["p50"]),
+            ("p95_ms", old["latency_ms"]["p95"], new["latency_ms"]["p95"]),
+            ("p99_ms", old["latency_ms"]["p99"], new["latency_ms"]["p99"]),
+            ("mongo_ops/req", old.get("mongo_ops_per_request"), new.get("mongo_ops_per_request")),
+            ("errors", old["errors"], new["errors"]),
+        ]
+        for i, (metric, old_value, new_value) in enumerate(rows):
+            label = name if i == 0 else ""
+            print(f"{label:<24}{metric:<16}{_fmt(old_value):>12}{_fmt(new_value):>12}{_change(old_value, new_value):>10}")
+
+        old_p95, new_p95 = old["latency_ms"]["p95"], new["latency_ms"]["p95"]
+        if args.max_p95_regression is not None and old_p95 and (new_p95 - old_p95) / old_p95 * 100 > args.max_p95_regression:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\np95 regressed by more than {args.max_p95_regression}% in: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
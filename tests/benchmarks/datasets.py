@@ -0,0 +1,99 @@
+"""
+Benchmark datasets at 10k, 100k and 1M scale, built with backend/generate_data.py.
+
+The scale is the number of orders; the other collections are sized relative to
+it the way a growing shop would be (many orders per user, a catalogue that grows
+far slower than traffic). Seed and anchor date are fixed, so reports from
+different commits are run against identical data.
+"""
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from generate_data import DataGenerator, entity_id, load  # noqa: E402
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BENCH_ANCHOR = datetime(2026, 1, 1)
+# Scenarios only need a slice of users to authenticate as
+SCENARIO_USERS = 1000
+
+
+def sizes_for(scale: str) -> Dict[str, int]:
+    orders = SCALES[scale]
+    return {
+        "users": max(1_000, orders // 10),
+        "trainers": 50,
+        "programs": 200,
+        "products": max(200, orders // 500),
+        "videos": max(500, orders // 200),
+        "orders": orders,
+        "bookings": orders // 5,
+        "chat": orders,
+        "comments": orders // 2,
+    }
+
+
+def dataset_ids(scale: str, seed_value: int) -> Dict[str, List[str]]:
+    counts = sizes_for(scale)
+    limits = {"users": min(counts["users"], SCENARIO_USERS)}
+    return {
+        kind: [entity_id(seed_value, kind, i) for i in range(limits.get(kind, counts[kind]))]
+        for kind in ("users", "products", "trainers", "programs", "videos")
+    }
+
+
+async def seed(db, scale: str, seed_value: int = 42, log=print) -> Dict[str, List[str]]:
+    """
+    Load a dataset unless the same scale and seed is already there. Returns the ids
+    the scenarios draw from.
+    """
+    marker = await db.bench_meta.find_one({"_id": "dataset"})
+    if marker and marker.get("scale") == scale and marker.get("seed") == seed_value:
+        log(f"Reusing {scale} dataset (seed {seed_value})")
+        return dataset_ids(scale, seed_value)
+
+    await db.bench_meta.drop()
+    generator = DataGenerator(sizes_for(scale), seed=seed_value, anchor=BENCH_ANCHOR)
+    await load(db, generator, log=log)
+
+    # Every product is orderable so order scenarios never hit stock or inactive errors
+    await db.products.update_many({}, {"$set": {"stock": 1_000_000, "is_active": True}})
+
+    # Lookup indexes the endpoints rely on; the app does not create these itself
+    await db.users.create_index("id", unique=True)
+    await db.products.create_index("id", unique=True)
+    await db.videos.create_index("is_free")
+    await db.orders.create_index("razorpay_order_id")
+    await db.orders.create_index("payment_status")
+    await db.payments.create_index("razorpay_payment_id")
+    await db.carts.create_index("user_id")
+    await db.bookings.create_index([("trainer_id", 1), ("booking_date", 1), ("time_slot", 1)])
+
+    await db.bench_meta.insert_one({"_id": "dataset", "scale": scale, "seed": seed_value})
+    return dataset_ids(scale, seed_value)
+
+
+async def seed_pending_orders(db, run_id: str, count: int, user_id: str, product_id: str) -> List[str]:
+    """Unpaid orders with known Razorpay ids for the verify-payment scenario"""
+    created = datetime.utcnow().isoformat()
+    razorpay_ids = [f"order_{run_id}{i:08d}" for i in range(count)]
+    documents = []
+    for razorpay_order_id in razorpay_ids:
+        order_id = str(uuid.uuid4())
+        documents.append({
+            "order_id": order_id, "id": order_id, "user_id": user_id,
+            "items": [{"product_id": product_id, "product_name": "Bench Product", "quantity": 1, "price": 499.0}],
+            "product_ids": [product_id], "total_quantity": 1, "total_amount": 499.0,
+            "customer_name": "Bench Customer", "customer_email": "customer@bench.fitsphere.test",
+            "customer_phone": "9000000000", "shipping_address": "1 Benchmark Road",
+            "order_status": "placed", "payment_status": "pending", "razorpay_order_id": razorpay_order_id,
+            "created_at": created, "updated_at": created,
+        })
+    for start in range(0, len(documents), 5000):
+        await db.orders.insert_many(documents[start:start + 5000], ordered=False)
+    return razorpay_ids
@@ -0,0 +1,222 @@
+"""
+End-to-end check of direct (browser-to-Bunny) video uploads over TUS.
+
+Plays the browser's part: asks the API for a signed upload (POST
+/videos/direct-upload), sends the file to the fake TUS endpoint in chunks,
+resumes from the server's offset (HEAD) whenever a request fails, then calls
+POST /videos/{id}/complete-upload and checks the video is listed. With
+--failure-rate the fakes drop that share of requests, which exercises resume.
+
+    python tests/benchmarks/direct_upload.py --size-mb 64 --chunk-mb 8 --failure-rate 0.2
+
+--upstream-only skips Mongo and the API: the Bunny video is created and the
+upload signed by backend/bunny_cdn.py in-process, so only the signature and the
+TUS stand-in are exercised. None of the file's bytes pass through the API in
+either mode.
+"""
+import argparse
+import asyncio
+import base64
+import os
+import random
+import shutil
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urljoin
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parents[1] / "backend"
+sys.path.insert(0, str(BENCH_DIR))
+
+from run_bench import (  # noqa: E402
+    BUNNY_STREAM_API_KEY, BUNNY_STREAM_LIBRARY_ID, free_port, mint_token, start_api, start_fakes, start_mongod, stop
+)
+
+TUS_VERSION = "1.0.0"
+
+
+def tus_metadata(**fields) -> str:
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in fields.items())
+
+
+async def tus_upload(client: httpx.AsyncClient, signed: dict, data: bytes, chunk_size: int,
+                     title: str, max_failures: int = 50) -> dict:
+    """Upload `data` with the TUS creation + PATCH flow, resuming from HEAD after any failure"""
+    auth = {
+        "Tus-Resumable": TUS_VERSION,
+        "AuthorizationSignature": signed["signature"],
+        "AuthorizationExpire": str(signed["expires_at"]),
+        "VideoId": signed["video_id"],
+        "LibraryId": str(signed["library_id"]),
+    }
+    failures = 0
+
+    def failed(reason: str):
+        nonlocal failures
+        failures += 1
+        if failures > max_failures:
+            raise RuntimeError(f"TUS upload gave up after {failures} failures (last: {reason})")
+
+    while True:
+        try:
+            res = await client.post(signed["tus_endpoint"], headers={
+                **auth, "Upload-Length": str(len(data)),
+                "Upload-Metadata": tus_metadata(filetype="video/mp4", title=title),
+            })
+        except httpx.TransportError as e:
+            failed(str(e))
+            continue
+        if res.status_code == 201:
+            break
+        if res.status_code < 500:
+            raise RuntimeError(f"TUS creation rejected: {res.status_code} {res.text}")
+        failed(f"creation returned {res.status_code}")
+    location = urljoin(signed["tus_endpoint"], res.headers["Location"])
+
+    offset, patches, resumes = 0, 0, 0
+    while offset is None or offset < len(data):
+        try:
+            if offset is None:
+                res = await client.head(location, headers=auth)
+                if res.status_code != 200:
+                    failed(f"HEAD returned {res.status_code}")
+                    continue
+                offset = int(res.headers["Upload-Offset"])
+                resumes += 1
+                continue
+
+            patches += 1
+            res = await client.patch(location, content=data[offset:offset + chunk_size], headers={
+                **auth, "Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream",
+            })
+            if res.status_code == 204:
+                offset = int(res.headers["Upload-Offset"])
+                continue
+            if res.status_code < 500 and res.status_code != 409:
+                raise RuntimeError(f"TUS PATCH rejected: {res.status_code} {res.text}")
+            failed(f"PATCH returned {res.status_code}")
+        except httpx.TransportError as e:
+            failed(str(e))
+        # Whatever reached the server is kept; ask where to continue from
+        offset = None
+        await asyncio.sleep(random.uniform(0, 0.2))
+
+    return {"patches": patches, "resumes": resumes, "failures": failures}
+
+
+async def sign_upstream_only(fakes_url: str, title: str) -> dict:
+    """Create the Bunny video and sign the upload the way the API does, without Mongo or the API"""
+    os.environ.update(
+        BUNNY_STREAM_API_URL=fakes_url,
+        BUNNY_TUS_ENDPOINT=f"{fakes_url}/tusupload",
+        BUNNY_STREAM_LIBRARY_ID=BUNNY_STREAM_LIBRARY_ID,
+        BUNNY_STREAM_API_KEY=BUNNY_STREAM_API_KEY,
+    )
+    sys.path.insert(0, str(BACKEND_DIR))
+    from bunny_cdn import create_bunny_video, create_tus_upload_signature
+
+    # Creation goes through the fakes' failure injection like every other call
+    for _ in range(20):
+        try:
+            video = await create_bunny_video(title)
+            break
+        except Exception:
+            await asyncio.sleep(0.1)
+    else:
+        raise RuntimeError("Could not create the Bunny video")
+    signed = create_tus_upload_signature(video["guid"], 600)
+    return {**signed, "tus_endpoint": signed["endpoint"]}
+
+
+async def bunny_status(client: httpx.AsyncClient, fakes_url: str, video_id: str) -> int:
+    while True:
+        res = await client.get(f"{fakes_url}/library/{BUNNY_STREAM_LIBRARY_ID}/videos/{video_id}")
+        if res.status_code == 200:
+            return res.json()["status"]
+
+
+async def run(args, fakes_url: str, api_url: str = None):
+    data = random.Random(args.seed).randbytes(int(args.size_mb * 1024 * 1024))
+    chunk_size = int(args.chunk_mb * 1024 * 1024)
+    title = f"direct-upload-check-{int(time.time())}"
+
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        if api_url is None:
+            signed = await sign_upstream_only(fakes_url, title)
+        else:
+            admin = {"Authorization": f"Bearer {mint_token('bench-admin', 'admin')}"}
+            res = await client.post(f"{api_url}/api/videos/direct-upload", headers=admin, json={
+                "title": title, "category": "yoga", "difficulty": "beginner",
+                "duration": 60, "description": "direct upload check",
+            })
+            res.raise_for_status()
+            signed = res.json()
+
+        began = time.perf_counter()
+        stats = await tus_upload(client, signed, data, chunk_size, title)
+        seconds = time.perf_counter() - began
+        print(
+            f"Uploaded {args.size_mb:g} MB in {seconds:.2f}s: {stats['patches']} PATCHes, "
+            f"{stats['failures']} failed requests, {stats['resumes']} resumes"
+        )
+
+        if api_url is None:
+            status = await bunny_status(client, fakes_url, signed["video_id"])
+            print(f"Bunny video {signed['video_id']} status {status}")
+            return
+
+        # The fakes fail API calls to Bunny too, so completion may need a few tries
+        for _ in range(20):
+            res = await client.post(f"{api_url}/api/videos/{signed['id']}/complete-upload", headers=admin)
+            if res.status_code == 200:
+                break
+            await asyncio.sleep(0.2)
+        res.raise_for_status()
+        print(f"Video {signed['id']} upload_status {res.json()['upload_status']}")
+
+        listed = await client.get(f"{api_url}/api/videos", params={"search": title})
+        if not any(video["id"] == signed["id"] for video in listed.json()):
+            raise SystemExit("Completed video is missing from GET /videos")
+        print("Completed video is listed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=32)
+    parser.add_argument("--chunk-mb", type=float, default=4)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of upstream requests the fakes fail")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--upstream-only", action="store_true", help="skip Mongo and the API")
+    parser.add_argument("--mongo-url", help="use this server instead of starting a throwaway mongod")
+    args = parser.parse_args()
+
+    mongod = fakes = api = None
+    dbpath = None
+    try:
+        fakes_port = free_port()
+        fakes = start_fakes(fakes_port, 0.0, args.failure_rate)
+        fakes_url = f"http://127.0.0.1:{fakes_port}"
+
+        api_url = None
+        if not args.upstream_only:
+            mongo_url = args.mongo_url
+            if mongo_url is None:
+                mongod, mongo_url, dbpath = start_mongod()
+            api_port = free_port()
+            api = start_api(api_port, mongo_url, fakes_url, 1)
+            api_url = f"http://127.0.0.1:{api_port}"
+
+        asyncio.run(run(args, fakes_url, api_url))
+    finally:
+        stop(api)
+        stop(fakes)
+        stop(mongod)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Local stand-ins for the Bunny Stream, Bunny Storage and Razorpay APIs.
+
+The backend is pointed here through BUNNY_STREAM_API_URL, BUNNY_STORAGE_API_URL,
+BUNNY_TUS_ENDPOINT (<fakes>/tusupload) and RAZORPAY_BASE_URL, so benchmark runs
+never reach the real services and their latency is controlled rather than measured:
+
+    python tests/benchmarks/fakes.py --port 8900 --latency-ms 20
+
+Bunny Stream, Bunny Storage, Bunny's TUS upload endpoint and Razorpay share one
+app; their paths do not overlap. The TUS stand-in implements the core protocol
+(creation, HEAD for the offset, PATCH at that offset) and checks the presigned
+headers the API issues; with --stream-api-key it verifies the signature too.
+
+Faults can be changed while the fakes run, per service (razorpay, stream, storage),
+for fault-injection runs:
+
+    curl -X PUT localhost:8900/_faults/razorpay -d '{"latency_ms": 30000}'
+    curl -X PUT localhost:8900/_faults/stream -d '{"failure_rate": 1}'
+    curl -X DELETE localhost:8900/_faults
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+class FakeUpstream:
+    """Shared knobs: fixed latency plus jitter, and an optional failure rate; `faults` adds more per service"""
+
+    def __init__(
+        self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: int = 42,
+        stream_api_key: Optional[str] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.stream_api_key = stream_api_key
+        self.videos = {}
+        self.uploads = {}
+        self.orders = 0
+        self.faults = {}
+
+    async def delay(self, service: str):
+        latency = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        latency += self.faults.get(service, {}).get("latency_ms", 0.0)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def should_fail(self, service: str) -> bool:
+        failure_rate = max(self.failure_rate, self.faults.get(service, {}).get("failure_rate", 0.0))
+        return failure_rate > 0 and self.rng.random() < failure_rate
+
+
+def create_app(upstream: FakeUpstream) -> Starlette:
+
+    async def guarded(handler, service: str, request: Request):
+        await upstream.delay(service)
+        if upstream.should_fail(service):
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        return await handler(request)
+
+    # ---- Razorpay ----
+
+    async def create_order(request: Request):
+        body = await request.json()
+        upstream.orders += 1
+        return JSONResponse({
+            "id": f"order_{uuid.uuid4().hex[:14]}",
+            "entity": "order",
+            "amount": body.get("amount", 0),
+            "currency": body.get("currency", "INR"),
+            "status": "created",
+        })
+
+    # ---- Bunny Stream ----
+
+    async def create_video(request: Request):
+        body = await request.json()
+        guid = str(uuid.uuid4())
+        # 0 = created, waiting for the file
+        upstream.videos[guid] = {"guid": guid, "title": body.get("title", ""), "status": 0, "encodeProgress": 0}
+        return JSONResponse(upstream.videos[guid])
+
+    async def video(request: Request):
+        guid = request.path_params["guid"]
+        if request.method == "PUT":
+            # Drain the upload so the client sees realistic transfer behaviour
+            async for _ in request.stream():
+                pass
+            upstream.videos.setdefault(guid, {"guid": guid}).update(status=4, encodeProgress=100)
+            return JSONResponse({"success": True, "statusCode": 200})
+        if request.method == "DELETE":
+            upstream.videos.pop(guid, None)
+            return JSONResponse({"success": True, "statusCode": 200})
+        if request.method == "POST":
+            return JSONResponse({"success": True, "statusCode": 200})
+        return JSONResponse(upstream.videos.get(guid, {"guid": guid, "status": 4, "encodeProgress": 100}))
+
+    async def video_thumbnail(request: Request):
+        return JSONResponse({"success": True, "statusCode": 200})
+
+    async def list_videos(request: Request):
+        page = int(request.query_params.get("page", 1))
+        per_page = int(request.query_params.get("itemsPerPage", 100))
+        items = list(upstream.videos.values())
+        start = (page - 1) * per_page
+        return JSONResponse({
+            "totalItems": len(items),
+            "currentPage": page,
+            "itemsPerPage": per_page,
+            "items": items[start:start + per_page],
+        })
+
+    # ---- Bunny Stream TUS uploads ----
+
+    tus_headers = {"Tus-Resumable": "1.0.0"}
+
+    def tus_error(status_code: int, message: str) -> Response:
+        return Response(message, status_code=status_code, headers=tus_headers)
+
+    async def tus_create(request: Request):
+        headers = request.headers
+        video_id, library_id = headers.get("VideoId"), headers.get("LibraryId")
+        signature, expire = headers.get("AuthorizationSignature"), headers.get("AuthorizationExpire")
+        if not all([video_id, library_id, signature, expire]):
+            return tus_error(401, "missing authorization headers")
+        if int(expire) < time.time():
+            return tus_error(401, "signature expired")
+        if upstream.stream_api_key is not None:
+            expected = hashlib.sha256(f"{library_id}{upstream.stream_api_key}{expire}{video_id}".encode()).hexdigest()
+            if signature != expected:
+                return tus_error(401, "invalid signature")
+        if video_id not in upstream.videos:
+            return tus_error(404, "unknown video")
+        try:
+            length = int(headers["Upload-Length"])
+        except (KeyError, ValueError):
+            return tus_error(400, "Upload-Length required")
+
+        upload_id = uuid.uuid4().hex
+        upstream.uploads[upload_id] = {"video_id": video_id, "length": length, "offset": 0}
+        return Response(status_code=201, headers={**tus_headers, "Location": f"/tusupload/{upload_id}"})
+
+    async def tus_upload(request: Request):
+        upload = upstream.uploads.get(request.path_params["upload_id"])
+        if upload is None:
+            return tus_error(404, "unknown upload")
+        progress = {"Upload-Offset": str(upload["offset"]), "Upload-Length": str(upload["length"])}
+        if request.method == "HEAD":
+            return Response(status_code=200, headers={**tus_headers, **progress, "Cache-Control": "no-store"})
+
+        if request.headers.get("Content-Type") != "application/offset+octet-stream":
+            return tus_error(415, "expected application/offset+octet-stream")
+        if request.headers.get("Upload-Offset") != str(upload["offset"]):
+            return tus_error(409, "offset mismatch")
+        try:
+            # Count bytes as they arrive, so a dropped connection resumes from what was received
+            async for chunk in request.stream():
+                upload["offset"] = min(upload["length"], upload["offset"] + len(chunk))
+        except ClientDisconnect:
+            return tus_error(400, "client disconnected")
+
+        if upload["offset"] == upload["length"]:
+            # Encoding is instant here: 4 = finished
+            upstream.videos[upload["video_id"]].update(status=4, encodeProgress=100)
+        return Response(status_code=204, headers={**tus_headers, "Upload-Offset": str(upload["offset"])})
+
+    # ---- Bunny Storage ----
+
+    async def storage_object(request: Request):
+        if request.method == "PUT":
+            async for _ in request.stream():
+                pass
+            return JSONResponse({"HttpCode": 201, "Message": "File uploaded."}, status_code=201)
+        if request.method == "DELETE":
+            return JSONResponse({"HttpCode": 200, "Message": "File deleted successfuly."})
+        return Response(b"", media_type="application/octet-stream")
+
+    # ---- Fault control (not subject to faults itself) ----
+
+    async def faults(request: Request):
+        if request.method == "DELETE":
+            upstream.faults.clear()
+        elif request.method == "PUT":
+            upstream.faults[request.path_params["service"]] = await request.json()
+        return JSONResponse(upstream.faults)
+
+    def route(path, handler, methods, service):
+        async def endpoint(request: Request):
+            return await guarded(handler, service, request)
+        return Route(path, endpoint, methods=methods)
+
+    return Starlette(routes=[
+        Route("/_faults", faults, methods=["GET", "DELETE"]),
+        Route("/_faults/{service}", faults, methods=["PUT"]),
+        route("/v1/orders", create_order, ["POST"], "razorpay"),
+        route("/library/{library}/videos", create_video, ["POST"], "stream"),
+        route("/library/{library}/videos", list_videos, ["GET"], "stream"),
+        route("/library/{library}/videos/{guid}", video, ["GET", "PUT", "POST", "DELETE"], "stream"),
+        route("/library/{library}/videos/{guid}/thumbnail", video_thumbnail, ["POST"], "stream"),
+        route("/tusupload", tus_create, ["POST"], "stream"),
+        route("/tusupload/{upload_id}", tus_upload, ["HEAD", "PATCH"], "stream"),
+        route("/{zone}/{path:path}", storage_object, ["GET", "PUT", "DELETE"], "storage"),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--stream-api-key", help="verify TUS upload signatures against this Bunny Stream API key")
+    args = parser.parse_args()
+
+    import uvicorn
+    upstream = FakeUpstream(args.latency_ms, args.jitter_ms, args.failure_rate, stream_api_key=args.stream_api_key)
+    uvicorn.run(create_app(upstream), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
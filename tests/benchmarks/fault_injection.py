@@ -0,0 +1,234 @@
+"""
+Fault injection for the resilience layer around Bunny and Razorpay (backend/resilience.py).
+
+Starts (or connects to) mongod, the fakes and the API. The API gets short upstream
+timeouts and a short circuit reset so the run takes seconds. It then goes through
+four phases, changing the fakes' faults between them:
+
+  baseline   no faults
+  hang       Razorpay and Bunny Stream answer only after --hang-seconds
+  down       Razorpay and Bunny Stream fail every request with a 503
+  recovered  faults cleared; waits out the circuit reset before measuring
+
+In every phase, endpoints that call the faulty services are hammered in the
+background: create-razorpay-order, POST /videos/direct-upload and
+GET /videos/{id}/status. Meanwhile an unrelated endpoint (--probe, which uses
+Mongo only) is driven at a fixed concurrency. The run fails when:
+
+  - the probe's p50 or p99 in a faulty phase exceeds --max-slowdown times its
+    baseline value, plus --slack-ms;
+  - a dependent call takes longer than the upstream timeout plus retries allow,
+    i.e. something hung instead of failing fast;
+  - dependent calls do not succeed again in the recovered phase.
+
+    python tests/benchmarks/fault_injection.py --hang-seconds 30 --output faults.json
+"""
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+
+from datasets import seed  # noqa: E402
+from run_bench import (  # noqa: E402
+    DB_NAME, build_scenarios, drive, free_port, mint_token, percentile, start_api, start_fakes, start_mongod, stop
+)
+
+UPSTREAM_TIMEOUT_SECONDS = 1.0
+CIRCUIT_RESET_SECONDS = 3.0
+# Upstream settings the API runs with; short, so the phases stay short
+API_ENV = {
+    f"{prefix}_{key}": str(value)
+    for prefix in ("BUNNY_STREAM", "BUNNY_STORAGE", "RAZORPAY")
+    for key, value in (
+        ("READ_TIMEOUT_SECONDS", UPSTREAM_TIMEOUT_SECONDS),
+        ("CONNECT_TIMEOUT_SECONDS", UPSTREAM_TIMEOUT_SECONDS),
+        ("RETRIES", 1),
+        ("RETRY_BASE_SECONDS", 0.1),
+        ("CIRCUIT_FAILURE_THRESHOLD", 5),
+        ("CIRCUIT_RESET_SECONDS", CIRCUIT_RESET_SECONDS),
+    )
+}
+# Longest a dependent call may take: two attempts, each up to the timeout, plus backoff and the handler
+DEPENDENT_CALL_BUDGET_MS = (2 * UPSTREAM_TIMEOUT_SECONDS + 0.5) * 1000 + 500
+
+PHASES = ["baseline", "hang", "down", "recovered"]
+
+
+def phase_fault(phase: str, args) -> dict:
+    """Fault applied to Razorpay and Bunny Stream in the fakes during a phase"""
+    if phase == "hang":
+        return {"latency_ms": args.hang_seconds * 1000}
+    if phase == "down":
+        return {"failure_rate": 1.0}
+    return {}
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int]) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+async def run_phase(client: httpx.AsyncClient, factories: dict, args) -> dict:
+    stop_background = asyncio.Event()
+    dependent: Dict[str, tuple] = {name: ([], {}) for name in factories["dependent"]}
+
+    async def hammer(name: str):
+        latencies, statuses = dependent[name]
+        index = 0
+        while not stop_background.is_set():
+            batch_latencies, batch_statuses, _ = await drive(
+                client, factories["dependent"][name], index, args.dependent_concurrency, args.dependent_concurrency
+            )
+            index += args.dependent_concurrency
+            latencies.extend(batch_latencies)
+            for status, count in batch_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    background = [asyncio.create_task(hammer(name)) for name in dependent]
+    try:
+        # Let the dependent load build up (and circuits open) before measuring the probe
+        await asyncio.sleep(args.settle_seconds)
+        latencies, statuses, _ = await drive(client, factories["probe"], 0, args.requests, args.concurrency)
+    finally:
+        stop_background.set()
+        await asyncio.gather(*background)
+
+    return {
+        "probe": summarize(latencies, statuses),
+        "dependent": {name: summarize(*dependent[name]) for name in dependent},
+    }
+
+
+async def fault_injection(args, api_url: str, fakes_url: str, mongo_url: str) -> dict:
+    mongo = AsyncIOMotorClient(mongo_url)
+    try:
+        ids = await seed(mongo[DB_NAME], args.scale, args.seed)
+        video = await mongo[DB_NAME].videos.find_one({}, {"_id": 0, "id": 1})
+    finally:
+        mongo.close()
+
+    scenarios = build_scenarios(ids, [], "faults", args.seed)
+    admin_headers = {"Authorization": f"Bearer {mint_token('bench-admin', 'admin')}"}
+    factories = {
+        "probe": scenarios[args.probe],
+        "dependent": {
+            "create_razorpay_order": scenarios["create_razorpay_order"],
+            "direct_upload": lambda i: ("POST", "/api/videos/direct-upload", {"headers": admin_headers, "json": {
+                "title": f"fault-injection-{i}", "category": "yoga", "difficulty": "beginner",
+                "duration": 60, "description": "fault injection",
+            }}),
+            "video_status": lambda i: ("GET", f"/api/videos/{video['id']}/status", {}),
+        },
+    }
+
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency + 3 * args.dependent_concurrency)
+    async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=args.hang_seconds * 2) as client, \
+            httpx.AsyncClient(base_url=fakes_url) as fakes:
+        for phase in PHASES:
+            await fakes.delete("/_faults")
+            fault = phase_fault(phase, args)
+            if fault:
+                for service in ("razorpay", "stream"):
+                    await fakes.put(f"/_faults/{service}", json=fault)
+            if phase == "recovered":
+                await asyncio.sleep(CIRCUIT_RESET_SECONDS + 0.5)
+
+            print(f"Phase {phase} ...", flush=True)
+            results[phase] = await run_phase(client, factories, args)
+            probe = results[phase]["probe"]
+            print(f"  probe {args.probe}: p50 {probe['p50_ms']}ms, p99 {probe['p99_ms']}ms, {probe['status_codes']}")
+            for name, summary in results[phase]["dependent"].items():
+                print(f"  {name}: p50 {summary['p50_ms']}ms, max {summary['max_ms']}ms, {summary['status_codes']}")
+
+        metrics = (await client.get("/metrics")).text
+    results["dependency_metrics"] = [line for line in metrics.splitlines() if line.startswith("fitsphere_dependency_")]
+    return results
+
+
+def check(results: dict, args) -> List[str]:
+    failures = []
+    baseline = results["baseline"]["probe"]
+    for phase in ("hang", "down"):
+        probe = results[phase]["probe"]
+        for field in ("p50_ms", "p99_ms"):
+            limit = baseline[field] * args.max_slowdown + args.slack_ms
+            if probe[field] > limit:
+                failures.append(f"{phase}: probe {field} {probe[field]} exceeds {limit:.1f} (baseline {baseline[field]})")
+        for name, summary in results[phase]["dependent"].items():
+            if summary["max_ms"] > DEPENDENT_CALL_BUDGET_MS:
+                failures.append(f"{phase}: {name} took {summary['max_ms']}ms, budget {DEPENDENT_CALL_BUDGET_MS:.0f}ms")
+
+    for name, summary in results["recovered"]["dependent"].items():
+        ok = sum(count for status, count in summary["status_codes"].items() if status.startswith("2"))
+        if not ok:
+            failures.append(f"recovered: {name} never succeeded ({summary['status_codes']})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--probe", default="products", help="run_bench scenario used as the unrelated endpoint")
+    parser.add_argument("--requests", type=int, default=1000, help="probe requests per phase")
+    parser.add_argument("--concurrency", type=int, default=16, help="probe concurrency")
+    parser.add_argument("--dependent-concurrency", type=int, default=16, help="concurrency per dependent endpoint")
+    parser.add_argument("--hang-seconds", type=float, default=30.0)
+    parser.add_argument("--settle-seconds", type=float, default=2.0)
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    parser.add_argument("--slack-ms", type=float, default=20.0)
+    parser.add_argument("--mongo-url", help="use this server instead of starting a throwaway mongod")
+    parser.add_argument("--output", default="fault-injection.json")
+    args = parser.parse_args()
+
+    mongod = fakes = api = None
+    dbpath = None
+    try:
+        mongo_url = args.mongo_url
+        if mongo_url is None:
+            mongod, mongo_url, dbpath = start_mongod()
+        fakes_port = free_port()
+        fakes = start_fakes(fakes_port, 0.0)
+        fakes_url = f"http://127.0.0.1:{fakes_port}"
+        api_port = free_port()
+        api = start_api(api_port, mongo_url, fakes_url, 1, extra_env=API_ENV)
+
+        started = time.perf_counter()
+        results = asyncio.run(fault_injection(args, f"http://127.0.0.1:{api_port}", fakes_url, mongo_url))
+        results["duration_s"] = round(time.perf_counter() - started, 1)
+    finally:
+        stop(api)
+        stop(fakes)
+        stop(mongod)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    failures = check(results, args)
+    if failures:
+        print("\nFault injection failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        raise SystemExit(1)
+    print(f"\nUnrelated endpoints kept their latency; report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
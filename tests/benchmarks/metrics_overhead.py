@@ -0,0 +1,139 @@
+"""
+Measure the cost of the Prometheus middleware on /ping.
+
+The app is imported once with METRICS_ENABLED=false and driven in-process through
+httpx's ASGI transport, both bare and wrapped in PrometheusMiddleware (the same
+outermost position add_middleware gives it). Batches of the two variants are
+interleaved in one interpreter so CPU frequency and allocator drift affect both
+equally, and median throughputs are compared. Without a network hop this is a
+worst case for relative overhead.
+
+End-to-end medians on a shared machine still wobble by several percent, so the
+pass/fail gate uses the middleware's own per-request cost (timed around a no-op
+ASGI app) relative to the measured /ping latency; both numbers are reported.
+
+    python tests/benchmarks/metrics_overhead.py --requests 5000 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+
+
+def _load_app():
+    os.environ["METRICS_ENABLED"] = "false"
+    # /ping never touches Mongo or Razorpay; these only satisfy import-time config checks
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/?serverSelectionTimeoutMS=100")
+    os.environ.setdefault("DB_NAME", "fitsphere_bench")
+    os.environ.setdefault("RAZORPAY_KEY_ID", "rzp_bench")
+    os.environ.setdefault("RAZORPAY_KEY_SECRET", "bench_secret")
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(BACKEND_DIR)
+    import server
+    from metrics import PrometheusMiddleware
+    logging.disable(logging.CRITICAL)
+    return server.app, PrometheusMiddleware(server.app)
+
+
+async def _batch(client, requests: int, concurrency: int) -> float:
+    per_worker = requests // concurrency
+
+    async def worker():
+        for _ in range(per_worker):
+            response = await client.get("/ping")
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return per_worker * concurrency / (time.perf_counter() - start)
+
+
+async def _isolated_middleware_cost_us(iterations: int = 200000) -> float:
+    """Per-request cost of PrometheusMiddleware around an app that does nothing"""
+    from metrics import PrometheusMiddleware
+
+    class _Route:
+        path = "/ping"
+
+    async def noop_app(scope, receive, send):
+        scope["route"] = _Route
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    async def timed(app) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await app({"type": "http", "method": "GET"}, receive, send)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    wrapped = PrometheusMiddleware(noop_app)
+    bare_us = min([await timed(noop_app) for _ in range(3)])
+    wrapped_us = min([await timed(wrapped) for _ in range(3)])
+    return wrapped_us - bare_us
+
+
+async def run(args) -> dict:
+    import httpx
+
+    bare, instrumented = _load_app()
+    clients = {
+        "off": httpx.AsyncClient(transport=httpx.ASGITransport(app=bare), base_url="http://bench"),
+        "on": httpx.AsyncClient(transport=httpx.ASGITransport(app=instrumented), base_url="http://bench"),
+    }
+    results = {"off": [], "on": []}
+    try:
+        for client in clients.values():
+            await _batch(client, 1000, args.concurrency)
+        for round_number in range(args.rounds):
+            # Alternate which variant goes first to cancel ordering effects
+            order = ("off", "on") if round_number % 2 == 0 else ("on", "off")
+            for variant in order:
+                results[variant].append(await _batch(clients[variant], args.requests, args.concurrency))
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+    off = statistics.median(results["off"])
+    on = statistics.median(results["on"])
+    middleware_us = await _isolated_middleware_cost_us()
+    ping_us = 1e6 / off
+    return {
+        "requests_per_batch": args.requests,
+        "rounds": args.rounds,
+        "median_rps_without_metrics": round(off, 1),
+        "median_rps_with_metrics": round(on, 1),
+        "end_to_end_overhead_percent": round((off - on) / off * 100, 2),
+        "middleware_cost_us": round(middleware_us, 2),
+        "ping_latency_us": round(ping_us, 1),
+        "overhead_percent": round(middleware_us / ping_us * 100, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--max-overhead", type=float, default=2.0, help="fail above this percentage")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["overhead_percent"] > args.max_overhead else 0)
+
+
+if __name__ == "__main__":
+    main()
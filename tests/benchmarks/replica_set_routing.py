@@ -0,0 +1,244 @@
+"""
+Check that read routing works against a real three-member replica set.
+
+Starts three mongod processes as replica set rs-bench (or uses --mongo-url,
+which must point at a replica set), loads a small generated dataset, then calls
+the API in-process and records which member served each command:
+
+  - catalogue reads (/api/products, /api/videos/public) must hit a secondary
+  - analytics reads (/api/analytics/dashboard, /api/users) must hit a secondary
+  - carts and payment verification must read and write on the primary
+
+    python tests/benchmarks/replica_set_routing.py
+
+Exits non-zero when any request was routed to the wrong member.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from jose import jwt
+from pymongo import MongoClient, monitoring
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parents[1] / "backend"
+
+REPLICA_SET = "rs-bench"
+DB_NAME = "fitsphere_routing"
+JWT_SECRET = "fitsphere-routing-secret"
+RAZORPAY_KEY_SECRET = "routing_secret"
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue"}
+
+
+class AddressRecorder(monitoring.CommandListener):
+    """Remembers the member each application command was sent to"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.commands: List[Tuple[str, str, str]] = []
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS or event.database_name != DB_NAME:
+            return
+        collection = event.command.get(event.command_name)
+        address = f"{event.connection_id[0]}:{event.connection_id[1]}"
+        with self._lock:
+            self.commands.append((event.command_name, collection if isinstance(collection, str) else "", address))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def take(self) -> List[Tuple[str, str, str]]:
+        with self._lock:
+            commands, self.commands = self.commands, []
+        return commands
+
+
+def start_replica_set(workdir: str) -> Tuple[List[subprocess.Popen], str]:
+    binary = shutil.which("mongod")
+    if binary is None:
+        raise SystemExit("mongod not found on PATH; install it or pass --mongo-url")
+    sys.path.insert(0, str(BENCH_DIR))
+    from run_bench import free_port
+
+    ports = [free_port() for _ in range(3)]
+    processes = []
+    for port in ports:
+        dbpath = os.path.join(workdir, str(port))
+        os.makedirs(dbpath)
+        processes.append(subprocess.Popen(
+            [binary, "--replSet", REPLICA_SET, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+
+    seed = MongoClient(f"mongodb://127.0.0.1:{ports[0]}/?directConnection=true", serverSelectionTimeoutMS=30000)
+    seed.admin.command("replSetInitiate", {
+        "_id": REPLICA_SET,
+        # The first member is made primary so the expected topology is fixed
+        "members": [
+            {"_id": i, "host": f"127.0.0.1:{port}", "priority": 2 if i == 0 else 1}
+            for i, port in enumerate(ports)
+        ],
+    })
+    seed.close()
+
+    url = f"mongodb://{','.join(f'127.0.0.1:{port}' for port in ports)}/?replicaSet={REPLICA_SET}"
+    deadline = time.monotonic() + 60
+    with MongoClient(url, serverSelectionTimeoutMS=5000) as client:
+        while time.monotonic() < deadline:
+            status = client.admin.command("replSetGetStatus")
+            states = [member["stateStr"] for member in status["members"]]
+            if states.count("PRIMARY") == 1 and states.count("SECONDARY") == 2:
+                return processes, url
+            time.sleep(0.5)
+    raise RuntimeError("Replica set did not elect a primary with two secondaries")
+
+
+def topology(url: str) -> Tuple[str, List[str]]:
+    with MongoClient(url, serverSelectionTimeoutMS=5000) as client:
+        status = client.admin.command("replSetGetStatus")
+    primary = next(m["name"] for m in status["members"] if m["stateStr"] == "PRIMARY")
+    secondaries = [m["name"] for m in status["members"] if m["stateStr"] == "SECONDARY"]
+    return primary, secondaries
+
+
+def load_dataset(url: str):
+    sys.path.insert(0, str(BACKEND_DIR))
+    from generate_data import DataGenerator, load
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async def run():
+        client = AsyncIOMotorClient(url)
+        counts = {"users": 50, "trainers": 5, "programs": 10, "products": 20, "videos": 20,
+                  "orders": 200, "bookings": 20, "chat": 0, "comments": 0}
+        await load(client[DB_NAME], DataGenerator(counts), batch_size=100, workers=2, log=lambda _: None)
+        await client[DB_NAME].products.update_many({}, {"$set": {"stock": 1000, "is_active": True}})
+        client.close()
+
+    asyncio.run(run())
+    # Wait until both secondaries have applied the dataset
+    with MongoClient(url, w=3, wtimeoutMS=30000) as client:
+        client[DB_NAME].routing_marker.insert_one({"loaded_at": datetime.utcnow()})
+
+
+def token(subject: str, role: str) -> str:
+    return jwt.encode(
+        {"sub": subject, "role": role, "email": f"{role}@routing.test", "exp": datetime.utcnow() + timedelta(hours=1)},
+        JWT_SECRET, algorithm="HS256"
+    )
+
+
+async def check_routes(recorder: AddressRecorder, primary: str, secondaries: List[str]) -> List[str]:
+    import server
+    from generate_data import entity_id
+
+    user_id, product_id = entity_id(42, "users", 0), entity_id(42, "products", 0)
+    user_headers = {"Authorization": f"Bearer {token(user_id, 'user')}"}
+    admin_headers = {"Authorization": f"Bearer {token('routing-admin', 'admin')}"}
+
+    pending = entity_id(42, "orders", 10**6)
+    await server.db.orders.insert_one({
+        "id": pending, "order_id": pending, "user_id": user_id, "items": [], "total_amount": 10.0,
+        "razorpay_order_id": "order_routing", "payment_status": "pending", "created_at": datetime.utcnow().isoformat(),
+    })
+    signature = hmac.new(RAZORPAY_KEY_SECRET.encode(), b"order_routing|pay_routing", hashlib.sha256).hexdigest()
+
+    checks: List[Tuple[str, str, dict, str]] = [
+        ("GET", "/api/products", {}, "secondary"),
+        ("GET", "/api/videos/public", {}, "secondary"),
+        ("GET", "/api/analytics/dashboard", {"headers": admin_headers}, "secondary"),
+        ("GET", "/api/users", {"headers": admin_headers}, "secondary"),
+        ("POST", "/api/cart/add", {"headers": user_headers, "json": {"product_id": product_id, "quantity": 1}}, "primary"),
+        ("POST", "/api/orders/verify-payment", {"data": {
+            "razorpay_order_id": "order_routing", "razorpay_payment_id": "pay_routing", "razorpay_signature": signature,
+        }}, "primary"),
+    ]
+
+    failures = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://routing") as client:
+        for method, path, kwargs, expected in checks:
+            recorder.take()
+            response = await client.request(method, path, **kwargs)
+            commands = recorder.take()
+            if response.status_code >= 400:
+                failures.append(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+                continue
+            wrong = [
+                f"{name} {collection} -> {address}"
+                for name, collection, address in commands
+                if (expected == "primary" and address != primary)
+                or (expected == "secondary" and address not in secondaries)
+            ]
+            served_by = sorted({address for _, _, address in commands})
+            print(f"{method:<5}{path:<32} expected {expected:<10} served by {', '.join(served_by) or '-'}")
+            if not commands:
+                failures.append(f"{method} {path} issued no Mongo commands")
+            elif wrong:
+                failures.append(f"{method} {path} should run on the {expected}: {'; '.join(wrong)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-url", help="an existing replica set to test against")
+    args = parser.parse_args()
+
+    workdir: Optional[str] = None
+    processes: List[subprocess.Popen] = []
+    try:
+        url = args.mongo_url
+        if url is None:
+            workdir = tempfile.mkdtemp(prefix="fitsphere-rs-")
+            processes, url = start_replica_set(workdir)
+        primary, secondaries = topology(url)
+        print(f"primary {primary}, secondaries {', '.join(secondaries)}")
+
+        load_dataset(url)
+
+        os.environ.update(
+            MONGO_URL=url, DB_NAME=DB_NAME, JWT_SECRET_KEY=JWT_SECRET,
+            RAZORPAY_KEY_ID="rzp_routing", RAZORPAY_KEY_SECRET=RAZORPAY_KEY_SECRET,
+            METRICS_ENABLED="false", ARCHIVER_ENABLED="false",
+        )
+        recorder = AddressRecorder()
+        # Registered before the app builds its clients so every handle reports to it
+        monitoring.register(recorder)
+        os.chdir(BACKEND_DIR)
+        failures = asyncio.run(check_routes(recorder, primary, secondaries))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("\nRouting check failed:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nAll requests were routed as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+HTTP benchmark for the hot API endpoints.
+
+Starts (or connects to) a throwaway mongod, seeds a deterministic dataset, starts
+the fake Bunny/Razorpay upstreams and the API under uvicorn with its env pointed
+at them, then drives each scenario at a fixed concurrency and writes a JSON
+report. Mongo commands per request come from the API's own /metrics histogram
+(fitsphere_mongo_commands_per_request), scraped before and after each scenario.
+
+    python tests/benchmarks/run_bench.py --scale 10k --concurrency 32 --requests 2000 \\
+        --output bench-$(git rev-parse --short HEAD).json
+    python tests/benchmarks/compare.py bench-old.json bench-new.json
+
+Without --mongo-url a mongod binary must be on PATH; it runs on a temporary
+dbpath that is removed afterwards. Re-running with the same --scale and --seed
+against a kept database (--mongo-url) reuses the loaded dataset.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from jose import jwt
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parents[1]
+BACKEND_DIR = REPO_ROOT / "backend"
+sys.path.insert(0, str(BENCH_DIR))
+
+from datasets import SCALES, seed, seed_pending_orders  # noqa: E402
+
+JWT_SECRET = "fitsphere-benchmark-secret"
+RAZORPAY_KEY_ID = "rzp_test_bench"
+RAZORPAY_KEY_SECRET = "bench_razorpay_secret"
+DB_NAME = "fitsphere_bench"
+BUNNY_STREAM_LIBRARY_ID = "bench"
+BUNNY_STREAM_API_KEY = "bench"
+# Live bookings go after every seeded one; earlier runs' bookings here are cleared first
+BOOKING_START = date(2030, 1, 1)
+
+SCENARIOS = [
+    "ping", "videos_public", "products", "cart_add", "create_razorpay_order",
+    "verify_payment", "bookings", "analytics_dashboard", "video_view", "videos_trending",
+    "watch_progress", "video_comments", "comment_counts",
+]
+
+RequestFactory = Callable[[int], Tuple[str, str, dict]]
+
+
+# ==================== PROCESSES ====================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def wait_until_ready(api_url: str, timeout: float = 60.0):
+    """/ping answers before the API's Mongo warm-up has finished; wait for that too"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if httpx.get(f"{api_url}/ping", timeout=1.0).json().get("ready"):
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"API at {api_url} did not finish warming up")
+
+
+def start_mongod() -> Tuple[subprocess.Popen, str, str]:
+    binary = shutil.which("mongod")
+    if binary is None:
+        raise SystemExit("mongod not found on PATH; install it or pass --mongo-url")
+    dbpath = tempfile.mkdtemp(prefix="fitsphere-bench-")
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"mongodb://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return process, url, dbpath
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("mongod did not start")
+
+
+def start_fakes(port: int, latency_ms: float, failure_rate: float = 0.0) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, str(BENCH_DIR / "fakes.py"), "--port", str(port), "--latency-ms", str(latency_ms),
+        "--failure-rate", str(failure_rate), "--stream-api-key", BUNNY_STREAM_API_KEY
+    ])
+    wait_for_http(f"http://127.0.0.1:{port}/library/bench/videos")
+    return process
+
+
+# How the API process is started:
+#   uvicorn - plain `uvicorn server:app --workers N`
+#   dev     - what `python server.py` runs: one auto-reloading process
+#   serve   - the production launcher, backend/serve.py (uvloop, httptools, graceful drain)
+LAUNCHERS = ["uvicorn", "dev", "serve"]
+
+
+def api_command(launcher: str, port: int, workers: int) -> List[str]:
+    if launcher == "serve":
+        return [sys.executable, "serve.py"]
+    command = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning", "--no-access-log"]
+    if launcher == "dev":
+        return command + ["--reload"]
+    return command + ["--workers", str(workers)]
+
+
+def start_api(port: int, mongo_url: str, fakes_url: str, workers: int, launcher: str = "uvicorn",
+              extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        MONGO_URL=mongo_url,
+        DB_NAME=DB_NAME,
+        JWT_SECRET_KEY=JWT_SECRET,
+        RAZORPAY_KEY_ID=RAZORPAY_KEY_ID,
+        RAZORPAY_KEY_SECRET=RAZORPAY_KEY_SECRET,
+        RAZORPAY_BASE_URL=fakes_url,
+        BUNNY_STREAM_API_URL=fakes_url,
+        BUNNY_STORAGE_API_URL=fakes_url,
+        BUNNY_TUS_ENDPOINT=f"{fakes_url}/tusupload",
+        BUNNY_STREAM_LIBRARY_ID=BUNNY_STREAM_LIBRARY_ID,
+        BUNNY_STREAM_API_KEY=BUNNY_STREAM_API_KEY,
+        BUNNY_STORAGE_ZONE="bench",
+        BUNNY_STORAGE_API_KEY="bench",
+        BUNNY_PULL_ZONE_URL="https://bench.b-cdn.net",
+        ARCHIVER_ENABLED="false",
+        METRICS_ENABLED="true",
+        METRICS_TOKEN="",
+        DEBUG="false",
+        # Read by serve.py
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        LOG_LEVEL="warning",
+        **(extra_env or {}),
+    )
+    process = subprocess.Popen(api_command(launcher, port, workers), cwd=BACKEND_DIR, env=env)
+    wait_for_http(f"http://127.0.0.1:{port}/ping")
+    wait_until_ready(f"http://127.0.0.1:{port}")
+    return process
+
+
+def stop(process: Optional[subprocess.Popen]):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ==================== AUTH & SCENARIOS ====================
+
+def mint_token(subject: str, role: str) -> str:
+    payload = {
+        "sub": subject, "email": f"{subject}@bench.fitsphere.test", "role": role,
+        "exp": datetime.utcnow() + timedelta(hours=6),
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+def sign_payment(razorpay_order_id: str, razorpay_payment_id: str) -> str:
+    message = f"{razorpay_order_id}|{razorpay_payment_id}".encode()
+    return hmac.new(RAZORPAY_KEY_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def build_scenarios(ids: Dict[str, List[str]], pending_orders: List[str], run_id: str, seed_value: int) -> Dict[str, RequestFactory]:
+    rng = random.Random(seed_value)
+    user_ids = ids["users"]
+    product_ids = ids["products"]
+    # Tokens are minted for a fixed slice of users so the cost of minting stays out of the loop
+    user_tokens = [
+        {"Authorization": f"Bearer {mint_token(user_id, 'user')}"} for user_id in user_ids[:200]
+    ]
+    admin_headers = {"Authorization": f"Bearer {mint_token('bench-admin', 'admin')}"}
+    slots = [f"{hour:02d}:00" for hour in range(6, 22)]
+    # Draw random offsets up front so every scenario issues the same request sequence each run
+    skips = [rng.randrange(0, 500) for _ in range(1024)]
+
+    def user_headers(i: int) -> dict:
+        return user_tokens[i % len(user_tokens)]
+
+    def ping(i):
+        return "GET", "/ping", {}
+
+    def videos_public(i):
+        return "GET", f"/api/videos/public?skip={skips[i % len(skips)]}&limit=50", {}
+
+    def products(i):
+        return "GET", f"/api/products?skip={skips[i % len(skips)] % 100}&limit=50", {}
+
+    def cart_add(i):
+        return "POST", "/api/cart/add", {
+            "headers": user_headers(i),
+            "json": {"product_id": product_ids[i % len(product_ids)], "quantity": 1},
+        }
+
+    def create_razorpay_order(i):
+        product_id = product_ids[i % len(product_ids)]
+        return "POST", "/api/orders/create-razorpay-order", {
+            "headers": user_headers(i),
+            "json": {
+                "items": [{"product_id": product_id, "product_name": "Bench Product", "quantity": 1, "price": 1.0}],
+                "total_amount": 1.0, "customer_name": "Bench Customer",
+                "customer_email": "customer@bench.fitsphere.test", "customer_phone": "9000000000",
+                "shipping_address": "1 Benchmark Road",
+            },
+        }
+
+    def verify_payment(i):
+        razorpay_order_id = pending_orders[i % len(pending_orders)]
+        razorpay_payment_id = f"pay_{run_id}{i:08d}"
+        return "POST", "/api/orders/verify-payment", {
+            "data": {
+                "razorpay_order_id": razorpay_order_id,
+                "razorpay_payment_id": razorpay_payment_id,
+                "razorpay_signature": sign_payment(razorpay_order_id, razorpay_payment_id),
+            },
+        }
+
+    def bookings(i):
+        # Every request takes a distinct (trainer, date, slot) so none are rejected as double bookings
+        program_index = i % len(ids["programs"])
+        trainer_index = program_index % len(ids["trainers"])
+        cell = i // len(ids["programs"])
+        day = BOOKING_START + timedelta(days=cell // len(slots))
+        return "POST", "/api/bookings", {
+            "headers": user_headers(i),
+            "json": {
+                "program_id": ids["programs"][program_index], "trainer_id": ids["trainers"][trainer_index],
+                "booking_date": day.isoformat(), "time_slot": slots[cell % len(slots)],
+                "attendance_type": "gym",
+            },
+        }
+
+    def analytics_dashboard(i):
+        return "GET", "/api/analytics/dashboard", {"headers": admin_headers}
+
+    # Skewed towards a few popular videos, like real plays
+    popular = [int(rng.paretovariate(1.1)) % len(ids["videos"]) for _ in range(1024)]
+
+    def video_view(i):
+        return "POST", f"/api/videos/{ids['videos'][popular[i % len(popular)]]}/view", {}
+
+    def videos_trending(i):
+        return "GET", "/api/videos/trending?limit=20", {}
+
+    def watch_progress(i):
+        # Players heartbeat every few seconds; the same (user, video) pairs repeat with a moving position
+        return "POST", f"/api/videos/{ids['videos'][i % 50]}/progress", {
+            "headers": user_headers(i),
+            "json": {"position_seconds": float(i % 600), "duration_seconds": 600.0},
+        }
+
+    def video_comments(i):
+        return "GET", f"/api/videos/{ids['videos'][popular[i % len(popular)]]}/comments?limit=20", {}
+
+    # One catalog grid's worth of cards
+    grid = ",".join(ids["videos"][:24])
+
+    def comment_counts(i):
+        return "GET", f"/api/videos/comment-counts?video_ids={grid}", {}
+
+    return {
+        "ping": ping,
+        "videos_public": videos_public,
+        "products": products,
+        "cart_add": cart_add,
+        "create_razorpay_order": create_razorpay_order,
+        "verify_payment": verify_payment,
+        "bookings": bookings,
+        "analytics_dashboard": analytics_dashboard,
+        "video_view": video_view,
+        "videos_trending": videos_trending,
+        "watch_progress": watch_progress,
+        "video_comments": video_comments,
+        "comment_counts": comment_counts,
+    }
+
+
+# ==================== MEASUREMENT ====================
+
+def parse_commands_per_request(metrics_text: str) -> Dict[str, Tuple[float, float]]:
+    """route -> (sum, count) of the Mongo commands-per-request histogram"""
+    totals: Dict[str, List[float]] = {}
+    for line in metrics_text.splitlines():
+        for suffix, index in (("_sum", 0), ("_count", 1)):
+            prefix = f"fitsphere_mongo_commands_per_request{suffix}{{"
+            if line.startswith(prefix):
+                labels, value = line[len(prefix):].rsplit("} ", 1)
+                route = labels.split('route="', 1)[1].rsplit('"', 1)[0]
+                totals.setdefault(route, [0.0, 0.0])[index] = float(value)
+    return {route: (values[0], values[1]) for route, values in totals.items()}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def drive(client: httpx.AsyncClient, factory: RequestFactory, start: int, count: int, concurrency: int):
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    next_index = start
+    end = start + count
+
+    async def worker():
+        nonlocal next_index
+        while next_index < end:
+            index = next_index
+            next_index += 1
+            method, url, kwargs = factory(index)
+            began = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            latencies.append((time.perf_counter() - began) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - began
+
+
+async def run_scenario(client, factory: RequestFactory, route: str, args) -> dict:
+    await drive(client, factory, 0, args.warmup, min(args.concurrency, max(1, args.warmup)))
+
+    before = parse_commands_per_request((await client.get("/metrics")).text).get(route, (0.0, 0.0))
+    latencies, statuses, elapsed = await drive(client, factory, args.warmup, args.requests, args.concurrency)
+    after = parse_commands_per_request((await client.get("/metrics")).text).get(route, (0.0, 0.0))
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+    observed = after[1] - before[1]
+    # Each worker process keeps its own registry, so per-request counts are only exact with one worker
+    mongo_ops = round((after[0] - before[0]) / observed, 2) if observed and args.workers == 1 else None
+    return {
+        "route": route,
+        "requests": len(latencies),
+        "errors": errors,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "mongo_ops_per_request": mongo_ops,
+    }
+
+
+ROUTES = {
+    "ping": "/ping",
+    "videos_public": "/api/videos/public",
+    "products": "/api/products",
+    "cart_add": "/api/cart/add",
+    "create_razorpay_order": "/api/orders/create-razorpay-order",
+    "verify_payment": "/api/orders/verify-payment",
+    "bookings": "/api/bookings",
+    "analytics_dashboard": "/api/analytics/dashboard",
+}
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args, api_url: str, mongo_url: str) -> dict:
+    mongo = AsyncIOMotorClient(mongo_url)
+    db = mongo[DB_NAME]
+    try:
+        seed_started = time.perf_counter()
+        ids = await seed(db, args.scale, args.seed)
+        seed_seconds = time.perf_counter() - seed_started
+
+        run_id = uuid.uuid4().hex[:8]
+        await db.bookings.delete_many({"booking_date": {"$gte": BOOKING_START.isoformat()}})
+        pending_orders = []
+        if "verify_payment" in args.scenarios:
+            pending_orders = await seed_pending_orders(
+                db, run_id, args.warmup + args.requests, ids["users"][0], ids["products"][0]
+            )
+        factories = build_scenarios(ids, pending_orders, run_id, args.seed)
+    finally:
+        mongo.close()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=api_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            print(f"Running {name} ...", flush=True)
+            results[name] = await run_scenario(client, factories[name], ROUTES[name], args)
+            summary = results[name]
+            print(
+                f"  {summary['throughput_rps']} req/s, p50 {summary['latency_ms']['p50']}ms, "
+                f"p95 {summary['latency_ms']['p95']}ms, p99 {summary['latency_ms']['p99']}ms, "
+                f"{summary['mongo_ops_per_request']} mongo ops/req, {summary['errors']} errors",
+                flush=True
+            )
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "warmup_requests": args.warmup,
+            "api_workers": args.workers,
+            "api_launcher": args.launcher,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "seed_seconds": round(seed_seconds, 1),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--launcher", choices=LAUNCHERS, default="uvicorn", help="how the API process is started")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0, help="delay added by the fake upstreams")
+    parser.add_argument("--mongo-url", help="use this server instead of starting a throwaway mongod")
+    parser.add_argument("--api-url", help="benchmark an already running API (it must use the same JWT/Razorpay secrets)")
+    parser.add_argument("--output", default="bench-report.json")
+    args = parser.parse_args()
+
+    mongod = fakes = api = None
+    dbpath = None
+    try:
+        mongo_url = args.mongo_url
+        if mongo_url is None:
+            mongod, mongo_url, dbpath = start_mongod()
+
+        api_url = args.api_url
+        if api_url is None:
+            fakes_port = free_port()
+            fakes = start_fakes(fakes_port, args.upstream_latency_ms)
+            api_port = free_port()
+            api = start_api(api_port, mongo_url, f"http://127.0.0.1:{fakes_port}", args.workers, args.launcher)
+            api_url = f"http://127.0.0.1:{api_port}"
+
+        report = asyncio.run(benchmark(args, api_url, mongo_url))
+    finally:
+        stop(api)
+        stop(fakes)
+        stop(mongod)
+        if dbpath:
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure the in-memory video catalog behind GET /videos and GET /videos/public.
+
+Builds a VideoCatalog from generate_data's video documents (no Mongo needed; rows
+go through the same transform and encoding the server uses), then times filtered
+pages, search pages and deep pages, and reports the catalog's memory estimate.
+
+    python tests/benchmarks/video_catalog.py --videos 5000 --iterations 2000
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+
+
+def _load():
+    # Only import-time config checks need these; nothing here talks to Mongo or Razorpay
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017/?serverSelectionTimeoutMS=100")
+    os.environ.setdefault("DB_NAME", "fitsphere_bench")
+    os.environ.setdefault("RAZORPAY_KEY_ID", "rzp_bench")
+    os.environ.setdefault("RAZORPAY_KEY_SECRET", "bench_secret")
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(BACKEND_DIR)
+    import server
+    from generate_data import DataGenerator
+    from video_catalog import VideoCatalog
+    logging.disable(logging.CRITICAL)
+    return server, DataGenerator, VideoCatalog
+
+
+def _time_us(call, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server, DataGenerator, VideoCatalog = _load()
+    generator = DataGenerator({"videos": args.videos, "products": 0, "programs": 0}, seed=args.seed)
+    docs = generator.videos(random.Random(args.seed), 0, args.videos)["videos"]
+
+    catalog = VideoCatalog(None, None, server.transform_video_response, server.LISTED_VIDEO_FILTER)
+    start = time.perf_counter()
+    for doc in docs:
+        catalog._put(doc)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    category, difficulty = docs[0]["category"], docs[0]["difficulty"]
+    scenarios = {
+        "first_page": lambda: catalog.page(limit=50),
+        "filtered_page": lambda: catalog.page(category, difficulty, None, True, 100, 50),
+        "deep_page": lambda: catalog.page(skip=max(0, args.videos - 50), limit=50),
+        "search_page": lambda: catalog.page(search="session 4", limit=50),
+    }
+    results = {name: round(_time_us(call, args.iterations), 1) for name, call in scenarios.items()}
+    sample = json.loads(catalog.page(category, difficulty, None, True, 0, 1))
+
+    stats = catalog.stats()
+    print(json.dumps({
+        "videos": stats["videos"],
+        "build_ms": round(build_ms, 1),
+        "us_per_page": results,
+        "encoded_bytes": stats["encoded_bytes"],
+        "memory_bytes": stats["memory_bytes"],
+        "sample_matches_filter": bool(sample) and sample[0]["category"] == category and sample[0]["difficulty"] == difficulty,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
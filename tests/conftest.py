@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level modules, as they do under serve.py
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
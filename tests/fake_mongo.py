@@ -0,0 +1,314 @@
+"""
+In-memory stand-in for the parts of a motor database the backend helpers use.
+
+Covers the query operators, update operators and bulk operations those helpers
+send, unique indexes (an upsert that would duplicate one raises DuplicateKeyError,
+which JobLease relies on) and one-shot failures for testing error paths:
+
+    db = FakeDatabase()
+    db.videos.fail_next("delete_many", RuntimeError("primary stepped down"))
+"""
+import copy
+import itertools
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+_object_ids = itertools.count(1)
+
+
+def _get(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list):
+            values = [item.get(part, _MISSING) for item in value if isinstance(item, dict)]
+            return [item for item in values if item is not _MISSING] or _MISSING
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _candidates(value) -> List[Any]:
+    """Values a condition is tested against: the value itself and, for arrays, each element"""
+    if value is _MISSING:
+        return [None]
+    if isinstance(value, list):
+        return [value] + value
+    return [value]
+
+
+def _compare(op: str, value, arg) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$ne":
+        return not _compare("$eq", value, arg)
+    if op == "$nin":
+        return not _compare("$in", value, arg)
+    for candidate in _candidates(value):
+        if op == "$eq" and candidate == arg:
+            return True
+        if op == "$in" and candidate in arg:
+            return True
+        if candidate is None or value is _MISSING:
+            continue
+        if op == "$lt" and candidate < arg:
+            return True
+        if op == "$lte" and candidate <= arg:
+            return True
+        if op == "$gt" and candidate > arg:
+            return True
+        if op == "$gte" and candidate >= arg:
+            return True
+    return False
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            if not all(_compare(op, value, arg) for op, arg in condition.items()):
+                return False
+        elif not _compare("$eq", value, condition):
+            return False
+    return True
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = [field for field, flag in projection.items() if flag and field != "_id"]
+    if included:
+        kept = {field: doc[field] for field in included if field in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            kept["_id"] = doc["_id"]
+        return kept
+    for field, flag in projection.items():
+        if not flag:
+            doc.pop(field, None)
+    return doc
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool):
+    for op, fields in update.items():
+        for field, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                doc[field] = copy.deepcopy(value)
+            elif op == "$inc":
+                doc[field] = doc.get(field, 0) + value
+            elif op == "$unset":
+                doc.pop(field, None)
+            elif op == "$pull":
+                doc[field] = [item for item in doc.get(field, []) if item != value]
+            elif op == "$push":
+                doc.setdefault(field, []).append(copy.deepcopy(value))
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"Update operator {op}")
+
+
+class FakeCursor:
+    def __init__(self, docs: List[dict]):
+        self._docs = docs
+
+    def sort(self, key, direction: int = 1):
+        keys = [(key, direction)] if isinstance(key, str) else list(key)
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda doc: (_get(doc, field) is _MISSING, _get(doc, field)), reverse=order < 0)
+        return self
+
+    def skip(self, count: int):
+        self._docs = self._docs[count:]
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        return self._docs[:length] if length else list(self._docs)
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: List[dict] = []
+        self.unique: List[List[str]] = []
+        self.calls: List[str] = []
+        self._failures: Dict[str, Exception] = {}
+
+    def fail_next(self, method: str, error: Exception):
+        """Make the next call of `method` raise `error` without touching the data"""
+        self._failures[method] = error
+
+    def _enter(self, method: str):
+        self.calls.append(method)
+        error = self._failures.pop(method, None)
+        if error is not None:
+            raise error
+
+    def _check_unique(self, doc: dict, ignore: Optional[dict] = None):
+        for fields in self.unique:
+            key = [_get(doc, field) for field in fields]
+            for other in self.docs:
+                if other is not ignore and other is not doc and [_get(other, field) for field in fields] == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key in {self.name}: {dict(zip(fields, key))}")
+
+    def _insert(self, doc: dict):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", next(_object_ids))
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc["_id"]
+
+    def _update(self, query: dict, update, upsert: bool, many: bool):
+        if isinstance(update, list):
+            raise NotImplementedError("Pipeline updates")
+        targets = [doc for doc in self.docs if matches(doc, query)]
+        if not many:
+            targets = targets[:1]
+        for doc in targets:
+            before = copy.deepcopy(doc)
+            _apply_update(doc, update, inserting=False)
+            try:
+                self._check_unique(doc)
+            except DuplicateKeyError:
+                doc.clear()
+                doc.update(before)
+                raise
+        upserted_id = None
+        if not targets and upsert:
+            doc = {key: value for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+            _apply_update(doc, update, inserting=True)
+            upserted_id = self._insert(doc)
+        return SimpleNamespace(matched_count=len(targets), modified_count=len(targets), upserted_id=upserted_id)
+
+    def _delete(self, query: dict, many: bool) -> int:
+        targets = [doc for doc in self.docs if matches(doc, query)]
+        if not many:
+            targets = targets[:1]
+        for doc in targets:
+            self.docs.remove(doc)
+        return len(targets)
+
+    async def create_index(self, keys, unique: bool = False, **options):
+        fields = [keys] if isinstance(keys, str) else [field for field, _ in keys]
+        if unique and fields not in self.unique:
+            self.unique.append(fields)
+        return "_".join(fields)
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> FakeCursor:
+        self._enter("find")
+        return FakeCursor([_project(doc, projection) for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        self._enter("find_one")
+        for doc in self.docs:
+            if matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+    async def count_documents(self, query: dict) -> int:
+        self._enter("count_documents")
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    async def distinct(self, field: str, query: Optional[dict] = None) -> list:
+        self._enter("distinct")
+        values = []
+        for doc in self.docs:
+            if not matches(doc, query):
+                continue
+            value = _get(doc, field)
+            for item in (value if isinstance(value, list) else [value]):
+                if item is not _MISSING and item not in values:
+                    values.append(item)
+        return values
+
+    async def insert_one(self, doc: dict):
+        self._enter("insert_one")
+        return SimpleNamespace(inserted_id=self._insert(doc))
+
+    async def insert_many(self, docs: List[dict], ordered: bool = True):
+        self._enter("insert_many")
+        return SimpleNamespace(inserted_ids=[self._insert(doc) for doc in docs])
+
+    async def update_one(self, query: dict, update, upsert: bool = False):
+        self._enter("update_one")
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query: dict, update, upsert: bool = False):
+        self._enter("update_many")
+        return self._update(query, update, upsert, many=True)
+
+    async def delete_one(self, query: dict):
+        self._enter("delete_one")
+        return SimpleNamespace(deleted_count=self._delete(query, many=False))
+
+    async def delete_many(self, query: dict):
+        self._enter("delete_many")
+        return SimpleNamespace(deleted_count=self._delete(query, many=True))
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        self._enter("bulk_write")
+        counts = {"inserted_count": 0, "matched_count": 0, "deleted_count": 0, "upserted_ids": {}}
+        for index, operation in enumerate(operations):
+            if isinstance(operation, InsertOne):
+                self._insert(operation._doc)
+                counts["inserted_count"] += 1
+            elif isinstance(operation, DeleteOne):
+                counts["deleted_count"] += self._delete(operation._filter, many=False)
+            elif isinstance(operation, UpdateOne):
+                result = self._update(operation._filter, operation._doc, bool(operation._upsert), many=False)
+                counts["matched_count"] += result.matched_count
+                if result.upserted_id is not None:
+                    counts["upserted_ids"][index] = result.upserted_id
+            elif isinstance(operation, ReplaceOne):
+                targets = [doc for doc in self.docs if matches(doc, operation._filter)][:1]
+                if targets:
+                    replacement = copy.deepcopy(operation._doc)
+                    replacement["_id"] = targets[0]["_id"]
+                    targets[0].clear()
+                    targets[0].update(replacement)
+                    counts["matched_count"] += 1
+                elif operation._upsert:
+                    counts["upserted_ids"][index] = self._insert(operation._doc)
+            else:
+                raise NotImplementedError(type(operation).__name__)
+        return SimpleNamespace(**counts)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
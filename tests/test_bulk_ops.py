@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from bulk_ops import apply_updates, bulk_response, delete_existing, unique_ids, validate_updates
+from models import BulkItemStatus, ProductUpdate
+from tests.fake_mongo import FakeDatabase
+
+
+def _products(*product_ids):
+    db = FakeDatabase()
+    for product_id in product_ids:
+        asyncio.run(db.products.insert_one({"id": product_id, "name": product_id.upper(), "price": 10.0}))
+    return db.products
+
+
+def test_bulk_response_marks_missing_ids_not_found():
+    results, ids = unique_ids(["a", "missing", "a", "b"], max_items=10)
+    found = asyncio.run(delete_existing(_products("a", "b", "c"), ids))
+
+    response = bulk_response(results, set(found), cdn_deletions_queued=3)
+
+    assert [(result.id, result.status) for result in response.results] == [
+        ("a", BulkItemStatus.DELETED),
+        ("missing", BulkItemStatus.NOT_FOUND),
+        ("a", BulkItemStatus.INVALID),
+        ("b", BulkItemStatus.DELETED),
+    ]
+    assert response.requested == 4
+    assert response.succeeded == 2
+    assert response.cdn_deletions_queued == 3
+
+
+def test_delete_existing_deletes_only_found_ids():
+    products = _products("a", "b", "c")
+
+    found = asyncio.run(delete_existing(products, ["a", "missing", "c"]))
+
+    assert sorted(found) == ["a", "c"]
+    assert [doc["id"] for doc in products.docs] == ["b"]
+
+
+def test_bulk_update_reports_unmatched_and_invalid_items():
+    products = _products("a", "b")
+    results, updates = validate_updates(
+        [{"id": "a", "price": 12.5}, {"id": "missing", "price": 1.0}, {"price": 3.0}, {"id": "b"}],
+        ProductUpdate, max_items=10
+    )
+
+    previous = asyncio.run(apply_updates(products, updates, "2026-01-01T00:00:00"))
+    response = bulk_response(results, previous)
+
+    assert [result.status for result in response.results] == [
+        BulkItemStatus.UPDATED, BulkItemStatus.NOT_FOUND, BulkItemStatus.INVALID, BulkItemStatus.INVALID
+    ]
+    assert [(doc["id"], doc["price"]) for doc in products.docs] == [("a", 12.5), ("b", 10.0)]
+    assert products.docs[0]["updated_at"] == "2026-01-01T00:00:00"
+
+
+@pytest.mark.parametrize("ids", [[], ["x"] * 11])
+def test_batch_size_is_checked(ids):
+    with pytest.raises(HTTPException) as error:
+        unique_ids(ids, max_items=10)
+    assert error.value.status_code == 400
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from cdn_outbox import (
+    CDN_OUTBOX_SOURCE_GRACE_SECONDS,
+    PENDING,
+    STORAGE_FILE,
+    CdnDeletionWorker,
+    delete_with_outbox,
+    deletion_record,
+    ensure_outbox_indexes,
+)
+from tests.fake_mongo import FakeDatabase
+
+
+def _database(*image_ids):
+    db = FakeDatabase()
+    asyncio.run(ensure_outbox_indexes(db))
+    for image_id in image_ids:
+        asyncio.run(db.images.insert_one({"id": image_id, "image_url": f"https://cdn/images/{image_id}.jpg"}))
+    return db
+
+
+def _record(image_id: str, age_seconds: float = 0) -> dict:
+    record = deletion_record(STORAGE_FILE, f"images/{image_id}.jpg", "images", image_id)
+    created_at = (datetime.utcnow() - timedelta(seconds=age_seconds)).isoformat()
+    record.update(created_at=created_at, next_attempt_at=created_at)
+    return record
+
+
+def _worker(db, deleted: list) -> CdnDeletionWorker:
+    async def delete_file(path: str) -> bool:
+        deleted.append(path)
+        return True
+    return CdnDeletionWorker(db, {STORAGE_FILE: delete_file})
+
+
+def test_delete_with_outbox_writes_records_before_deleting_rows():
+    db = _database("a", "b")
+    delete_many = db.images.delete_many
+    outbox_at_delete = []
+
+    async def recording_delete_many(query):
+        outbox_at_delete.append([record["target"] for record in db.cdn_deletions.docs])
+        return await delete_many(query)
+
+    db.images.delete_many = recording_delete_many
+
+    deleted = asyncio.run(delete_with_outbox(db, "images", ["a", "b", "missing"], [_record("a"), _record("b")]))
+
+    assert deleted == 2
+    assert db.images.docs == []
+    assert outbox_at_delete == [["images/a.jpg", "images/b.jpg"]]
+    assert [record["target"] for record in db.cdn_deletions.docs] == ["images/a.jpg", "images/b.jpg"]
+
+
+def test_delete_with_outbox_withdraws_records_when_row_delete_fails():
+    db = _database("a", "b")
+    db.cdn_deletions.docs.append(_record("other"))
+    db.images.fail_next("delete_many", RuntimeError("primary stepped down"))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(delete_with_outbox(db, "images", ["a", "b"], [_record("a"), _record("b")]))
+
+    assert [doc["id"] for doc in db.images.docs] == ["a", "b"]
+    # Only the records this call wrote are withdrawn
+    assert [record["target"] for record in db.cdn_deletions.docs] == ["images/other.jpg"]
+
+
+def test_worker_deletes_asset_once_source_row_is_gone():
+    db = _database()
+    db.cdn_deletions.docs.append(_record("a"))
+    deleted = []
+
+    claimed = asyncio.run(_worker(db, deleted).run_once())
+
+    assert claimed == 1
+    assert deleted == ["images/a.jpg"]
+    assert db.cdn_deletions.docs == []
+
+
+def test_worker_defers_record_while_source_row_exists():
+    db = _database("a")
+    record = _record("a")
+    db.cdn_deletions.docs.append(record)
+    deleted = []
+    worker = _worker(db, deleted)
+
+    asyncio.run(worker.run_once())
+
+    assert deleted == []
+    assert worker.totals["deferred"] == 1
+    [pending] = db.cdn_deletions.docs
+    assert pending["status"] == PENDING
+    assert pending["attempts"] == 0
+    assert "lease" not in pending
+
+
+def test_worker_drops_record_whose_source_row_outlived_the_grace_period():
+    db = _database("a")
+    db.cdn_deletions.docs.append(_record("a", age_seconds=CDN_OUTBOX_SOURCE_GRACE_SECONDS + 60))
+    deleted = []
+    worker = _worker(db, deleted)
+
+    asyncio.run(worker.run_once())
+
+    assert deleted == []
+    assert worker.totals["dropped"] == 1
+    assert db.cdn_deletions.docs == []
+    assert [doc["id"] for doc in db.images.docs] == ["a"]
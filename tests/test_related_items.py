@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime
+
+from leases import ensure_lease_indexes
+from related_items import RelatedItemsBuilder, ensure_related_indexes
+from tests.fake_mongo import FakeDatabase
+
+CARDS = {
+    "video": lambda doc: {"id": doc["id"], "title": doc["title"]},
+    "program": lambda doc: {"id": doc["id"], "title": doc["title"]},
+    "product": lambda doc: {"id": doc["id"], "name": doc["name"]},
+}
+FILTERS = {"video": {}, "program": {"is_active": True}, "product": {}}
+
+
+def _database() -> FakeDatabase:
+    db = FakeDatabase()
+    categories, difficulties = ["yoga", "cardio"], ["beginner", "advanced"]
+    for i in range(12):
+        db.videos.docs.append({
+            "id": f"v{i}", "title": f"Video {i}", "category": categories[i % 2],
+            "difficulty": difficulties[i % 2], "view_count": i * 10,
+        })
+    for i, video_ids in enumerate([["v0", "v1", "v2"], ["v3", "v4", "v5"]]):
+        db.programs.docs.append({
+            "id": f"p{i}", "title": f"Program {i}", "category": "Yoga", "difficulty": "beginner",
+            "is_active": True, "video_ids": video_ids, "enrolled_count": i,
+        })
+    for i in range(4):
+        db.products.docs.append({"id": f"x{i}", "name": f"Product {i}", "category": "equipment", "rating": 4.0})
+    db.orders.docs.append({
+        "id": "o1", "payment_status": "success", "created_at": datetime.utcnow().isoformat(), "product_ids": ["x0", "x3"]
+    })
+    return db
+
+
+def _rows(db) -> dict:
+    return {
+        (row["type"], row["id"]): {key: value for key, value in row.items() if key not in ("_id", "updated_at")}
+        for row in db.related_items.docs
+    }
+
+
+def _builders(db, count: int = 2):
+    asyncio.run(ensure_lease_indexes(db))
+    asyncio.run(ensure_related_indexes(db))
+    return [RelatedItemsBuilder(db, CARDS, FILTERS, top_k=3) for _ in range(count)]
+
+
+def test_only_the_lease_holder_builds():
+    db = _database()
+    leader, follower = _builders(db)
+
+    asyncio.run(leader._next_step())
+    asyncio.run(follower._next_step())
+
+    assert (leader.leader, follower.leader) == (True, False)
+    assert (leader.totals["full_builds"], follower.totals["full_builds"]) == (1, 0)
+    assert len(db.related_items.docs) == 12 + 2 + 4
+
+
+def test_changes_from_another_worker_are_merged_incrementally():
+    db = _database()
+    leader, follower = _builders(db)
+    asyncio.run(leader._next_step())
+    asyncio.run(follower._next_step())
+
+    db.videos.docs[0]["title"] = "Renamed"
+    db.videos.docs.remove(next(doc for doc in db.videos.docs if doc["id"] == "v1"))
+    db.programs.docs[1]["video_ids"] = ["v6", "v8"]
+    db.products.docs.append({"id": "x9", "name": "New", "category": "equipment", "rating": 5.0})
+    follower.changed("video", ["v0", "v1"])
+    follower.changed("program", ["p1"])
+    follower.changed("product", ["x9"])
+
+    asyncio.run(follower._next_step())
+    assert {(row["type"], row["id"]) for row in db.related_changes.docs} == {
+        ("video", "v0"), ("video", "v1"), ("program", "p1"), ("product", "x9")
+    }
+    assert not follower.pending
+
+    asyncio.run(leader._next_step())
+    assert db.related_changes.docs == []
+    assert (leader.totals["full_builds"], leader.totals["incremental_builds"]) == (1, 1)
+    merged = _rows(db)
+    assert ("video", "v1") not in merged
+    assert all(card["id"] != "v1" for row in merged.values() for card in row["videos"])
+    assert {"id": "v0", "title": "Renamed"} in merged[("video", "v2")]["videos"]
+
+    # The incremental merge must leave exactly what a full rebuild writes
+    asyncio.run(RelatedItemsBuilder(db, CARDS, FILTERS, top_k=3).run_once())
+    assert merged == _rows(db)
+
+
+def test_change_made_while_draining_stays_queued():
+    db = _database()
+    leader, follower = _builders(db)
+    asyncio.run(leader._next_step())
+    follower.changed("video", ["v0"])
+    asyncio.run(follower._next_step())
+
+    apply_changes = leader.apply_changes
+
+    async def apply_changes_then_change_again(changes):
+        written = await apply_changes(changes)
+        await db.related_changes.update_one(
+            {"type": "video", "id": "v0"}, {"$set": {"changed_at": "9999-01-01T00:00:00"}}
+        )
+        return written
+
+    leader.apply_changes = apply_changes_then_change_again
+    asyncio.run(leader._next_step())
+
+    assert [(row["type"], row["id"]) for row in db.related_changes.docs] == [("video", "v0")]
+
+
+def test_rebuild_request_is_handed_to_the_leader():
+    db = _database()
+    leader, follower = _builders(db)
+    asyncio.run(leader._next_step())
+
+    follower.request_rebuild()
+    asyncio.run(follower._next_step())
+    asyncio.run(leader._next_step())
+
+    assert leader.totals["full_builds"] == 2
+    assert db.related_changes.docs == []
+
+
+def test_stopped_leader_hands_over_with_a_full_build():
+    db = _database()
+    leader, follower = _builders(db)
+    asyncio.run(leader._next_step())
+    asyncio.run(follower._next_step())
+
+    asyncio.run(leader.stop())
+    asyncio.run(follower._next_step())
+
+    assert (leader.leader, follower.leader) == (False, True)
+    assert follower.totals["full_builds"] == 1
+    assert len(db.related_items.docs) == 12 + 2 + 4